@@ -19,13 +19,36 @@ Website: https://hu-berlin.de/rubensson
 E-Mail: {firstname.lastname}@hu-berlin.de
 '''
 
-from .cm_orchestrator import enhance_log_for_concise_model, discover_concise_model
+from .cm_orchestrator import (
+    load_event_log_for_concise_model,
+    enhance_log_for_concise_model, 
+    discover_concise_model
+)
+from .cm_pipeline import (
+    clear_pipeline_cache, 
+    get_pipeline_cache_stats, 
+    set_pipeline_cache_limits
+)
+from .cm_sharding import enhance_log_out_of_core
+from .patterndefinition.communitydetection import sweep_dependency_thresholds
 from .visualization.concisemodelbuilder import build_concise_dfg
-from .evaluation.evaluation import generate_evaluation_statistics_df
+from .evaluation.evaluation import (
+    generate_evaluation_statistics_df,
+    generate_ranking_accuracy_report
+)
+from .evaluation.parametersweep import sweep_concise_models
 
 __all__ = [
+    "load_event_log_for_concise_model",
     "enhance_log_for_concise_model",
+    "enhance_log_out_of_core",
     "discover_concise_model",
+    "clear_pipeline_cache",
+    "get_pipeline_cache_stats",
+    "set_pipeline_cache_limits",
+    "sweep_dependency_thresholds",
     "build_concise_dfg",
     "generate_evaluation_statistics_df",
+    "generate_ranking_accuracy_report",
+    "sweep_concise_models",
 ]
\ No newline at end of file
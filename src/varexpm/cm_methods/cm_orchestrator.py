@@ -21,28 +21,44 @@ E-Mail: {firstname.lastname}@hu-berlin.de
 
 import pandas as pd
 import pm4py
-from .patterndefinition.coalescing import (
-    apply_coalescing_to_dataframe)
-from .patterndefinition.communitydetection import (
-    discover_communities_in_graph, 
-    return_community_column)
-from .patterndefinition.ranking import (
-    rank_entities)
-from .patterndefinition.stagecreation import (
-    return_timewindows_column)
-from .visualization.modeldiscovery import (
-    discover_multi_dependency_graphs)
-from .visualization.representativeexecutions import (
-    get_most_common_activities_per_stage_column, 
-    define_multiactivity_column, 
-    create_column_withnames_for_hiddenactivities)
+from .cm_pipeline import run_pipeline
+from ..utils.data_importing import load_event_log
 from ..utils.data_processing import (
-    simplifyLog, 
-    normalize_reltimes_log, 
-    add_activity_position_percase, 
-    map_values_to_col,
+    get_required_columns,
+    to_pm4py_dataframe,
     group_unique_values_to_dict
 )
+from ..utils.profiling import profiling_session, profiled, create_profile_report
+
+#####################
+### ORCHESTRATION: LOG IMPORT
+#####################
+
+def load_event_log_for_concise_model(
+        filename: str,
+        foldername="event_data",
+        ACT_COL = "concept:name",
+        CASE_COL = "case:concept:name",
+        TIME_COL = "time:timestamp",
+        reader="stream",
+        chunk_size=100_000,
+        use_cache=False) -> pd.DataFrame:
+    '''
+    Load an event log with only the columns used by `enhance_log_for_concise_model`.
+
+    All other attributes are skipped while parsing with the default 
+    `reader="stream"` or while reading a cached log (see `load_event_log`). 
+    With `reader="pm4py"`, the full file is parsed before the columns are selected.
+    '''
+    columns = get_required_columns(
+        CASE_COL=CASE_COL, ACT_COL=ACT_COL, TIME_COL=TIME_COL)
+    return load_event_log(
+        filename, 
+        foldername=foldername, 
+        reader=reader, 
+        chunk_size=chunk_size, 
+        columns=columns, 
+        use_cache=use_cache)
 
 #####################
 ### ORCHESTRATION: LOG ENHANCEMENT
@@ -62,10 +78,19 @@ def enhance_log_for_concise_model(
         MULTI_ACT_COL = "concept:name:multiact",
         MULTI_COMM_COL = "concept:name:communities",
         num_stages = 2,
+        stage_type = "equal",
         dependency_threshold=0.5,
+        dependency_method="native",
         num_comm_ranks=0,
         num_act_ranks=0,
-        hide_common_activities=False
+        hide_common_activities=False,
+        rank_agg_type="median",
+        n_jobs=1,
+        seed=None,
+        cache=False,
+        cache_dir=None,
+        return_report=False,
+        report_callback=None
         ):
     '''
     Enhance log with attributes to be used for the concise model builder.
@@ -111,9 +136,18 @@ def enhance_log_for_concise_model(
     num_stages : int, default=2
         Number of stages to assign to the log.
 
+    stage_type : str, default="equal"
+        How the stages are binned: "equal" (equally wide time windows), 
+        "quantile" (equally many events per stage), or "adaptive" 
+        (balanced stages cut at sparse times).
+
     dependency_threshold : float, default=0.5
         Minimum dependency measure required to establish relations.
 
+    dependency_method : str, default="native"
+        How the dependency measures per stage are computed: "native" (all 
+        stages in one pass) or "pm4py" (one heuristics net per stage).
+
     num_comm_ranks : int, default=0
         Number of ranking attributes computed for communities. 
         (0 will keep all communities per stage. 
@@ -130,130 +164,66 @@ def enhance_log_for_concise_model(
 
     hide_common_activities : bool, default=False
         If True, common/less-informative activities are hidden in the graphical model.
-    '''
-    # -------------------------------------------------------------
-    # i. IMPORT LOG
-    # -------------------------------------------------------------
-    df_log = simplifyLog(df.copy())
 
-    # -------------------------------------------------------------
-    # ii. TEMPORAL SEQUENCE ALIGNMENT
-    # -------------------------------------------------------------
-    #Align sequences through normalized relative timestamps
-    df_log = normalize_reltimes_log(df_log) # rel time
-    df_log = add_activity_position_percase(df_log) # orderings
+    rank_agg_type : str, default="median"
+        How the times of communities and activities are aggregated for the 
+        ranks: "median" or "approx_median" (estimated within 1% for very 
+        large logs, see `generate_ranking_accuracy_report`).
 
-    # -------------------------------------------------------------
-    # iii. COALESCING 
-    # -------------------------------------------------------------
-    # coalesce events
-    df_log = apply_coalescing_to_dataframe(df_log)
-    # filter out events
-    if "events:ignore" in df_log.columns:
-        indices_to_drop = df_log.loc[df_log["events:ignore"].isin([1])].index
-        df_log = df_log.drop(indices_to_drop)
+    n_jobs : int, default=1
+        Number of processes for the community detection per stage and, with 
+        dependency_method="pm4py", the dependency graphs (-1 uses all CPUs).
 
-    # -------------------------------------------------------------
-    # iv. STAGE DEFINITION 
-    # -------------------------------------------------------------
-    df_log[STAGE_COL] = return_timewindows_column(
-        df_log, NRTIMECASE_COL=NRTIMECASE_COL, num_stages=num_stages)
+    seed : int, optional
+        Seed for the community detection (Leiden), which makes the result deterministic.
 
-    # -------------------------------------------------------------
-    # v. COMMUNITY DETECTION 
-    # -------------------------------------------------------------
-    multipleDepG = discover_multi_dependency_graphs(df_log, dependency_threshold=dependency_threshold)
-    community_list = discover_communities_in_graph(multipleDepG)
-    df_log[COMM_COL] = return_community_column(df_log, community_list)
+    cache : bool, default=False
+        If True, the outputs of the pipeline stages are cached in memory and 
+        only stages whose input or parameters changed are executed again 
+        (e.g., changing num_act_ranks only redoes the labels).
 
-    # -------------------------------------------------------------
-    # vi. RANKING 
-    # -------------------------------------------------------------
-    # Ranking communities - overall
-    communities_ranks_ov = rank_entities(
-        df_log,
-        group_cols=[STAGE_COL, COMM_COL],
-        value_col=NRTIMECASE_COL,
-        agg_type="median",
-        sort_cols=[STAGE_COL],
-        rank_col_name="community_rank_overall"
-    )
-    df_log["community_rank_overall"] = map_values_to_col(
-        df_log,
-        communities_ranks_ov,
-        key_cols=[STAGE_COL, COMM_COL],
-        rank_col_name="community_rank_overall"
-    )
-    # Ranking communities - within
-    communities_ranks_in = rank_entities(
-    df_log,
-        group_cols=[STAGE_COL, COMM_COL],
-        value_col=NRTIMECASE_COL,
-        agg_type="median",
-        sort_cols=[STAGE_COL],
-        rank_col_name="community_rank_within",
-        rank_within_col = STAGE_COL
-    )
-    df_log["community_rank_within"] = map_values_to_col(
-        df_log,
-        communities_ranks_in,
-        key_cols=[STAGE_COL, COMM_COL],
-        rank_col_name="community_rank_within"
-    )
-    # Ranking activities in communities - overall
-    activities_ranks_ov = rank_entities(
-        df_log,
-        group_cols=["community_rank_overall", ACT_COL],
-        value_col=NRTIMECASE_COL,
-        agg_type="median",
-        sort_cols=["community_rank_overall"],
-        rank_col_name="activity_rank_overall",
-    )
-    df_log["activity_rank_overall"] = map_values_to_col(
-        df_log,
-        activities_ranks_ov,
-        key_cols=["community_rank_overall", ACT_COL],
-        rank_col_name="activity_rank_overall"
-    )
-    # Ranking activities in communities - within
-    activities_ranks_in = rank_entities(
-        df_log,
-        group_cols=["community_rank_overall", ACT_COL],
-        value_col=NRTIMELOG_COL,
-        agg_type="median",
-        sort_cols=["community_rank_overall"],
-        rank_col_name="activity_rank_within",
-        rank_within_col = "community_rank_overall"
-    )
-    df_log["activity_rank_within"] = map_values_to_col(
-        df_log,
-        activities_ranks_in,
-        key_cols=["community_rank_overall", ACT_COL],
-        rank_col_name="activity_rank_within"
-    )
+    cache_dir : str or Path, optional
+        Folder to also cache the stage outputs on disk (across sessions).
 
-    # -------------------------------------------------------------
-    # vii. REPRESENTATIVE NODES AND LABELS 
-    # -------------------------------------------------------------
-    # get most common activites
-    df_log["common_activities"] = get_most_common_activities_per_stage_column(df_log)
-    # define representative activites
-    REP_ACT_COL="concept:name:rep"
-    df_log["concept:name:rep"] = define_multiactivity_column(
-        df_log, 
-        num_comm_ranks = num_comm_ranks,
-        num_act_ranks = num_act_ranks, 
-        hide_common_activities=hide_common_activities)
-    # label activities in communities (only of hidden activites)
-    df_log[MULTI_ACT_COL] = create_column_withnames_for_hiddenactivities(
-        df_log, MULTIACT_COL=REP_ACT_COL, changing_type="stage+name")
-    # label columns
-    df_log[MULTI_COMM_COL] = create_column_withnames_for_hiddenactivities(
-        df_log, MULTIACT_COL=REP_ACT_COL, changing_type="community_sum")
+    return_report : bool, default=False
+        If True, the stages i.-viii. are profiled and a report (wall time, 
+        CPU time, rows in and out, and peak memory per stage measured with 
+        tracemalloc, see `utils.profiling.create_profile_report`) is returned 
+        with the log.
+
+    report_callback : callable, optional
+        Called with the record (dict) of each profiled stage when it finishes.
+
+    Returns
+    -------
+    pd.DataFrame or tuple
+        The enhanced log, or the enhanced log and the report if return_report.
+    '''
+    params = dict(
+        ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL, RES_COL=RES_COL,
+        RTIME_COL=RTIME_COL, NRTIMECASE_COL=NRTIMECASE_COL, NRTIMELOG_COL=NRTIMELOG_COL,
+        STAGE_COL=STAGE_COL, COMM_COL=COMM_COL,
+        MULTI_ACT_COL=MULTI_ACT_COL, MULTI_COMM_COL=MULTI_COMM_COL,
+        num_stages=num_stages, stage_type=stage_type,
+        dependency_threshold=dependency_threshold, dependency_method=dependency_method,
+        rank_agg_type=rank_agg_type, num_comm_ranks=num_comm_ranks,
+        num_act_ranks=num_act_ranks, hide_common_activities=hide_common_activities,
+        n_jobs=n_jobs, seed=seed)
 
     # -------------------------------------------------------------
-    # viii. RETURN ENHANCED LOG
+    # i.-viii. PIPELINE STAGES (see cm_pipeline.PIPELINE_STAGES)
     # -------------------------------------------------------------
+    # i.-iii. import, temporal sequence alignment, and coalescing; 
+    # iv. stage definition; v. community detection; vi. ranking; 
+    # vii. representative nodes and labels; viii. return enhanced log
+    with profiling_session(
+            enabled=return_report or report_callback is not None, 
+            callback=report_callback) as records:
+        with profiled("enhance_log_for_concise_model", rows_in=len(df)) as record:
+            df_log, _ = run_pipeline(df, params, cache=cache, cache_dir=cache_dir)
+            record["rows_out"] = len(df_log)
+    if return_report:
+        return df_log, create_profile_report(records)
     return df_log
 
 #####################
@@ -263,7 +233,11 @@ def discover_concise_model(
         df: pd.DataFrame,
         STAGE_COL = "stage:number",
         MULTI_ACT_COL = "concept:name:multiact",
-        MULTI_COMM_COL = "concept:name:communities"):
+        MULTI_COMM_COL = "concept:name:communities",
+        CASE_COL = "case:concept:name",
+        TIME_COL = "time:timestamp",
+        return_report=False,
+        report_callback=None):
     '''
     Discover a concise process model from an event log.
 
@@ -278,6 +252,11 @@ def discover_concise_model(
                              (default: "concept:name:multiact").
         MULTI_COMM_COL (str): Name of the column representing community identifiers 
                               (multi-community) (default: "concept:name:communities").
+        CASE_COL (str): Name of the case identifier column (default: "case:concept:name").
+        TIME_COL (str): Name of the timestamp column (default: "time:timestamp").
+        return_report (bool): If True, the steps are profiled and a report is returned 
+                              as last element (see `enhance_log_for_concise_model`).
+        report_callback (callable): Called with the record of each profiled step.
 
     Returns:
         dfg_comm (list of tuple): DFG as a list of edges; each edge is a 
@@ -290,13 +269,23 @@ def discover_concise_model(
         comm_acts_dict (dict): Dictionary mapping community identifiers to the set (or list) 
                                of activities within each community.
     '''
-    # discover DFG
-    dfg_comm, s_comm, e_comm = pm4py.discover_dfg(
-        df, activity_key=MULTI_COMM_COL)
-    # discover stage-community connections
-    stage_comm_dict = group_unique_values_to_dict(
-        df, key_col=STAGE_COL, item_col=MULTI_COMM_COL, order_by="community_rank_within")
-    # discover community-activity connections
-    comm_acts_dict = group_unique_values_to_dict(
-        df, key_col=MULTI_COMM_COL, item_col=MULTI_ACT_COL)
+    with profiling_session(
+            enabled=return_report or report_callback is not None, 
+            callback=report_callback) as records:
+        with profiled("discover_concise_model", rows_in=len(df)):
+            # discover DFG
+            with profiled("dfg", rows_in=len(df)):
+                dfg_comm, s_comm, e_comm = pm4py.discover_dfg(
+                    to_pm4py_dataframe(df, [CASE_COL, MULTI_COMM_COL, TIME_COL]), 
+                    activity_key=MULTI_COMM_COL, case_id_key=CASE_COL, timestamp_key=TIME_COL)
+            # discover stage-community connections
+            with profiled("stage_communities", rows_in=len(df)):
+                stage_comm_dict = group_unique_values_to_dict(
+                    df, key_col=STAGE_COL, item_col=MULTI_COMM_COL, order_by="community_rank_within")
+            # discover community-activity connections
+            with profiled("community_activities", rows_in=len(df)):
+                comm_acts_dict = group_unique_values_to_dict(
+                    df, key_col=MULTI_COMM_COL, item_col=MULTI_ACT_COL)
+    if return_report:
+        return dfg_comm, s_comm, e_comm, stage_comm_dict, comm_acts_dict, create_profile_report(records)
     return dfg_comm, s_comm, e_comm, stage_comm_dict, comm_acts_dict
\ No newline at end of file
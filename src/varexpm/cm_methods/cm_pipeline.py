@@ -0,0 +1,501 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import hashlib
+import json
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .patterndefinition.coalescing import (
+    apply_coalescing_to_dataframe)
+from .patterndefinition.communitydetection import (
+    discover_communities_in_graph,
+    return_community_column)
+from .patterndefinition.ranking import (
+    rank_communities_and_activities)
+from .patterndefinition.stagecreation import (
+    return_timewindows_column)
+from .visualization.modeldiscovery import (
+    build_multi_dependency_graphs,
+    compute_dependency_tables,
+    discover_multi_dependency_graphs)
+from .visualization.representativeexecutions import (
+    get_most_common_activities_per_stage_column,
+    define_multiactivity_column,
+    create_column_withnames_for_hiddenactivities)
+from ..utils.data_processing import (
+    get_required_columns,
+    simplifyLog,
+    encode_log_columns,
+    decode_log_columns,
+    normalize_reltimes_log,
+    add_activity_position_percase
+)
+from ..utils.profiling import profiled, count_rows
+
+#####################
+### PIPELINE: STAGES
+#####################
+
+# Each stage gets the log with the columns of all upstream stages, the
+# parameters, and the outputs of the upstream stages. It returns its outputs:
+# "columns" are added to the log, a "log" replaces it.
+
+REP_ACT_COL = "concept:name:rep"
+
+def _preprocess_log(df_log, p, upstream):
+    '''i.-iii. Simplifies and encodes the log, aligns the sequences, and coalesces events.'''
+    with profiled("simplification", "i.", rows_in=len(df_log)) as record:
+        df_log = simplifyLog(df_log.copy())
+        # work on integer codes (categoricals) for cases and activities
+        df_log, input_dtypes = encode_log_columns(df_log, [p["CASE_COL"], p["ACT_COL"]])
+        record["rows_out"] = len(df_log)
+    #Align sequences through normalized relative timestamps
+    with profiled("alignment", "ii.", rows_in=len(df_log)) as record:
+        df_log = normalize_reltimes_log(df_log) # rel time
+        df_log = add_activity_position_percase(df_log) # orderings
+        record["rows_out"] = len(df_log)
+    # coalesce events (filters out the coalesced events)
+    with profiled("coalescing", "iii.", rows_in=len(df_log)) as record:
+        df_log = apply_coalescing_to_dataframe(df_log, drop_events=True)
+        record["rows_out"] = len(df_log)
+    return {"log": df_log, "dtypes": input_dtypes}
+
+def _define_stages(df_log, p, upstream):
+    '''iv. Assigns a stage to each event.'''
+    stages = return_timewindows_column(
+        df_log, NRTIMECASE_COL=p["NRTIMECASE_COL"],
+        num_stages=p["num_stages"], type=p["stage_type"])
+    return {"columns": pd.DataFrame({p["STAGE_COL"]: stages}, index=df_log.index)}
+
+def _compute_dependencies(df_log, p, upstream):
+    '''v. Computes the dependency measures of all stages (native method only, 
+    hence the graphs of several thresholds share them).
+    '''
+    if p["dependency_method"] != "native":
+        return {}
+    tables = compute_dependency_tables(
+        df_log, ACT_COL=p["ACT_COL"], LEVEL_COL=p["STAGE_COL"],
+        CASE_COL=p["CASE_COL"], TIME_COL=p["TIME_COL"])
+    return {"tables": tables, "levels": df_log[p["STAGE_COL"]].unique()}
+
+def _detect_communities(df_log, p, upstream):
+    '''v. Detects the communities of the dependency graph of each stage.'''
+    dependencies = upstream["dependencies"]
+    if "tables" in dependencies:
+        multipleDepG = build_multi_dependency_graphs(
+            dependencies["tables"], dependencies["levels"],
+            dependency_threshold=p["dependency_threshold"], LEVEL_COL=p["STAGE_COL"])
+    else:
+        multipleDepG = discover_multi_dependency_graphs(
+            df_log, dependency_threshold=p["dependency_threshold"],
+            ACT_COL=p["ACT_COL"], LEVEL_COL=p["STAGE_COL"],
+            CASE_COL=p["CASE_COL"], TIME_COL=p["TIME_COL"],
+            n_jobs=p["n_jobs"], method=p["dependency_method"])
+    community_list = discover_communities_in_graph(
+        multipleDepG, n_jobs=p["n_jobs"], seed=p["seed"])
+    communities = return_community_column(df_log, community_list)
+    return {
+        "columns": pd.DataFrame({p["COMM_COL"]: communities}, index=df_log.index),
+        "communities": community_list,
+    }
+
+def _rank_entities(df_log, p, upstream):
+    '''vi. Ranks the communities and the activities in communities.'''
+    ranks = rank_communities_and_activities(
+        df_log,
+        STAGE_COL=p["STAGE_COL"],
+        COMM_COL=p["COMM_COL"],
+        ACT_COL=p["ACT_COL"],
+        NRTIMECASE_COL=p["NRTIMECASE_COL"],
+        NRTIMELOG_COL=p["NRTIMELOG_COL"],
+        agg_type=p["rank_agg_type"])
+    return {"columns": ranks}
+
+def _label_representatives(df_log, p, upstream):
+    '''vii. Defines the representative activities and their labels.'''
+    df_log = df_log.copy(deep=False)
+    num_columns = len(df_log.columns)
+    # get most common activites
+    df_log["common_activities"] = get_most_common_activities_per_stage_column(df_log)
+    df_log = _add_representative_labels(df_log, p)
+    return {"columns": df_log.iloc[:, num_columns:]}
+
+def _add_representative_labels(df_log, p):
+    '''Adds the representative activities and their labels to a log with 
+    ranks and common activities.
+    '''
+    # define representative activites
+    df_log[REP_ACT_COL] = define_multiactivity_column(
+        df_log,
+        num_comm_ranks = p["num_comm_ranks"],
+        num_act_ranks = p["num_act_ranks"],
+        hide_common_activities=p["hide_common_activities"])
+    # label activities in communities (only of hidden activites)
+    df_log[p["MULTI_ACT_COL"]] = create_column_withnames_for_hiddenactivities(
+        df_log, MULTIACT_COL=REP_ACT_COL, changing_type="stage+name")
+    # label columns
+    df_log[p["MULTI_COMM_COL"]] = create_column_withnames_for_hiddenactivities(
+        df_log, MULTIACT_COL=REP_ACT_COL, changing_type="community_sum")
+    return df_log
+
+def _decode_log(df_log, p, upstream):
+    '''viii. Restores the string columns of the enhanced log.'''
+    input_dtypes = dict(upstream["preprocessing"]["dtypes"])
+    input_dtypes[REP_ACT_COL] = input_dtypes[p["ACT_COL"]]
+    return {"log": decode_log_columns(df_log.copy(deep=False), input_dtypes)}
+
+# Column names are parameters of the first stage, hence of all stages
+COLUMN_PARAMS = [
+    "ACT_COL", "CASE_COL", "TIME_COL", "RES_COL", "RTIME_COL",
+    "NRTIMECASE_COL", "NRTIMELOG_COL", "STAGE_COL", "COMM_COL",
+    "MULTI_ACT_COL", "MULTI_COMM_COL"]
+
+# DAG of the stages (in topological order) with their steps in the
+# orchestrator (i.-viii.). Each stage is cached by the
+# input fingerprint, its upstream stages and only the parameters listed
+# here (n_jobs does not change any result).
+PIPELINE_STAGES = {
+    "preprocessing": {
+        "step": "i.-iii.",
+        "function": _preprocess_log,
+        "depends_on": [],
+        "params": COLUMN_PARAMS},
+    "stages": {
+        "step": "iv.",
+        "function": _define_stages,
+        "depends_on": ["preprocessing"],
+        "params": ["num_stages", "stage_type"]},
+    "dependencies": {
+        "step": "v.",
+        "function": _compute_dependencies,
+        "depends_on": ["stages"],
+        "params": ["dependency_method"]},
+    "communities": {
+        "step": "v.",
+        "function": _detect_communities,
+        "depends_on": ["dependencies"],
+        "params": ["dependency_threshold", "seed"]},
+    "ranking": {
+        "step": "vi.",
+        "function": _rank_entities,
+        "depends_on": ["communities"],
+        "params": ["rank_agg_type"]},
+    "labels": {
+        "step": "vii.",
+        "function": _label_representatives,
+        "depends_on": ["ranking"],
+        "params": ["num_comm_ranks", "num_act_ranks", "hide_common_activities"]},
+    "output": {
+        "step": "viii.",
+        "function": _decode_log,
+        "depends_on": ["labels"],
+        "params": []},
+}
+
+#####################
+### PIPELINE: CACHE
+#####################
+
+# Limits of the in-memory cache (see set_pipeline_cache_limits)
+PIPELINE_CACHE_SIZE = 32
+PIPELINE_CACHE_MAX_BYTES = 1 << 30
+
+# Stage outputs of the current session with their estimated size in bytes
+# (least recently used first)
+_PIPELINE_CACHE = OrderedDict()
+_PIPELINE_CACHE_STATS = {"hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+def get_pipeline_cache_stats() -> dict:
+    '''Returns a copy of the hit/miss counters of the pipeline cache 
+    (with the number of entries and their estimated size in memory).
+    '''
+    stats = dict(_PIPELINE_CACHE_STATS)
+    stats["entries"] = len(_PIPELINE_CACHE)
+    stats["bytes"] = sum(nbytes for _, nbytes in _PIPELINE_CACHE.values())
+    return stats
+
+def set_pipeline_cache_limits(max_entries=None, max_bytes=None):
+    '''
+    Sets the limits of the in-memory pipeline cache. The least recently used 
+    stage outputs are evicted if the cache holds more than `max_entries` 
+    outputs or more than `max_bytes` (estimated memory of their dataframes 
+    and arrays). None keeps the current limit.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of cached stage outputs (default: 32).
+    max_bytes : int, optional
+        Maximum estimated size of the cached outputs (default: 1 GiB).
+        Outputs larger than this are not kept in memory (only on disk 
+        with a cache_dir).
+    '''
+    global PIPELINE_CACHE_SIZE, PIPELINE_CACHE_MAX_BYTES
+    if max_entries is not None:
+        PIPELINE_CACHE_SIZE = max_entries
+    if max_bytes is not None:
+        PIPELINE_CACHE_MAX_BYTES = max_bytes
+    _evict_from_memory()
+
+def clear_pipeline_cache(cache_dir=None) -> int:
+    '''Removes all stage outputs from memory (and from cache_dir if given).
+    Returns the number of removed entries.
+    '''
+    num_removed = len(_PIPELINE_CACHE)
+    _PIPELINE_CACHE.clear()
+    if cache_dir is not None and Path(cache_dir).exists():
+        for path in Path(cache_dir).glob("*.pkl"):
+            path.unlink()
+            num_removed += 1
+    for key in _PIPELINE_CACHE_STATS:
+        _PIPELINE_CACHE_STATS[key] = 0
+    return num_removed
+
+def _update_fingerprint(fingerprint, values):
+    '''Adds the memory of a column (or index) to a hash; numpy, categorical, 
+    and arrow columns are hashed without converting the values.
+    '''
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        _update_fingerprint(fingerprint, pd.Series(values.cat.categories))
+        fingerprint.update(values.cat.codes.to_numpy().tobytes())
+    elif isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufcmM":
+        fingerprint.update(np.ascontiguousarray(values.to_numpy()).tobytes())
+    elif getattr(values.dtype, "storage", None) == "pyarrow":
+        for chunk in values.array.__arrow_array__().chunks:
+            fingerprint.update(f"{chunk.offset}:{len(chunk)}".encode())
+            for buffer in chunk.buffers():
+                fingerprint.update(buffer if buffer is not None else b"-")
+    else:
+        fingerprint.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+
+def fingerprint_event_log(df: pd.DataFrame, columns=None) -> str:
+    '''Returns a hash of the values, index, and dtypes of the columns of a log.'''
+    columns = [col for col in (columns or df.columns) if col in df.columns]
+    fingerprint = hashlib.sha256()
+    fingerprint.update(json.dumps([[str(col), str(df[col].dtype)] for col in columns]).encode())
+    _update_fingerprint(fingerprint, df.index.to_series())
+    for col in columns:
+        _update_fingerprint(fingerprint, df[col])
+    return fingerprint.hexdigest()[:24]
+
+def _stage_key(name, params, upstream_keys) -> str:
+    '''Returns the cache key of a stage.'''
+    key = json.dumps({
+        "stage": name,
+        "params": {param: params[param] for param in PIPELINE_STAGES[name]["params"]},
+        "upstream": upstream_keys,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()[:24]
+
+def _read_stage_output(name, key, cache_dir):
+    '''Returns a cached stage output or None.'''
+    path = Path(cache_dir) / f"{name}-{key}.pkl" if cache_dir is not None else None
+    if (name, key) in _PIPELINE_CACHE:
+        _PIPELINE_CACHE.move_to_end((name, key))
+        _PIPELINE_CACHE_STATS["hits"] += 1
+        output, _ = _PIPELINE_CACHE[(name, key)]
+        if path is not None and not path.exists():
+            _write_to_disk(path, output)
+        return output
+    if path is not None:
+        if path.exists():
+            with open(path, "rb") as f:
+                output = pickle.load(f)
+            _store_in_memory(name, key, output)
+            _PIPELINE_CACHE_STATS["disk_hits"] += 1
+            return output
+    _PIPELINE_CACHE_STATS["misses"] += 1
+    return None
+
+def _estimate_nbytes(value) -> int:
+    '''Returns the estimated memory of the dataframes and arrays in a stage output.'''
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_estimate_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate_nbytes(item) for item in value)
+    return 0
+
+def _evict_from_memory():
+    '''Evicts the least recently used stage outputs until the cache is 
+    within its limits.
+    '''
+    total_bytes = sum(nbytes for _, nbytes in _PIPELINE_CACHE.values())
+    while _PIPELINE_CACHE and (
+            len(_PIPELINE_CACHE) > PIPELINE_CACHE_SIZE 
+            or total_bytes > PIPELINE_CACHE_MAX_BYTES):
+        _, (_, nbytes) = _PIPELINE_CACHE.popitem(last=False)
+        total_bytes -= nbytes
+
+def _store_in_memory(name, key, output):
+    '''Keeps a stage output in memory (evicts the least recently used).'''
+    _PIPELINE_CACHE[(name, key)] = (output, _estimate_nbytes(output))
+    _evict_from_memory()
+
+def _write_to_disk(path, output):
+    '''Writes a stage output to a pickle file.'''
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _write_stage_output(name, key, output, cache_dir):
+    '''Caches a stage output in memory and, if cache_dir is given, on disk.'''
+    _store_in_memory(name, key, output)
+    if cache_dir is not None:
+        _write_to_disk(Path(cache_dir) / f"{name}-{key}.pkl", output)
+    _PIPELINE_CACHE_STATS["writes"] += 1
+
+#####################
+### PIPELINE: EXECUTION
+#####################
+
+def upstream_stages(name) -> list:
+    '''Returns all stages that a stage depends on (in topological order).'''
+    upstream = set()
+    pending = list(PIPELINE_STAGES[name]["depends_on"])
+    while pending:
+        stage = pending.pop()
+        if stage not in upstream:
+            upstream.add(stage)
+            pending.extend(PIPELINE_STAGES[stage]["depends_on"])
+    return [stage for stage in PIPELINE_STAGES if stage in upstream]
+
+def _assemble_log(outputs, stages) -> pd.DataFrame:
+    '''Returns the last log of the given stages with the columns of the 
+    stages after it.
+    '''
+    last = max(i for i, stage in enumerate(stages) if "log" in outputs[stage])
+    df_log = outputs[stages[last]]["log"].copy(deep=False)
+    for stage in stages[last + 1:]:
+        for col, values in outputs[stage].get("columns", {}).items():
+            df_log[col] = values
+    return df_log
+
+def _resolve_stage(name, df, params, keys, outputs, cache_dir):
+    '''Adds the output of a stage to outputs, from the cache or executed 
+    (after resolving the upstream stages).
+    '''
+    if name in outputs:
+        return
+    step = PIPELINE_STAGES[name]["step"]
+    if keys:
+        with profiled(name, step) as record:
+            output = _read_stage_output(name, keys[name], cache_dir)
+            record["cached"] = output is not None
+            record["discard"] = output is None
+        if output is not None:
+            outputs[name] = output
+            return
+    upstream = upstream_stages(name)
+    for stage in upstream:
+        _resolve_stage(stage, df, params, keys, outputs, cache_dir)
+    df_stage = _assemble_log(outputs, upstream) if upstream else df
+    with profiled(name, step, rows_in=len(df_stage)) as record:
+        outputs[name] = PIPELINE_STAGES[name]["function"](
+            df_stage, params, {stage: outputs[stage] for stage in upstream})
+        record["rows_out"] = count_rows(
+            outputs[name].get("log", outputs[name].get("columns")))
+    if keys:
+        _write_stage_output(name, keys[name], outputs[name], cache_dir)
+
+def run_pipeline_stages(
+        df: pd.DataFrame,
+        params: dict,
+        stages: list,
+        cache=False,
+        cache_dir=None,
+        fingerprint=None,
+        outputs=None) -> dict:
+    '''
+    Returns the outputs of the given stages of PIPELINE_STAGES (and of the 
+    upstream stages that were loaded or executed for them), see `run_pipeline`.
+
+    Outputs that are already known (e.g., the preprocessed log shared by 
+    several processes) can be passed as `outputs` by stage name; they are 
+    used as they are, hence they must match df and params.
+    '''
+    keys = {}
+    if cache or cache_dir is not None:
+        if fingerprint is None:
+            fingerprint = fingerprint_event_log(df, get_required_columns(
+                CASE_COL=params["CASE_COL"], ACT_COL=params["ACT_COL"], TIME_COL=params["TIME_COL"]))
+        for name, stage in PIPELINE_STAGES.items():
+            upstream_keys = [keys[dep] for dep in stage["depends_on"]] or [fingerprint]
+            keys[name] = _stage_key(name, params, upstream_keys)
+    outputs = dict(outputs or {})
+    for name in stages:
+        _resolve_stage(name, df, params, keys, outputs, cache_dir)
+    return outputs
+
+def run_pipeline(
+        df: pd.DataFrame,
+        params: dict,
+        cache=False,
+        cache_dir=None,
+        fingerprint=None,
+        targets=()) -> tuple[pd.DataFrame, dict]:
+    '''
+    Runs the stages of PIPELINE_STAGES on a log.
+
+    With a cache, a stage is only executed if the log, its own parameters, or
+    an upstream stage changed, and cached stages are only loaded if a later 
+    stage needs them. E.g., changing num_act_ranks only reruns the "labels" 
+    stage, and changing the dependency_threshold reuses the dependency 
+    measures. Note that with seed=None the cached communities are reused.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The event log dataframe.
+    params : dict
+        Parameters of all stages (see `enhance_log_for_concise_model`).
+    cache : bool, default=False
+        If True, the stage outputs are cached in memory (within the limits 
+        of `set_pipeline_cache_limits`) and a deep copy of the enhanced log 
+        is returned, hence changing it does not change later cache hits.
+    cache_dir : str or Path, optional
+        Folder to also cache the stage outputs on disk (across sessions).
+    fingerprint : str, optional
+        Identifier of the log content (default: a hash of the columns used).
+    targets : list, optional
+        Stages whose outputs are needed besides the enhanced log (e.g., 
+        ["communities"]).
+
+    Returns
+    -------
+    tuple
+        The enhanced log and the outputs of the loaded or executed stages 
+        (shared with the cache, hence they must not be modified).
+    '''
+    outputs = run_pipeline_stages(
+        df, params, [*targets, "output"], 
+        cache=cache, cache_dir=cache_dir, fingerprint=fingerprint)
+    # the cached log is not copied on write on all pandas versions
+    cached = cache or cache_dir is not None
+    return outputs["output"]["log"].copy(deep=cached), outputs
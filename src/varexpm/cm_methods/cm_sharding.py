@@ -0,0 +1,482 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import importlib.util
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .cm_pipeline import REP_ACT_COL, _add_representative_labels
+from .patterndefinition.coalescing import apply_coalescing_to_dataframe
+from .patterndefinition.communitydetection import (
+    discover_communities_in_graph,
+    return_community_column)
+from .patterndefinition.ranking import rank_communities_and_activities_from_sketches
+from .patterndefinition.stagecreation import return_timewindows_column
+from .visualization.modeldiscovery import (
+    build_dependency_tables,
+    build_multi_dependency_graphs)
+from .visualization.representativeexecutions import (
+    get_most_common_activities_per_stage_column)
+from ..utils.data_processing import (
+    get_required_columns,
+    encode_log_columns,
+    decode_log_columns,
+    normalize_reltimes_log,
+    add_activity_position_percase
+)
+from ..utils.data_sketches import (
+    summarize_activity_statistics,
+    merge_activity_statistics,
+    finalize_activity_statistics,
+    build_ddsketch,
+    merge_ddsketches
+)
+from ..utils.data_xesreader import iter_xes_chunks
+from ..utils.profiling import profiled
+
+#####################
+### SHARDING: INPUT AND SHARDS
+#####################
+
+# Relative accuracy of the median sketches (as agg_type="approx_median")
+SHARD_RELATIVE_ACCURACY = 0.01
+
+def _iter_log_chunks(log, chunk_size, columns, column_mapping=None, TIME_COL="time:timestamp"):
+    '''Yields the chunks of a log: an iterable of dataframes or a .xes, 
+    .parquet, or .csv file (read chunk by chunk, numbered by a running index;
+    see `read_tabular_event_log` for column_mapping).
+    '''
+    if not isinstance(log, (str, Path)):
+        yield from log
+        return
+    path = Path(log)
+    column_mapping = column_mapping or {}
+    reverse_mapping = {target: source for source, target in column_mapping.items()}
+    source_cols = [reverse_mapping.get(col, col) for col in columns]
+    if path.suffix == ".xes":
+        chunks = iter_xes_chunks(path, chunk_size=chunk_size, columns=columns)
+    elif path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading .parquet files requires 'pyarrow' (pip install varexpm[io]).")
+        chunks = (
+            batch.to_pandas() for batch in 
+            pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=source_cols))
+    elif path.suffix == ".csv":
+        chunks = pd.read_csv(path, usecols=source_cols, chunksize=chunk_size)
+    else:
+        raise ValueError("'log' must be a .xes, .parquet, or .csv file or an iterable of dataframes.")
+    offset = 0
+    for chunk in chunks:
+        chunk = chunk.rename(columns=column_mapping)
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        # timestamps as UTC datetimes (as `read_tabular_event_log`)
+        if not pd.api.types.is_datetime64_any_dtype(chunk[TIME_COL]):
+            chunk[TIME_COL] = pd.to_datetime(chunk[TIME_COL], utc=True)
+        elif chunk[TIME_COL].dt.tz is None:
+            chunk[TIME_COL] = chunk[TIME_COL].dt.tz_localize("UTC")
+        yield chunk
+
+def _read_shard(paths) -> pd.DataFrame:
+    '''Reads the parts of a shard (in the order of the input chunks).'''
+    parts = [pd.read_pickle(path) for path in sorted(paths)]
+    return pd.concat(parts) if len(parts) > 1 else parts[0]
+
+def _map_shards(executor, function, tasks) -> list:
+    '''Applies a function to the tasks of all shards (in a process pool if given).'''
+    if executor is None:
+        return [function(task) for task in tasks]
+    return list(executor.map(function, tasks))
+
+def spill_log_to_shards(
+        log,
+        shard_dir,
+        num_shards=16,
+        chunk_size=100_000,
+        column_mapping=None,
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp") -> dict:
+    '''
+    Splits a log into shards of complete cases (by a hash of the case 
+    identifier), reading one chunk at a time. Cases can span several chunks.
+
+    Returns
+    -------
+    dict
+        "shards" (list of the part files per shard), "num_events", and 
+        "dtypes" (the dtypes of the case and activity columns).
+    '''
+    shard_dir = Path(shard_dir)
+    columns = get_required_columns(CASE_COL=CASE_COL, ACT_COL=ACT_COL, TIME_COL=TIME_COL)
+    shards = [[] for _ in range(num_shards)]
+    num_events, dtypes = 0, None
+    chunks = _iter_log_chunks(
+        log, chunk_size, columns, column_mapping=column_mapping, TIME_COL=TIME_COL)
+    for i, chunk in enumerate(chunks):
+        chunk = chunk[columns]
+        if dtypes is None:
+            dtypes = {col: chunk[col].dtype for col in [CASE_COL, ACT_COL]}
+        shard_ids = pd.util.hash_pandas_object(chunk[CASE_COL], index=False).to_numpy() % num_shards
+        for shard_id in np.unique(shard_ids):
+            path = shard_dir / f"shard-{shard_id:05d}" / f"part-{i:06d}.pkl"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            chunk.loc[shard_ids == shard_id].to_pickle(path)
+            shards[shard_id].append(path)
+        num_events += len(chunk)
+    if dtypes is None:
+        raise ValueError("No chunks to split into shards.")
+    return {"shards": [paths for paths in shards if paths], "num_events": num_events, "dtypes": dtypes}
+
+#####################
+### SHARDING: SCANS
+#####################
+
+def _summarize_shard(task) -> dict:
+    '''Scan A: activity statistics of a shard.'''
+    paths, p = task
+    df_log = _read_shard(paths)
+    df_log, _ = encode_log_columns(df_log, [p["CASE_COL"], p["ACT_COL"]])
+    return summarize_activity_statistics(
+        df_log, ACT_COL=p["ACT_COL"], CASE_COL=p["CASE_COL"], TIME_COL=p["TIME_COL"])
+
+def _preprocess_shard(task) -> dict:
+    '''Scan B: i.-iii. of a shard with the statistics of the whole log; 
+    writes the preprocessed shard.
+    '''
+    paths, output_path, activities, df_act_statistics, max_seconds, p = task
+    df_log = _read_shard(paths)
+    num_events = len(df_log)
+    df_log, _ = encode_log_columns(df_log, [p["CASE_COL"]])
+    # activity codes of the whole log
+    df_log[p["ACT_COL"]] = pd.Categorical(df_log[p["ACT_COL"]], categories=activities)
+    df_log = normalize_reltimes_log(df_log, max_seconds=max_seconds)
+    df_log = add_activity_position_percase(df_log)
+    df_log = apply_coalescing_to_dataframe(
+        df_log, drop_events=True, df_act_statistics=df_act_statistics)
+    df_log.to_pickle(output_path)
+    times = df_log[p["NRTIMECASE_COL"]]
+    return {
+        "num_events": num_events, "num_coalesced": len(df_log), 
+        "min": times.min(), "max": times.max()}
+
+def _shard_stages(df_log, value_range, p) -> np.ndarray:
+    '''iv. Equal stages of a shard with the range of the whole log.'''
+    stages = return_timewindows_column(
+        df_log, NRTIMECASE_COL=p["NRTIMECASE_COL"],
+        num_stages=p["num_stages"], type="equal", value_range=value_range)
+    return np.broadcast_to(np.asarray(stages, dtype=np.int64), len(df_log))
+
+def _count_shard(task) -> dict:
+    '''
+    Scan C: directly-follows and activity counts, case counts, first 
+    appearances, and time sketches per (stage, activity) of a shard.
+
+    Keys are stage * A + activity and (stage * A + source) * A + target for 
+    the A activities of the whole log.
+    '''
+    path, value_range, num_acts, p = task
+    df_log = pd.read_pickle(path)
+    stages = _shard_stages(df_log, value_range, p)
+    act_codes = df_log[p["ACT_COL"]].cat.codes.to_numpy().astype(np.int64)
+    case_codes, cases = pd.factorize(df_log[p["CASE_COL"]])
+    timestamps = df_log[p["TIME_COL"]].dt.as_unit("ns").array.asi8
+
+    # directly-follows pairs (as `compute_dependency_tables`)
+    order = np.lexsort((timestamps, case_codes, stages))
+    stage_sorted, case_sorted, act_sorted = stages[order], case_codes[order], act_codes[order]
+    follows = (stage_sorted[1:] == stage_sorted[:-1]) & (case_sorted[1:] == case_sorted[:-1])
+    pair_codes = (
+        (stage_sorted[:-1][follows] * num_acts + act_sorted[:-1][follows]) * num_acts 
+        + act_sorted[1:][follows])
+    pair_codes, pair_counts = np.unique(pair_codes, return_counts=True)
+
+    # activities per stage: counts, cases, and first event (the shard is 
+    # ordered by case and time, as the log in memory)
+    keys = stages * num_acts + act_codes
+    unique_keys, first_index, key_counts = np.unique(keys, return_index=True, return_counts=True)
+    key_cases = np.unique(keys * len(cases) + case_codes) // len(cases)
+    case_starts = np.r_[0, np.flatnonzero(np.diff(case_codes)) + 1]
+    case_positions = np.arange(len(df_log)) - np.repeat(case_starts, np.diff(np.r_[case_starts, len(df_log)]))
+    df_keys = pd.DataFrame({
+        "key": unique_keys,
+        "frequency": key_counts,
+        "cases": np.unique(key_cases, return_counts=True)[1],
+        "first_case": np.asarray(cases)[case_codes[first_index]],
+        "first_position": case_positions[first_index],
+    })
+    return {
+        "pairs": pd.Series(pair_counts, index=pair_codes),
+        "keys": df_keys,
+        "sketches": {
+            col: build_ddsketch(keys, df_log[col].to_numpy(dtype=float), SHARD_RELATIVE_ACCURACY)
+            for col in [p["NRTIMECASE_COL"], p["NRTIMELOG_COL"]]},
+    }
+
+def _write_shard(task) -> int:
+    '''Writes the enhanced log of a shard: the columns per (stage, activity)
+    are looked up in the table of the whole log.
+    '''
+    path, output_path, value_range, num_acts, df_keys, key_codes, input_dtypes, p = task
+    df_log = pd.read_pickle(path)
+    stages = _shard_stages(df_log, value_range, p)
+    df_log[p["STAGE_COL"]] = stages
+    keys = stages * num_acts + df_log[p["ACT_COL"]].cat.codes.to_numpy().astype(np.int64)
+    positions = np.searchsorted(key_codes, keys)
+    for col in df_keys.columns.drop([p["STAGE_COL"], p["ACT_COL"]]):
+        df_log[col] = df_keys[col].iloc[positions].set_axis(df_log.index)
+    df_log = decode_log_columns(df_log, input_dtypes)
+    df_log.to_parquet(output_path, index=True)
+    return len(df_log)
+
+#####################
+### SHARDING: LOG-WIDE STAGES
+#####################
+
+def _merge_shard_counts(counts: list, num_acts: int) -> dict:
+    '''Sums the counts of all shards and orders the stages by their first 
+    appearance (first case label and position in the case), as in memory.
+    '''
+    pairs = pd.concat([count["pairs"] for count in counts]).groupby(level=0).sum()
+    df_keys = pd.concat([count["keys"] for count in counts], ignore_index=True)
+    # first appearance over all shards
+    df_keys = df_keys.sort_values(["first_case", "first_position"], kind="stable")
+    df_keys["first"] = np.arange(len(df_keys))
+    df_keys = df_keys.groupby("key", sort=True).agg(
+        frequency=("frequency", "sum"), cases=("cases", "sum"), first=("first", "min")).reset_index()
+    stages = df_keys["key"].to_numpy() // num_acts
+    stage_first = pd.Series(df_keys["first"].to_numpy()).groupby(stages).min().sort_values()
+    return {"pairs": pairs, "keys": df_keys, "levels": stage_first.index.to_numpy(dtype=np.int64)}
+
+def _compute_shard_dependencies(merged, activities, p) -> dict:
+    '''v. Dependency tables of the whole log from the merged counts.'''
+    num_acts = len(activities)
+    level_ranks = np.zeros(merged["levels"].max() + 1, dtype=np.int64)
+    level_ranks[merged["levels"]] = np.arange(len(merged["levels"]))
+    # recode the stages by first appearance
+    pair_codes = merged["pairs"].index.to_numpy(dtype=np.int64)
+    pair_stages, pair_rest = np.divmod(pair_codes, num_acts * num_acts)
+    pair_codes = level_ranks[pair_stages] * num_acts * num_acts + pair_rest
+    pair_order = np.argsort(pair_codes)
+    key_stages, key_acts = np.divmod(merged["keys"]["key"].to_numpy(), num_acts)
+    act_pairs = level_ranks[key_stages] * num_acts + key_acts
+    act_order = np.argsort(act_pairs)
+    return build_dependency_tables(
+        merged["levels"], np.asarray(activities, dtype=object),
+        pair_codes[pair_order], merged["pairs"].to_numpy()[pair_order],
+        act_pairs[act_order], merged["keys"]["frequency"].to_numpy()[act_order],
+        merged["keys"]["first"].to_numpy()[act_order],
+        LEVEL_COL=p["STAGE_COL"])
+
+def _label_shard_keys(merged, sketches, activities, community_list, p) -> pd.DataFrame:
+    '''v.-vii. Communities, ranks, and labels per (stage, activity) of the whole log.'''
+    num_acts = len(activities)
+    key_stages, key_acts = np.divmod(merged["keys"]["key"].to_numpy(), num_acts)
+    df_keys = pd.DataFrame({
+        p["STAGE_COL"]: key_stages,
+        p["ACT_COL"]: pd.Categorical.from_codes(key_acts, categories=activities)})
+    df_keys[p["COMM_COL"]] = return_community_column(df_keys, community_list)
+    df_keys = pd.concat([df_keys, rank_communities_and_activities_from_sketches(
+        df_keys, sketches,
+        STAGE_COL=p["STAGE_COL"], COMM_COL=p["COMM_COL"], ACT_COL=p["ACT_COL"],
+        NRTIMECASE_COL=p["NRTIMECASE_COL"], NRTIMELOG_COL=p["NRTIMELOG_COL"])], axis=1)
+    # cases per stage and activity (cases are complete in their shard)
+    stage_activity_matrix = pd.Series(
+        merged["keys"]["cases"].to_numpy(), 
+        index=pd.MultiIndex.from_arrays([key_stages, df_keys[p["ACT_COL"]]]),
+    ).sort_index(level=0, sort_remaining=False).unstack(fill_value=0)
+    df_keys["common_activities"] = get_most_common_activities_per_stage_column(
+        df_keys, stage_activity_matrix=stage_activity_matrix)
+    return _add_representative_labels(df_keys, p)
+
+#####################
+### SHARDING: ORCHESTRATION
+#####################
+
+def enhance_log_out_of_core(
+        log,
+        output_dir,
+        num_shards=16,
+        chunk_size=100_000,
+        work_dir=None,
+        column_mapping=None,
+        ACT_COL = "concept:name",
+        CASE_COL = "case:concept:name",
+        TIME_COL = "time:timestamp",
+        NRTIMECASE_COL = "time:relative:normalized:case",
+        NRTIMELOG_COL = "time:relative:normalized:log",
+        STAGE_COL = "stage:number",
+        COMM_COL = 'community:number',
+        MULTI_ACT_COL = "concept:name:multiact",
+        MULTI_COMM_COL = "concept:name:communities",
+        num_stages = 2,
+        stage_type = "equal",
+        dependency_threshold=0.5,
+        num_comm_ranks=0,
+        num_act_ranks=0,
+        hide_common_activities=False,
+        rank_agg_type="approx_median",
+        n_jobs=1,
+        seed=None) -> Path:
+    '''
+    Enhances a log that does not fit into memory like 
+    `enhance_log_for_concise_model` and writes it as Parquet files (one per
+    shard of cases).
+
+    The log is read chunk by chunk and split into shards of complete cases 
+    on disk (in work_dir). All per-case steps run shard by shard; only the 
+    log-wide aggregates are merged: the activity statistics and largest 
+    relative time (coalescing and log-normalized times), the range of the 
+    case-normalized times (stages), and the directly-follows counts, case 
+    counts, and time sketches per stage and activity (dependency graphs, 
+    common activities, and ranks). Communities, ranks, and labels are then 
+    computed once per stage and activity and added to each shard.
+
+    Only one shard is held in memory per process, hence num_shards should 
+    be chosen such that a shard fits into memory. The results equal the 
+    in-memory pipeline with rank_agg_type="approx_median"; coalescing uses 
+    exact merged moments. Only equal stages (stage_type="equal") and the 
+    native dependency measures are supported, since quantile stages and exact 
+    medians need all values at once.
+
+    Parameters
+    ----------
+    log : str, Path, or iterable
+        A .xes, .parquet, or .csv file or an iterable of dataframes (e.g., 
+        `iter_xes_chunks`); cases can span several chunks.
+    output_dir : str or Path
+        Folder for the Parquet files of the enhanced log (read with 
+        `pd.read_parquet(output_dir)`; requires pyarrow).
+    num_shards : int, default=16
+        Number of shards of cases.
+    chunk_size : int, default=100_000
+        Number of events per chunk when reading a file.
+    work_dir : str or Path, optional
+        Folder for the temporary shards (default: the system's temporary 
+        folder). They are removed at the end.
+    column_mapping : dict, optional
+        Maps source columns of a .parquet or .csv file onto the standard 
+        names (see `read_tabular_event_log`).
+    n_jobs : int, default=1
+        Number of processes for the shards and the community detection 
+        (-1 uses all CPUs).
+
+    See `enhance_log_for_concise_model` for the other parameters.
+
+    Returns
+    -------
+    Path
+        The output folder.
+    '''
+    if stage_type != "equal":
+        raise ValueError("Out-of-core stages require stage_type='equal'.")
+    if rank_agg_type != "approx_median":
+        raise ValueError("Out-of-core ranks require rank_agg_type='approx_median'.")
+    if importlib.util.find_spec("pyarrow") is None:
+        raise ImportError(
+            "enhance_log_out_of_core writes the shards as .parquet files, which requires "
+            "'pyarrow' (pip install varexpm[io], or pip install \".[io]\" in a source checkout).")
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    p = dict(
+        ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL,
+        NRTIMECASE_COL=NRTIMECASE_COL, NRTIMELOG_COL=NRTIMELOG_COL,
+        STAGE_COL=STAGE_COL, COMM_COL=COMM_COL,
+        MULTI_ACT_COL=MULTI_ACT_COL, MULTI_COMM_COL=MULTI_COMM_COL,
+        num_stages=num_stages, num_comm_ranks=num_comm_ranks, 
+        num_act_ranks=num_act_ranks, hide_common_activities=hide_common_activities)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for path in output_dir.glob("part-*.parquet"):
+        path.unlink()
+    if work_dir is not None:
+        Path(work_dir).mkdir(parents=True, exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix="varexpm-shards-", dir=work_dir))
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    try:
+        # split the log into shards of cases
+        with profiled("sharding", "i.") as record:
+            spilled = spill_log_to_shards(
+                log, work_dir / "input", num_shards=num_shards, chunk_size=chunk_size,
+                column_mapping=column_mapping,
+                ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL)
+            shards = spilled["shards"]
+            record["rows_in"] = record["rows_out"] = spilled["num_events"]
+
+        # scan A: activity statistics of the whole log
+        with profiled("statistics", "iii.", rows_in=spilled["num_events"]):
+            summary = merge_activity_statistics(
+                _map_shards(executor, _summarize_shard, [(paths, p) for paths in shards]))
+            df_act_statistics = finalize_activity_statistics(summary, ACT_COL=ACT_COL)
+            activities = df_act_statistics.index.sort_values()
+
+        # scan B: i.-iii. per shard (normalized times, positions, and coalescing)
+        with profiled("preprocessing", "i.-iii.", rows_in=spilled["num_events"]) as record:
+            preprocessed = [work_dir / f"preprocessed-{i:05d}.pkl" for i in range(len(shards))]
+            ranges = _map_shards(executor, _preprocess_shard, [
+                (paths, path, activities, df_act_statistics, summary["max_seconds"], p)
+                for paths, path in zip(shards, preprocessed)])
+            value_range = (min(r["min"] for r in ranges), max(r["max"] for r in ranges))
+            record["rows_out"] = sum(r["num_coalesced"] for r in ranges)
+        shutil.rmtree(work_dir / "input")
+
+        # scan C: iv. stages and the counts and sketches per stage and activity
+        with profiled("counts", "iv.-v.", rows_in=record["rows_out"]):
+            counts = _map_shards(executor, _count_shard, [
+                (path, value_range, len(activities), p) for path in preprocessed])
+            merged = _merge_shard_counts(counts, len(activities))
+            key_codes = merged["keys"]["key"].to_numpy()
+            sketches = {
+                col: merge_ddsketches([count["sketches"][col] for count in counts])
+                for col in [NRTIMECASE_COL, NRTIMELOG_COL]}
+            for sketch in sketches.values():
+                # keys as row numbers of the (stage, activity) table
+                sketch["buckets"]["key"] = np.searchsorted(key_codes, sketch["buckets"]["key"])
+            del counts
+
+        # v.-vii. dependency graphs, communities, ranks, and labels (once per stage and activity)
+        with profiled("communities", "v.-vii."):
+            tables = _compute_shard_dependencies(merged, activities, p)
+            multipleDepG = build_multi_dependency_graphs(
+                tables, merged["levels"], 
+                dependency_threshold=dependency_threshold, LEVEL_COL=STAGE_COL)
+            community_list = discover_communities_in_graph(multipleDepG, n_jobs=n_jobs, seed=seed)
+            df_keys = _label_shard_keys(merged, sketches, activities, community_list, p)
+
+        # viii. write the enhanced shards
+        with profiled("writing", "viii.") as record:
+            input_dtypes = dict(spilled["dtypes"])
+            input_dtypes[REP_ACT_COL] = input_dtypes[ACT_COL]
+            record["rows_out"] = sum(_map_shards(executor, _write_shard, [
+                (path, output_dir / f"part-{i:05d}.parquet", value_range, len(activities),
+                 df_keys, key_codes, input_dtypes, p)
+                for i, path in enumerate(preprocessed)]))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_dir
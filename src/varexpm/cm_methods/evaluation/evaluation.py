@@ -19,9 +19,11 @@ Website: https://hu-berlin.de/rubensson
 E-Mail: {firstname.lastname}@hu-berlin.de
 '''
 
+import time
 import networkx as nx
 import numpy as np
 import pandas as pd
+from ..patterndefinition.ranking import RANK_COLS, rank_communities_and_activities
 from ...utils.data_helpers import (
     get_nunique_values_from_col,
     get_dataframe_len,
@@ -123,4 +125,73 @@ def generate_evaluation_statistics_df(
     
     # combine statistics into on dataframe
     eva_statistics = log_statistics.merge(graph_statistics, on=log_name_col)
-    return eva_statistics
\ No newline at end of file
+    return eva_statistics
+
+#####################
+### EVALUATION: APPROXIMATE RANKING
+#####################
+
+def generate_ranking_accuracy_report(
+        logs: dict,
+        relative_accuracies=(0.01, 0.05),
+        ACT_COL="concept:name",
+        STAGE_COL="stage:number",
+        COMM_COL="community:number",
+        NRTIMECASE_COL="time:relative:normalized:case",
+        NRTIMELOG_COL="time:relative:normalized:log",
+        log_name_col="log_name") -> pd.DataFrame:
+    '''
+    Compares the ranks of agg_type="approx_median" with the exact medians 
+    on sample logs, to decide when the approximation is safe.
+
+    Parameters
+    ----------
+    logs : dict
+        Log name -> enhanced log (see `enhance_log_for_concise_model`).
+    relative_accuracies : sequence of float, default=(0.01, 0.05)
+        Error bounds of the approximate medians to compare.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per log, relative accuracy, and rank column with the number 
+        of ranked entities, the number and share of entities and the share of 
+        events with a different rank, the largest rank difference, and the 
+        runtimes (seconds) of the exact and the approximate ranking.
+    '''
+    entity_cols = {
+        "community": [STAGE_COL, COMM_COL],
+        "activity": [STAGE_COL, COMM_COL, ACT_COL],
+    }
+    rows = []
+    for log_name, df in logs.items():
+        rank_args = dict(
+            STAGE_COL=STAGE_COL, COMM_COL=COMM_COL, ACT_COL=ACT_COL,
+            NRTIMECASE_COL=NRTIMECASE_COL, NRTIMELOG_COL=NRTIMELOG_COL)
+        start = time.perf_counter()
+        exact = rank_communities_and_activities(df, agg_type="median", **rank_args)
+        exact_seconds = time.perf_counter() - start
+        for relative_accuracy in relative_accuracies:
+            start = time.perf_counter()
+            approx = rank_communities_and_activities(
+                df, agg_type="approx_median", relative_accuracy=relative_accuracy, **rank_args)
+            approx_seconds = time.perf_counter() - start
+            for rank_col in RANK_COLS:
+                key_cols = entity_cols[rank_col.split("_")[0]]
+                differences = (approx[rank_col] - exact[rank_col]).abs()
+                changed = differences > 0
+                num_entities = len(df[key_cols].drop_duplicates())
+                num_changed = len(df.loc[changed, key_cols].drop_duplicates())
+                rows.append({
+                    log_name_col: log_name,
+                    "relative_accuracy": relative_accuracy,
+                    "rank_col": rank_col,
+                    "num_entities": num_entities,
+                    "num_entities_changed": num_changed,
+                    "share_entities_changed": num_changed / num_entities if num_entities else 0.0,
+                    "share_events_changed": changed.mean() if len(df) else 0.0,
+                    "max_rank_difference": differences.max() if changed.any() else 0,
+                    "exact_seconds": exact_seconds,
+                    "approx_seconds": approx_seconds,
+                })
+    return pd.DataFrame(rows)
@@ -0,0 +1,184 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import inspect
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from ..cm_orchestrator import enhance_log_for_concise_model, discover_concise_model
+from ..cm_pipeline import PIPELINE_STAGES, run_pipeline_stages, upstream_stages
+from .evaluation import generate_evaluation_statistics_df
+
+#####################
+### EVALUATION: PARAMETER SWEEP
+#####################
+
+# Stages that are computed once per distinct prefix in the main process; the
+# communities and ranks are computed once per task and the labels per point.
+SWEEP_SHARED_STAGES = ["preprocessing", "stages", "dependencies"]
+SWEEP_TASK_STAGE = "ranking"
+_SWEEP_EXCLUDED_PARAMS = [
+    "df", "n_jobs", "cache", "cache_dir", "return_report", "report_callback"]
+
+def _default_sweep_params() -> dict:
+    '''Returns the parameters of `enhance_log_for_concise_model` with their defaults.'''
+    return {
+        name: parameter.default
+        for name, parameter in inspect.signature(enhance_log_for_concise_model).parameters.items()
+        if name not in _SWEEP_EXCLUDED_PARAMS}
+
+def _expand_grid(grid) -> list:
+    '''Returns the grid points of a dict of value lists (cartesian product) 
+    or of a list of dicts.
+    '''
+    if isinstance(grid, dict):
+        names = list(grid)
+        return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    return [dict(point) for point in grid]
+
+def _prefix_params(params, stage) -> tuple:
+    '''Returns the parameters of a stage and of its upstream stages.'''
+    names = [
+        name for upstream in [*upstream_stages(stage), stage]
+        for name in PIPELINE_STAGES[upstream]["params"]]
+    return tuple((name, repr(params[name])) for name in names)
+
+def _run_sweep_task(task) -> list:
+    '''Runs the communities and ranks of a task once and the labels, the 
+    model discovery, and the evaluation for each of its points.
+    '''
+    outputs, points, log_name = task
+    start = time.perf_counter()
+    outputs = run_pipeline_stages(None, points[0][1], [SWEEP_TASK_STAGE], outputs=outputs)
+    task_seconds = time.perf_counter() - start
+    results = []
+    for i, params in points:
+        start = time.perf_counter()
+        df_log = run_pipeline_stages(None, params, ["output"], outputs=outputs)["output"]["log"]
+        dfg, _, _, _, _ = discover_concise_model(
+            df_log,
+            STAGE_COL=params["STAGE_COL"],
+            MULTI_ACT_COL=params["MULTI_ACT_COL"],
+            MULTI_COMM_COL=params["MULTI_COMM_COL"],
+            CASE_COL=params["CASE_COL"],
+            TIME_COL=params["TIME_COL"])
+        eva_statistics = generate_evaluation_statistics_df(
+            df_log, dfg,
+            ACT_COL=params["ACT_COL"],
+            CASE_COL=params["CASE_COL"],
+            STAGE_COL=params["STAGE_COL"],
+            MULTI_ACT_COL=params["MULTI_ACT_COL"],
+            log_name=f"{log_name}_{i + 1}")
+        results.append((i, eva_statistics, time.perf_counter() - start, task_seconds))
+    return results
+
+def sweep_concise_models(
+        log: pd.DataFrame,
+        grid,
+        n_jobs=1,
+        log_name="log",
+        **kwargs) -> pd.DataFrame:
+    '''
+    Enhances a log, discovers the concise model, and evaluates it (see 
+    `generate_evaluation_statistics_df`) for each point of a parameter grid.
+
+    The grid points share the common prefixes of the pipeline (see 
+    cm_pipeline.PIPELINE_STAGES): the preprocessing, the stages, and the 
+    dependency measures are computed once per distinct prefix, the 
+    communities and ranks once per distinct value of their parameters, and 
+    only the labels for each point. E.g., a grid over num_comm_ranks and 
+    num_act_ranks preprocesses the log and detects the communities once.
+
+    Parameters
+    ----------
+    log : pd.DataFrame
+        The event log dataframe.
+    grid : dict or list
+        A dict of parameter lists (all combinations are evaluated) or a list 
+        of parameter dicts. Parameters are those of 
+        `enhance_log_for_concise_model`.
+    n_jobs : int, default=1
+        Number of processes for the points that do not share communities 
+        (-1 uses all CPUs).
+    log_name : str, default="log"
+        Prefix of the log names in the results (f"{log_name}_1", ...).
+    **kwargs
+        Parameters of `enhance_log_for_concise_model` for all points.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per grid point (in grid order) with the evaluation statistics,
+        the grid parameters (as "param:<name>"), and the timings in seconds: "seconds" of the 
+        point itself, "task_seconds" of its communities and ranks (shared with
+        points of the same task), and "prefix_seconds" of its shared prefix.
+    '''
+    defaults = _default_sweep_params()
+    points = _expand_grid(grid)
+    grid_params = list(dict.fromkeys(name for point in points for name in point))
+    unknown = [name for name in [*kwargs, *grid_params] if name not in defaults]
+    if unknown:
+        raise ValueError(f"Unknown parameters: {unknown}")
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+
+    # Shared prefixes (main process)
+    shared = {}
+    prefix_seconds = []
+    tasks = {}
+    for i, point in enumerate(points):
+        params = {**defaults, **kwargs, **point, "n_jobs": 1}
+        outputs = {}
+        seconds = 0.0
+        for stage in SWEEP_SHARED_STAGES:
+            key = (stage, _prefix_params(params, stage))
+            if key not in shared:
+                start = time.perf_counter()
+                shared[key] = run_pipeline_stages(log, params, [stage], outputs=outputs)[stage]
+                seconds += time.perf_counter() - start
+            outputs[stage] = shared[key]
+        prefix_seconds.append(seconds)
+        task_key = _prefix_params(params, SWEEP_TASK_STAGE)
+        if task_key not in tasks:
+            tasks[task_key] = (outputs, [], log_name)
+        tasks[task_key][1].append((i, params))
+    tasks = list(tasks.values())
+
+    # Communities, ranks, labels, and evaluation (per task)
+    if n_jobs == 1 or len(tasks) <= 1:
+        task_results = [_run_sweep_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+            task_results = list(executor.map(_run_sweep_task, tasks))
+
+    rows = []
+    for i, eva_statistics, seconds, task_seconds in sorted(
+            (result for results in task_results for result in results), key=lambda r: r[0]):
+        eva_statistics = eva_statistics.copy()
+        for name in grid_params:
+            eva_statistics[f"param:{name}"] = [points[i].get(name, kwargs.get(name, defaults[name]))]
+        eva_statistics["seconds"] = seconds
+        eva_statistics["task_seconds"] = task_seconds
+        eva_statistics["prefix_seconds"] = prefix_seconds[i]
+        rows.append(eva_statistics)
+    return pd.concat(rows, ignore_index=True)
@@ -19,8 +19,11 @@ Website: https://hu-berlin.de/rubensson
 E-Mail: {firstname.lastname}@hu-berlin.de
 '''
 
+import numpy as np
 import pandas as pd
-from ...utils.data_processing import get_activity_statistics
+from ...utils.data_processing import (
+    get_all_activity_statistics, 
+    add_activity_position_percase)
 
 #####################
 ### COALESCING and FILTERING
@@ -96,10 +99,51 @@ def coalesce_repeating_events(
     df.loc[condition, IGNORE_COL] = 1
     if drop_events:
         indices_to_drop = df.loc[df[IGNORE_COL].isin([1])].index
-        df.drop(indices_to_drop)
+        df = df.drop(indices_to_drop)
 
     return df
 
+def return_coalescing_mask(
+        df,
+        coalescing_classes: dict,
+        ACT_COL="concept:name",
+        ORDER_COL="order:position",
+        MAXORDER_COL="order:position:max"):
+    '''
+    Returns a boolean mask of the events to coalesce (i.e., to ignore) for all 
+    coalescing classes at once.
+
+    Parameters
+    ----------
+    coalescing_classes (dict): 
+        Maps each coalescing type ('first', 'last') to a list of activities. 
+        'first' keeps the first event of an activity in a case, 'last' the last.
+    '''
+    condition = np.zeros(len(df), dtype=bool)
+    for coalesc_type, activity_list in coalescing_classes.items():
+        activity_mask = df[ACT_COL].isin(activity_list).to_numpy()
+        if coalesc_type == "first":
+            condition |= activity_mask & (df[ORDER_COL] > 0).to_numpy()
+        elif coalesc_type == "last":
+            condition |= activity_mask & (df[ORDER_COL] < df[MAXORDER_COL]).to_numpy()
+        else:
+            raise ValueError("coalesc_type must be 'first' or 'last'")
+    return condition
+
+def return_coalescing_classes(df_act_statistics) -> dict:
+    '''Classifies activities by their statistics and returns the activities 
+    per coalescing type (e.g., {'first': [...], 'last': [...]}).
+    '''
+    df_act_statistics = df_act_statistics.copy()
+    df_act_statistics['activity:behavior:class'] = df_act_statistics.apply(classify_activity_behavior, axis=1)
+    df_act_statistics['coalescing:class'] = df_act_statistics.apply(classify_coalescing_method, axis=1)
+    return {
+        coalesc_type: df_act_statistics.loc[
+            df_act_statistics['coalescing:class'] == coalesc_type
+        ].index.tolist()
+        for coalesc_type in df_act_statistics['coalescing:class'].dropna().unique()
+    }
+
 # Coalescing orchestrator
 def apply_coalescing_to_dataframe(
         df, 
@@ -109,31 +153,71 @@ def apply_coalescing_to_dataframe(
         MAXORDER_COL="order:position:max", 
         IGNORE_COL="events:ignore",
         reset_ignore_col=False,
-        drop_events = False):
+        drop_events = False,
+        df_act_statistics=None):
     '''Coalescs events in a dataframe.
+
+    The events of all coalescing classes are marked with one mask. With 
+    `drop_events`, the marked events are removed at once (no `IGNORE_COL`); 
+    otherwise, they are marked with 1 in `IGNORE_COL`. Precomputed activity 
+    statistics (e.g., of `compute_activity_statistics_from_chunks`) can be 
+    passed with `df_act_statistics`.
     '''
     
     # Extract activity statistics as a matrix
-    df_act_statistics = df.groupby(ACT_COL, sort=False).apply(get_activity_statistics)
+    if df_act_statistics is None:
+        df_act_statistics = get_all_activity_statistics(df, ACT_COL=ACT_COL, CASE_COL=CASE_COL)
     # define coalescing classes
-    df_act_statistics['activity:behavior:class'] = df_act_statistics.apply(classify_activity_behavior, axis=1)
-    df_act_statistics['coalescing:class'] = df_act_statistics.apply(classify_coalescing_method, axis=1)
-    #print(df_act_statistics['coalescing:class'].unique())
-    #test = df_act_statistics.copy()
-    # create a new column with coalescing class in dataframe
-    for coalesc_type in df_act_statistics['coalescing:class'].dropna().unique():
-        activity_list = df_act_statistics.loc[
-            df_act_statistics['coalescing:class'] == coalesc_type
-        ].index.tolist()
-        df = coalesce_repeating_events(
-            df, 
-            activity_list=activity_list, 
-            coalesc_type=coalesc_type, 
+    coalescing_classes = return_coalescing_classes(df_act_statistics)
+    if not coalescing_classes:
+        return df
+    # mark the events of all coalescing classes
+    condition = return_coalescing_mask(
+        df, 
+        coalescing_classes,
+        ACT_COL=ACT_COL,
+        ORDER_COL=ORDER_COL,
+        MAXORDER_COL=MAXORDER_COL)
+    if drop_events:
+        # compact the dataframe once
+        return df.loc[~condition]
+    if IGNORE_COL not in df.columns or reset_ignore_col:
+        df[IGNORE_COL] = 0
+    df.loc[condition, IGNORE_COL] = 1
+    return df
+
+def apply_coalescing_to_chunks(
+        chunks,
+        df_act_statistics,
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp",
+        ORDER_COL="order:position",
+        MAXORDER_COL="order:position:max"):
+    '''
+    Coalesces events chunk by chunk with the statistics of the whole log, 
+    e.g., for logs that do not fit into memory:
+
+        stats = compute_activity_statistics_from_chunks(iter_xes_chunks(path))
+        for chunk in apply_coalescing_to_chunks(iter_xes_chunks(path), stats): ...
+
+    Each case must be complete in its chunk. Yields the chunks with the 
+    positions per case (see `add_activity_position_percase`) and without the 
+    coalesced events.
+    '''
+    coalescing_classes = return_coalescing_classes(df_act_statistics)
+    for chunk in chunks:
+        chunk = add_activity_position_percase(
+            chunk, 
+            CASE_COL=CASE_COL, 
+            ACT_COL=ACT_COL, 
+            TIME_COL=TIME_COL, 
+            ORDER_COL=ORDER_COL, 
+            MAXORDER_COL=MAXORDER_COL)
+        condition = return_coalescing_mask(
+            chunk, 
+            coalescing_classes,
             ACT_COL=ACT_COL,
-            CASE_COL=CASE_COL,
             ORDER_COL=ORDER_COL,
-            MAXORDER_COL=MAXORDER_COL,
-            IGNORE_COL=IGNORE_COL,
-            reset_ignore_col=reset_ignore_col,
-            drop_events=drop_events)
-    return df
\ No newline at end of file
+            MAXORDER_COL=MAXORDER_COL)
+        yield chunk.loc[~condition]
@@ -19,8 +19,14 @@ Website: https://hu-berlin.de/rubensson
 E-Mail: {firstname.lastname}@hu-berlin.de
 '''
 
+import os
 from cdlib import algorithms
-from ..visualization.modeldiscovery import discover_dependency_graph
+from ..visualization.modeldiscovery import (
+    discover_dependency_graph, 
+    compute_dependency_tables, 
+    build_dependency_graph)
+from ...utils.data_processing import map_dict_to_col
+from concurrent.futures import ProcessPoolExecutor
 import networkx as nx
 import pandas as pd
 
@@ -28,31 +34,130 @@ import pandas as pd
 ### COMMUNITY DETECTION
 #####################
 
+def detect_communities(G, type="leiden", seed=None, initial_membership=None):
+    '''
+    Discovers the communities of one graph.
+
+    Returns the communities (lists of node labels) and the community index of 
+    each node (in node order), which can be passed as `initial_membership` to 
+    warm-start the Leiden algorithm on a graph with the same nodes.
+    '''
+    # Map string node labels to integers
+    node_mapping = {name: i for i, name in enumerate(G.nodes())}
+    G_int = nx.relabel_nodes(G, node_mapping)
+
+    if type == "leiden":
+        coms = algorithms.leiden(G_int, initial_membership=initial_membership, seed=seed)
+        # Map back to original node labels
+        reverse_mapping = {v: k for k, v in node_mapping.items()}
+        communities_original = [
+            [reverse_mapping[n] for n in com]
+            for com in coms.communities
+        ]
+        membership = [0] * len(node_mapping)
+        for community_number, com in enumerate(coms.communities):
+            for n in com:
+                membership[n] = community_number
+        return communities_original, membership
+    raise ValueError(f"Community detection type '{type}' not implemented.")
+
+def _detect_communities(args):
+    '''Discovers the communities of one graph (worker of `discover_communities_in_graph`).'''
+    G, type, seed = args
+    communities_original, _ = detect_communities(G, type=type, seed=seed)
+    return communities_original
+
 def discover_communities_in_graph(
-        Graphs: list, type="leiden"):
+        Graphs: list, type="leiden", n_jobs=1, seed=None):
     '''Discover communities in a list of NetworkX graphs.
+
+    With `n_jobs` other than 1, the graphs are processed in parallel processes 
+    (-1 uses all CPUs). A `seed` makes the Leiden algorithm deterministic; 
+    each graph uses the same seed, hence the result does not depend on `n_jobs`.
     '''
-    community_list = {}
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    tasks = [(G, type, seed) for G in Graphs]
+    if n_jobs == 1 or len(tasks) <= 1:
+        communities = [_detect_communities(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+            communities = list(executor.map(_detect_communities, tasks))
 
-    for G in Graphs:
-        # Map string node labels to integers
-        node_mapping = {name: i for i, name in enumerate(G.nodes())}
-        G_int = nx.relabel_nodes(G, node_mapping)
-
-        if type == "leiden":
-            coms = algorithms.leiden(G_int)
-            # Map back to original node labels
-            reverse_mapping = {v: k for k, v in node_mapping.items()}
-            communities_original = [
-                [reverse_mapping[n] for n in com]
-                for com in coms.communities
-            ]
-            community_list[getattr(G, "name", str(G))] = communities_original
-        else:
-            raise ValueError(f"Community detection type '{type}' not implemented.")
+    community_list = {}
+    for G, communities_original in zip(Graphs, communities):
+        community_list[getattr(G, "name", str(G))] = communities_original
 
     return community_list
 
+def sweep_dependency_thresholds(
+        df: pd.DataFrame,
+        thresholds: list,
+        ACT_COL="concept:name",
+        LEVEL_COL="stage:number",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp",
+        type="leiden",
+        seed=None,
+        warm_start=True) -> dict:
+    '''
+    Discovers the dependency graphs and communities per stage for several 
+    dependency thresholds.
+
+    The dependency measures of all stages are computed once (see 
+    `compute_dependency_tables`); each threshold then only filters the edges. 
+    The graphs of a stage have the same nodes for all thresholds, hence, with 
+    `warm_start`, the Leiden algorithm starts from the partition of the 
+    neighbouring threshold. Thresholds are processed from high to low, i.e., 
+    each run starts from the finer partition of a sparser graph and merges 
+    communities (starting from a coarser partition would keep nodes without 
+    edges in their previous communities).
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Event log with stages (e.g., after `enhance_log_for_concise_model`).
+    thresholds : list
+        Dependency thresholds to evaluate.
+    seed : int, optional
+        Seed for the Leiden algorithm.
+    warm_start : bool, default=True
+        Whether to start each Leiden run from the previous threshold's partition.
+
+    Returns
+    -------
+    dict
+        Maps each threshold to a dict with "graphs" (list of dependency graphs, 
+        see `discover_multi_dependency_graphs`) and "communities" (see 
+        `discover_communities_in_graph`).
+    '''
+    tables = compute_dependency_tables(
+        df, ACT_COL=ACT_COL, LEVEL_COL=LEVEL_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL)
+    edges_per_level = dict(list(tables["edges"].groupby(LEVEL_COL, sort=False)))
+    activities_per_level = {
+        level: group["activity"].tolist()
+        for level, group in tables["activities"].groupby(LEVEL_COL, sort=False)}
+    levels = df[LEVEL_COL].unique()
+
+    results = {}
+    memberships = {}
+    for threshold in sorted(thresholds, reverse=True):
+        graphs, community_list = [], {}
+        for level in levels:
+            G = build_dependency_graph(
+                edges_per_level.get(level, tables["edges"].iloc[:0]), 
+                activities_per_level[level], 
+                dependency_threshold=threshold)
+            G.graph["name"] = level
+            communities, membership = detect_communities(
+                G, type=type, seed=seed, 
+                initial_membership=memberships.get(level) if warm_start else None)
+            memberships[level] = membership
+            graphs.append(G)
+            community_list[level] = communities
+        results[threshold] = {"graphs": graphs, "communities": community_list}
+    return {threshold: results[threshold] for threshold in thresholds}
+
 def create_map_from_community_dictionary(community_dict):
     '''
     Create a community map from (stage, activity) -> community_number
@@ -75,6 +180,4 @@ def return_community_column(
     '''Returns community column for a dataframe.
     '''
     community_map = create_map_from_community_dictionary(community_dict)
-    return df.apply(
-        lambda row: community_map.get(
-            (row[LEVEL_COL], row[ACT_COL]), None), axis=1)
\ No newline at end of file
+    return map_dict_to_col(df, community_map, [LEVEL_COL, ACT_COL])
\ No newline at end of file
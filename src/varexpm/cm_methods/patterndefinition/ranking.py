@@ -19,22 +19,102 @@ Website: https://hu-berlin.de/rubensson
 E-Mail: {firstname.lastname}@hu-berlin.de
 '''
 
+import numpy as np
 import pandas as pd
+from ...utils.data_sketches import build_ddsketch, merge_ddsketches, ddsketch_quantiles
 
 #####################
 ### COMMUNITY AND ACTIVITY RANKING
 #####################
 
+AGG_TYPES = ["min", "max", "mean", "median", "approx_median"]
+
+RANK_COLS = [
+    "community_rank_overall",
+    "community_rank_within",
+    "activity_rank_overall",
+    "activity_rank_within",
+]
+
+def _rank_aggregates(df_ranks, sort_cols, rank_col_name, rank_within_col=None):
+    '''Sorts a table of aggregated values and adds a rank column (the position 
+    overall or, with rank_within_col, the position within each group).
+    '''
+    df_ranks = df_ranks.sort_values(sort_cols).reset_index(drop=True)
+    if rank_within_col is None:
+        # Global ranking using index
+        df_ranks[rank_col_name] = df_ranks.index# + 1
+    else:
+        # Per-group ranking using cumcount
+        df_ranks[rank_col_name] = (
+            df_ranks.groupby(rank_within_col).cumcount()# + 1
+        )
+    return df_ranks
+
+def _group_rows(df, key_cols):
+    '''Numbers the groups of df by key_cols in the sorted order of df.groupby 
+    (observed groups only) and returns the group number of each row (-1 for 
+    rows with a missing key) and a dataframe with the keys per group.
+    '''
+    codes, uniques = zip(*(pd.factorize(df[col], sort=True) for col in key_cols))
+    missing = np.logical_or.reduce([c < 0 for c in codes])
+    # numbers of the observed key combinations (in sorted order), without a 
+    # dense table over all combinations of the key values
+    observed, group_numbers = np.unique(
+        np.column_stack(codes)[~missing], axis=0, return_inverse=True)
+    group_ids = np.full(len(df), -1, dtype=np.int64)
+    group_ids[~missing] = group_numbers.reshape(-1)
+    key_codes = observed.T
+    df_keys = pd.DataFrame({
+        col: u.take(c) for col, u, c in zip(key_cols, uniques, key_codes)})
+    return group_ids, df_keys
+
+def _approximate_group_medians(values, group_ids, relative_accuracy=0.01):
+    '''Estimates the median per group number with a DDSketch.'''
+    valid = group_ids >= 0
+    sketch = build_ddsketch(group_ids[valid], values[valid], relative_accuracy)
+    num_groups = group_ids.max() + 1 if valid.any() else 0
+    return ddsketch_quantiles(sketch, [0.5])[0.5].reindex(np.arange(num_groups)).to_numpy()
+
+def _aggregate_groups(values, group_ids, agg_type, relative_accuracy=0.01):
+    '''Aggregates values (a series or dataframe) per group number (rows 
+    without a group are skipped).
+    '''
+    if agg_type == "approx_median":
+        if isinstance(values, pd.Series):
+            return _approximate_group_medians(
+                values.to_numpy(dtype=float), group_ids, relative_accuracy)
+        return np.column_stack([
+            _approximate_group_medians(values[col].to_numpy(dtype=float), group_ids, relative_accuracy)
+            for col in values.columns])
+    aggregated = values.groupby(group_ids).agg(agg_type)
+    return aggregated.drop(index=-1, errors="ignore").to_numpy()
+
+def _take_group_values(values, group_ids):
+    '''Returns the value of each row's group (NaN for rows without a group).
+    '''
+    missing = group_ids < 0
+    if not missing.any():
+        return values[group_ids]
+    row_values = np.full(len(group_ids), np.nan)
+    row_values[~missing] = values[group_ids[~missing]]
+    return row_values
+
 def rank_entities(
     df: pd.DataFrame,
     group_cols,            # list of columns to group by (e.g., ["stage", "community"])
     value_col,             # which column to aggregate (e.g., NRTIMECASE_COL)
-    agg_type="mean",       # "mean", "median", "min", "max"
+    agg_type="mean",       # "mean", "median", "min", "max", "approx_median"
     sort_cols=None,        # optional explicit sort order
     rank_col_name="rank",   # name for the new rank column
-    rank_within_col=None        # NEW: columns to restart ranking within
+    rank_within_col=None,        # NEW: columns to restart ranking within
+    relative_accuracy=0.01  # error bound of "approx_median"
 ):
     """Generic ranking function for any entity based on groupings and aggregates.
+
+    "approx_median" estimates the medians with a DDSketch (see 
+    `build_ddsketch`) within a relative error of `relative_accuracy`.
+    For logs split into shards, see `sketch_entity_values`.
     """
 
     agg_funcs = {
@@ -44,8 +124,8 @@ def rank_entities(
         "median": "median",
     }
 
-    if agg_type not in agg_funcs:
-        raise ValueError(f"agg_type must be one of {list(agg_funcs.keys())}")
+    if agg_type not in AGG_TYPES:
+        raise ValueError(f"agg_type must be one of {AGG_TYPES}")
 
     agg_name = f"{agg_type}_value"
     # Default sort = group columns + aggregated value
@@ -55,22 +135,203 @@ def rank_entities(
         sort_cols = sort_cols + [agg_name]
 
      # Extract features through aggregation
-    df_ranks = (
-        df.groupby(group_cols)[value_col]
-          .agg(agg_funcs[agg_type])
-          .reset_index(name=agg_name)
-          .sort_values(sort_cols)
-          .reset_index(drop=True)
-    )
+    if agg_type == "approx_median":
+        group_ids, df_ranks = _group_rows(df, group_cols)
+        df_ranks[agg_name] = _aggregate_groups(
+            df[value_col], group_ids, agg_type, relative_accuracy)
+    else:
+        df_ranks = (
+            df.groupby(group_cols, observed=True)[value_col]
+              .agg(agg_funcs[agg_type])
+              .reset_index(name=agg_name)
+        )
 
     # Ranking all values
-    if rank_within_col is None:
-        # Global ranking using index
-        df_ranks[rank_col_name] = df_ranks.index# + 1
+    return _rank_aggregates(df_ranks, sort_cols, rank_col_name, rank_within_col)
+
+def sketch_entity_values(
+        df: pd.DataFrame,
+        group_cols,
+        value_col,
+        relative_accuracy=0.01) -> dict:
+    '''
+    Summarizes the values per entity of one shard of a log for approximate 
+    median ranks. The sketches of all shards (e.g., computed by different 
+    workers) are merged with `merge_ddsketches` and ranked with 
+    `rank_entities_from_sketch`.
+
+    Returns
+    -------
+    dict
+        A DDSketch whose keys are tuples of the values of group_cols.
+    '''
+    group_ids, df_keys = _group_rows(df, group_cols)
+    valid = group_ids >= 0
+    sketch = build_ddsketch(
+        group_ids[valid], df[value_col].to_numpy(dtype=float)[valid], relative_accuracy)
+    keys = pd.Series(list(df_keys.itertuples(index=False, name=None)), dtype=object)
+    sketch["buckets"]["key"] = keys.take(sketch["buckets"]["key"]).to_numpy()
+    return sketch
+
+def rank_entities_from_sketch(
+        sketch: dict,
+        group_cols,
+        sort_cols=None,
+        rank_col_name="rank",
+        rank_within_col=None) -> pd.DataFrame:
+    '''Ranks the entities of a (merged) sketch of `sketch_entity_values` 
+    like `rank_entities` with agg_type="approx_median".
+    '''
+    agg_name = "approx_median_value"
+    medians = ddsketch_quantiles(sketch, [0.5])[0.5]
+    df_ranks = pd.DataFrame(list(medians.index), columns=group_cols)
+    df_ranks[agg_name] = medians.to_numpy()
+    # entities in key order, as after a groupby
+    df_ranks = df_ranks.sort_values(group_cols).reset_index(drop=True)
+    if sort_cols is None:
+        sort_cols = group_cols + [agg_name]
     else:
-        # Per-group ranking using cumcount
-        df_ranks[rank_col_name] = (
-            df_ranks.groupby(rank_within_col).cumcount()# + 1
-        )
+        sort_cols = sort_cols + [agg_name]
+    return _rank_aggregates(df_ranks, sort_cols, rank_col_name, rank_within_col)
+
+def rank_communities_and_activities(
+        df: pd.DataFrame,
+        STAGE_COL="stage:number",
+        COMM_COL="community:number",
+        ACT_COL="concept:name",
+        NRTIMECASE_COL="time:relative:normalized:case",
+        NRTIMELOG_COL="time:relative:normalized:log",
+        agg_type="median",
+        relative_accuracy=0.01
+        ) -> pd.DataFrame:
+    '''
+    Ranks the communities and the activities in communities in one pass and 
+    returns the four rank columns (RANK_COLS) aligned with df.
+
+    The ranks are the same as four `rank_entities` calls: communities are 
+    ranked by their aggregated NRTIMECASE_COL per stage (overall and within 
+    the stage), activities by their aggregated NRTIMECASE_COL (overall) and 
+    NRTIMELOG_COL (within the community) per community. The log is grouped 
+    only once per key (stage, community) and (community, activity); the 
+    ranks are then looked up per row by group number.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The event log with stages and communities.
+    STAGE_COL : str, default="stage:number"
+        Column with the stage numbers.
+    COMM_COL : str, default="community:number"
+        Column with the community numbers.
+    ACT_COL : str, default="concept:name"
+        Column with the activities.
+    NRTIMECASE_COL : str, default="time:relative:normalized:case"
+        Column used for the community ranks and the overall activity ranks.
+    NRTIMELOG_COL : str, default="time:relative:normalized:log"
+        Column used for the activity ranks within a community.
+    agg_type : str, default="median"
+        Aggregation of the values per group ("mean", "median", "min", "max", 
+        or "approx_median").
+    relative_accuracy : float, default=0.01
+        Error bound of the medians with agg_type="approx_median".
+
+    Returns
+    -------
+    pd.DataFrame
+        The columns in RANK_COLS (NaN for events without a community).
+    '''
+    if agg_type not in AGG_TYPES:
+        raise ValueError(f"agg_type must be one of {AGG_TYPES}")
+    return _rank_community_and_activity_groups(
+        df, 
+        lambda cols, group_ids: _aggregate_groups(
+            df[cols[0]] if len(cols) == 1 else df[cols], group_ids, agg_type, relative_accuracy),
+        f"{agg_type}_value",
+        STAGE_COL=STAGE_COL, COMM_COL=COMM_COL, ACT_COL=ACT_COL,
+        NRTIMECASE_COL=NRTIMECASE_COL, NRTIMELOG_COL=NRTIMELOG_COL)
+
+def _rank_community_and_activity_groups(
+        df, aggregate, agg_name, STAGE_COL, COMM_COL, ACT_COL, NRTIMECASE_COL, NRTIMELOG_COL):
+    '''Ranks the communities and activities of the rows of df (see 
+    `rank_communities_and_activities`), where aggregate(cols, group_ids) 
+    returns the aggregated values of the columns per group number.
+    '''
+    # Communities: one grouping per (stage, community)
+    comm_ids, df_comm = _group_rows(df, [STAGE_COL, COMM_COL])
+    df_comm[agg_name] = aggregate([NRTIMECASE_COL], comm_ids)
+    df_comm["group"] = np.arange(len(df_comm))
+    df_comm = _rank_aggregates(df_comm, [STAGE_COL, agg_name], RANK_COLS[0])
+    df_comm[RANK_COLS[1]] = df_comm.groupby(STAGE_COL).cumcount()
+    df_comm = df_comm.sort_values("group")
+    comm_rank_overall = df_comm[RANK_COLS[0]].to_numpy()
+
+    # Activities: one grouping per (community, activity) for both time columns
+    df_keys = pd.DataFrame({
+        "community": np.where(comm_ids < 0, np.nan, comm_ids), 
+        ACT_COL: df[ACT_COL].array})
+    act_ids, df_act = _group_rows(df_keys, ["community", ACT_COL])
+    df_act[[NRTIMECASE_COL, NRTIMELOG_COL]] = aggregate([NRTIMECASE_COL, NRTIMELOG_COL], act_ids)
+    df_act["group"] = np.arange(len(df_act))
+    df_act[RANK_COLS[0]] = comm_rank_overall[df_act.pop("community").to_numpy(np.int64)]
+    # order the activities as grouped by (community rank, activity)
+    df_act = df_act.sort_values([RANK_COLS[0], ACT_COL])
+    act_rank_overall = _rank_aggregates(
+        df_act, [RANK_COLS[0], NRTIMECASE_COL], RANK_COLS[2]).sort_values("group")
+    act_rank_within = _rank_aggregates(
+        df_act, [RANK_COLS[0], NRTIMELOG_COL], RANK_COLS[3], 
+        rank_within_col=RANK_COLS[0]).sort_values("group")
+
+    # Write the ranks of each row's groups
+    return pd.DataFrame({
+        RANK_COLS[0]: _take_group_values(comm_rank_overall, comm_ids),
+        RANK_COLS[1]: _take_group_values(df_comm[RANK_COLS[1]].to_numpy(), comm_ids),
+        RANK_COLS[2]: _take_group_values(act_rank_overall[RANK_COLS[2]].to_numpy(), act_ids),
+        RANK_COLS[3]: _take_group_values(act_rank_within[RANK_COLS[3]].to_numpy(), act_ids),
+    }, index=df.index)
+
+def _merged_sketch_medians(sketch, group_ids):
+    '''Estimates the median per group number from a DDSketch whose keys are 
+    row numbers (the buckets of the rows of a group are merged).
+    '''
+    buckets = sketch["buckets"]
+    groups = group_ids[buckets["key"].to_numpy(dtype=np.int64)]
+    valid = groups >= 0
+    merged = merge_ddsketches([{
+        "relative_accuracy": sketch["relative_accuracy"],
+        "buckets": buckets.loc[valid].assign(key=groups[valid])}])
+    num_groups = group_ids.max() + 1 if (group_ids >= 0).any() else 0
+    return ddsketch_quantiles(merged, [0.5])[0.5].reindex(np.arange(num_groups)).to_numpy()
+
+def rank_communities_and_activities_from_sketches(
+        df_keys: pd.DataFrame,
+        sketches: dict,
+        STAGE_COL="stage:number",
+        COMM_COL="community:number",
+        ACT_COL="concept:name",
+        NRTIMECASE_COL="time:relative:normalized:case",
+        NRTIMELOG_COL="time:relative:normalized:log") -> pd.DataFrame:
+    '''
+    Ranks the communities and activities like `rank_communities_and_activities`
+    with agg_type="approx_median", but from one row per (stage, activity) 
+    and the DDSketches of their times, e.g., merged over the shards of a log.
+
+    Parameters
+    ----------
+    df_keys : pd.DataFrame
+        One row per (stage, activity) with STAGE_COL, COMM_COL, and ACT_COL.
+    sketches : dict
+        Maps NRTIMECASE_COL and NRTIMELOG_COL to a DDSketch (see 
+        `build_ddsketch`) whose keys are the row numbers of df_keys.
 
-    return df_ranks
\ No newline at end of file
+    Returns
+    -------
+    pd.DataFrame
+        The columns in RANK_COLS aligned with df_keys.
+    '''
+    def aggregate(cols, group_ids):
+        medians = [_merged_sketch_medians(sketches[col], group_ids) for col in cols]
+        return medians[0] if len(cols) == 1 else np.column_stack(medians)
+    return _rank_community_and_activity_groups(
+        df_keys, aggregate, "approx_median_value",
+        STAGE_COL=STAGE_COL, COMM_COL=COMM_COL, ACT_COL=ACT_COL,
+        NRTIMECASE_COL=NRTIMECASE_COL, NRTIMELOG_COL=NRTIMELOG_COL)
@@ -26,24 +26,118 @@ import numpy as np
 ### STAGE CREATION
 #####################
 
-# TODO: Add different types of time windowing
+STAGE_TYPES = ["equal", "quantile", "adaptive"]
+
+def _return_stage_edges(sorted_values, num_stages, type="equal"):
+    '''
+    Returns the bin edges for `num_stages` stages from sorted values (without NaN).
+
+    - "equal": equally spaced edges between the smallest and largest value.
+    - "quantile": edges at the quantiles, i.e., stages with about the same number of events.
+    - "adaptive": quantile edges moved to the largest gap between consecutive 
+      values within a quarter of a stage (in events) around each quantile, hence 
+      stages are balanced but split the times where events are sparse.
+    '''
+    min_val, max_val = sorted_values[0], sorted_values[-1]
+    if type == "equal":
+        # compute equally spaced bin edges
+        return np.linspace(min_val, max_val, num_stages + 1)
+    quantile_edges = np.quantile(sorted_values, np.linspace(0, 1, num_stages + 1))
+    if type == "quantile":
+        return quantile_edges
+    # adaptive: cut in the largest gap near each interior quantile
+    gaps = np.diff(sorted_values)
+    n = len(sorted_values)
+    edges = quantile_edges.copy()
+    window = max(n // (4 * num_stages), 1)
+    for i in range(1, num_stages):
+        center = int(round(i * (n - 1) / num_stages))
+        lo, hi = max(center - window, 0), min(center + window, n - 1)
+        if hi <= lo:
+            continue
+        j = lo + np.argmax(gaps[lo:hi])
+        if gaps[j] > 0:
+            edges[i] = (sorted_values[j] + sorted_values[j + 1]) / 2
+    return np.maximum.accumulate(edges)
+
+def _assign_stages(values, edges, dense=False):
+    '''
+    Assigns each value to its bin (right-closed, the first bin includes the 
+    lowest edge, as `pd.cut(..., include_lowest=True)`). With `dense`, empty 
+    bins are skipped in the numbering.
+    '''
+    stages = np.searchsorted(edges, values, side="left") - 1
+    stages = np.clip(stages, 0, len(edges) - 2)
+    if dense:
+        _, stages = np.unique(stages, return_inverse=True)
+    return stages
+
 def return_timewindows_column(
         df,
         NRTIMECASE_COL="time:relative:normalized:case",
         num_stages=5,
-        type="equal"
+        type="equal",
+        value_range=None
     ):
-    '''Creates stages by binning the timestamps in a dataframe.
     '''
-    
+    Creates stages by binning the timestamps in a dataframe.
+
+    The times are sorted once, and events are assigned to stages with 
+    `np.searchsorted` on the bin edges.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The event log with normalized relative times.
+    NRTIMECASE_COL : str
+        The column to bin.
+    num_stages : int or list of int
+        Number of stages. With a list, returns one stage column per number of 
+        stages (columns named by the number), computed from the same sorted times.
+    type : str
+        "equal" (equally wide time windows), "quantile" (equally many events 
+        per stage), or "adaptive" (balanced stages cut at sparse times). 
+        Stages that would be empty (e.g., ties at the quantiles) are skipped, 
+        hence "quantile" and "adaptive" can return fewer stages.
+    value_range : tuple, optional
+        (min, max) of the values in the whole log, to create "equal" stages 
+        for a part of a log (e.g., a shard of cases).
+
+    Returns
+    -------
+    pd.Series, pd.DataFrame, or 0
+        The stage number per event (0 for a single stage).
+    '''
+    if type not in STAGE_TYPES:
+        raise ValueError(f"type must be one of {STAGE_TYPES}")
+    if value_range is not None and type != "equal":
+        raise ValueError("value_range requires type='equal'")
+    multiple = isinstance(num_stages, (list, tuple))
+    stage_counts = list(num_stages) if multiple else [num_stages]
+
     col = df[NRTIMECASE_COL]
-    min_val, max_val = col.min(), col.max()
-    # compute equally spaced bin edges
-    edges = np.linspace(min_val, max_val, num_stages + 1)
-
-    # cut into bins
-    if num_stages <= 1:
-        return 0
-    else:
-        return pd.cut(
-            col, bins=edges, labels=False, include_lowest=True)
+    values = col.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    sorted_values = np.sort(values[valid])
+
+    stages = {}
+    for count in stage_counts:
+        if count <= 1 or len(sorted_values) == 0:
+            stages[count] = 0
+            continue
+        if value_range is not None:
+            edges = np.linspace(value_range[0], value_range[1], count + 1)
+        else:
+            edges = _return_stage_edges(sorted_values, count, type=type)
+        assigned = _assign_stages(values[valid], edges, dense=(type != "equal"))
+        if valid.all():
+            stages[count] = pd.Series(assigned, index=df.index, name=NRTIMECASE_COL)
+        else:
+            column = np.full(len(values), np.nan)
+            column[valid] = assigned
+            stages[count] = pd.Series(column, index=df.index, name=NRTIMECASE_COL)
+
+    if not multiple:
+        return stages[num_stages]
+    return pd.DataFrame(
+        {count: stage for count, stage in stages.items()}, index=df.index)
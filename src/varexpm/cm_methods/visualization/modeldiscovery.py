@@ -19,9 +19,13 @@ Website: https://hu-berlin.de/rubensson
 E-Mail: {firstname.lastname}@hu-berlin.de
 '''
 
+import os
 import networkx as nx
+import numpy as np
 import pandas as pd
 import pm4py
+from concurrent.futures import ProcessPoolExecutor
+from ...utils.data_processing import to_pm4py_dataframe
 
 #####################
 ### DISCOVERY
@@ -30,7 +34,9 @@ import pm4py
 def discover_dependency_graph(
         df: pd.DataFrame, 
         dependency_threshold=0.5, 
-        ACT_COL="concept:name"):
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp"):
     """Discover a dependency graph from an event log.
     """
     # Create a directed graph
@@ -38,7 +44,11 @@ def discover_dependency_graph(
 
     # create dependencies matrix
     heunet = pm4py.discover_heuristics_net(
-        df, dependency_threshold=dependency_threshold, activity_key=ACT_COL)
+        to_pm4py_dataframe(df, [CASE_COL, ACT_COL, TIME_COL]), 
+        dependency_threshold=dependency_threshold, 
+        activity_key=ACT_COL, 
+        case_id_key=CASE_COL, 
+        timestamp_key=TIME_COL)
     dependency_matrix = heunet.dependency_matrix.items()
     act_list = heunet.activities
     #print(dependency_matrix)
@@ -62,19 +72,232 @@ def discover_dependency_graph(
     
     return DepG
 
+DEPENDENCY_METHODS = ["native", "pm4py"]
+
+def _encode_sorted(values):
+    '''Integer codes of values whose order follows the sorted labels.'''
+    codes, labels = pd.factorize(values)
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return np.where(codes >= 0, ranks[codes], -1), labels[order]
+
+def compute_dependency_tables(
+        df: pd.DataFrame,
+        ACT_COL="concept:name",
+        LEVEL_COL="stage:number",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp",
+        noise_threshold=0.05) -> dict:
+    '''
+    Computes the directly-follows counts and the dependency measures of the 
+    Heuristics Miner for all stages in one pass.
+
+    Events are sorted (stably) by stage, case, and timestamp. Pairs of 
+    consecutive events of the same stage and case are encoded as one integer 
+    per pair and counted. As in pm4py's Heuristics Miner, directly-follows 
+    pairs below `noise_threshold` times the largest count of an in- or 
+    outgoing pair of both activities are removed. The dependency is 
+    (a - b) / (a + b + 1) for a pair a and its reverse b, and a / (a + 1) for 
+    self-loops.
+
+    Returns
+    -------
+    dict
+        "edges": pd.DataFrame (sparse, long format) with LEVEL_COL, "source", 
+        "target", "frequency", and "dependency", ordered by stage (first 
+        appearance), source, and target; 
+        "activities": pd.DataFrame with LEVEL_COL, "activity", and "frequency", 
+        ordered by stage and descending frequency.
+    '''
+    level_codes, levels = pd.factorize(df[LEVEL_COL])
+    act_codes, activities = _encode_sorted(df[ACT_COL])
+    case_codes, _ = pd.factorize(df[CASE_COL])
+    timestamps = df[TIME_COL].dt.as_unit("ns").array.asi8
+    num_levels, num_acts = len(levels), len(activities)
+
+    # --- directly-follows pairs of all stages
+    order = np.lexsort((timestamps, case_codes, level_codes))
+    level_sorted, case_sorted, act_sorted = level_codes[order], case_codes[order], act_codes[order]
+    follows = (level_sorted[1:] == level_sorted[:-1]) & (case_sorted[1:] == case_sorted[:-1])
+    level_pairs = level_sorted[:-1][follows].astype(np.int64)
+    pair_codes = (level_pairs * num_acts + act_sorted[:-1][follows]) * num_acts + act_sorted[1:][follows]
+    num_codes = num_levels * num_acts * num_acts
+    if num_codes <= 2**24:
+        counts = np.bincount(pair_codes, minlength=num_codes)
+        pair_codes = np.flatnonzero(counts)
+        counts = counts[pair_codes]
+    else:
+        pair_codes, counts = np.unique(pair_codes, return_counts=True)
+
+    # --- activity frequencies per stage
+    valid = act_codes >= 0
+    act_pairs = level_codes[valid].astype(np.int64) * num_acts + act_codes[valid]
+    unique_pairs, first_index, act_counts = np.unique(
+        act_pairs, return_index=True, return_counts=True)
+    return build_dependency_tables(
+        levels, activities, pair_codes, counts, unique_pairs, act_counts, first_index,
+        noise_threshold=noise_threshold, LEVEL_COL=LEVEL_COL)
+
+def build_dependency_tables(
+        levels,
+        activities,
+        pair_codes,
+        pair_counts,
+        act_pairs,
+        act_counts,
+        act_first,
+        noise_threshold=0.05,
+        LEVEL_COL="stage:number") -> dict:
+    '''
+    Returns the tables of `compute_dependency_tables` from directly-follows 
+    and activity counts, e.g., summed over the shards of a log.
+
+    Parameters
+    ----------
+    levels, activities : array-like
+        Labels of the level and activity codes (levels in order of first 
+        appearance, activities sorted).
+    pair_codes, pair_counts : np.ndarray
+        Sorted unique codes (level * A + source) * A + target of the 
+        directly-follows pairs (A activities) and their counts.
+    act_pairs, act_counts, act_first : np.ndarray
+        Sorted unique codes level * A + activity, their counts, and the rank 
+        of their first appearance in the log (ties of the counts).
+    '''
+    num_levels, num_acts = len(levels), len(activities)
+    pair_codes, counts = np.asarray(pair_codes, dtype=np.int64), np.asarray(pair_counts)
+    edge_levels, rest = np.divmod(pair_codes, num_acts * num_acts)
+    sources, targets = np.divmod(rest, num_acts)
+
+    # --- noise filter (largest in- or outgoing count per stage and activity)
+    if noise_threshold > 0 and len(counts) > 0:
+        max_counts = np.full(num_levels * num_acts, -1, dtype=np.int64)
+        np.maximum.at(max_counts, edge_levels * num_acts + sources, counts)
+        np.maximum.at(max_counts, edge_levels * num_acts + targets, counts)
+        noise = counts < np.minimum(
+            max_counts[edge_levels * num_acts + sources] * noise_threshold,
+            max_counts[edge_levels * num_acts + targets] * noise_threshold)
+        pair_codes, counts = pair_codes[~noise], counts[~noise]
+        edge_levels, sources, targets = edge_levels[~noise], sources[~noise], targets[~noise]
+
+    # --- dependency measure
+    reverse_codes = (edge_levels * num_acts + targets) * num_acts + sources
+    reverse_positions = np.clip(np.searchsorted(pair_codes, reverse_codes), 0, max(len(pair_codes) - 1, 0))
+    has_reverse = (pair_codes[reverse_positions] == reverse_codes) & (sources != targets)
+    reverse_counts = np.where(has_reverse, counts[reverse_positions], 0)
+    dependency = (counts - reverse_counts) / (counts + reverse_counts + 1)
+
+    edges = pd.DataFrame({
+        LEVEL_COL: levels.take(edge_levels),
+        "source": activities[sources],
+        "target": activities[targets],
+        "frequency": counts,
+        "dependency": dependency,
+    })
+
+    # --- activity frequencies per stage (descending, ties by first appearance)
+    pair_levels, pair_acts = np.divmod(np.asarray(act_pairs, dtype=np.int64), num_acts)
+    act_order = np.lexsort((act_first, -np.asarray(act_counts), pair_levels))
+    activity_table = pd.DataFrame({
+        LEVEL_COL: levels.take(pair_levels[act_order]),
+        "activity": activities[pair_acts[act_order]],
+        "frequency": np.asarray(act_counts)[act_order],
+    })
+    return {"edges": edges, "activities": activity_table}
+
+def build_dependency_graph(
+        edges: pd.DataFrame,
+        activities: list,
+        dependency_threshold=0.5):
+    '''
+    Builds a dependency graph from the edges of one stage (see 
+    `compute_dependency_tables`) in the same way as `discover_dependency_graph`: 
+    edges with a dependency above the threshold are added, and activities 
+    without any directly-follows pair get a self-loop with weight 0.
+    '''
+    DepG = nx.DiGraph()
+    for source, target, dependency_value in zip(
+            edges["source"].tolist(), edges["target"].tolist(), edges["dependency"].tolist()):
+        DepG.add_node(source)
+        DepG.add_node(target)
+        # Only add edges with positive dependency
+        if dependency_value > dependency_threshold:
+            DepG.add_edge(source, target, weight=dependency_value)
+
+    # Add remaining nodes not in dependency matrix
+    for act in activities:
+        if act not in DepG:
+            DepG.add_edge(act, act, weight=0)
+    return DepG
+
+def build_multi_dependency_graphs(
+        tables: dict,
+        levels,
+        dependency_threshold=0.5,
+        LEVEL_COL="stage:number") -> list:
+    '''Builds the dependency graph of each level (in the given order) from 
+    the tables of `compute_dependency_tables`, e.g., for several thresholds.
+    '''
+    edges_per_level = dict(list(tables["edges"].groupby(LEVEL_COL, sort=False)))
+    activities_per_level = dict(list(tables["activities"].groupby(LEVEL_COL, sort=False)))
+    multipleDepG = []
+    for level in levels:
+        depG = build_dependency_graph(
+            edges_per_level.get(level, tables["edges"].iloc[:0]), 
+            activities_per_level[level]["activity"].tolist(), 
+            dependency_threshold=dependency_threshold)
+        depG.graph["name"] = level
+        multipleDepG.append(depG)
+    return multipleDepG
+
+def _discover_stage_dependency_graph(args):
+    '''Discovers the dependency graph of one stage (worker of `discover_multi_dependency_graphs`).'''
+    level, df_stage, dependency_threshold, ACT_COL, CASE_COL, TIME_COL = args
+    depG = discover_dependency_graph(
+        df=df_stage, 
+        dependency_threshold=dependency_threshold, 
+        ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL)
+    depG.graph["name"] = level
+    return depG
+
 def discover_multi_dependency_graphs(
         df, 
         dependency_threshold=0.5, 
         ACT_COL="concept:name", 
-        LEVEL_COL="stage:number"):
+        LEVEL_COL="stage:number",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp",
+        n_jobs=1,
+        method="native"):
     """Discover multiple dependency graphs, one for each stage.
+
+    With method="native", the dependency measures of all stages are computed 
+    in one pass (see `compute_dependency_tables`), with the same graphs as 
+    pm4py's Heuristics Miner. With method="pm4py", one heuristics net is 
+    discovered per stage; with `n_jobs` other than 1, the stages are then 
+    processed in parallel processes (-1 uses all CPUs). Each process only 
+    receives the case, activity, and timestamp columns of its stage.
     """
-    multipleDepG = []
+    if method not in DEPENDENCY_METHODS:
+        raise ValueError(f"method must be one of {DEPENDENCY_METHODS}")
     levels = df[LEVEL_COL].unique()
-    for level in levels:
-        depG = discover_dependency_graph(
-            df=df.loc[df[LEVEL_COL].isin([level])], 
-            dependency_threshold=dependency_threshold, ACT_COL=ACT_COL)
-        depG.graph["name"] = level
-        multipleDepG.append(depG)
-    return multipleDepG
\ No newline at end of file
+    if method == "native":
+        tables = compute_dependency_tables(
+            df, ACT_COL=ACT_COL, LEVEL_COL=LEVEL_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL)
+        return build_multi_dependency_graphs(
+            tables, levels, dependency_threshold=dependency_threshold, LEVEL_COL=LEVEL_COL)
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    tasks = [
+        (level, df.loc[df[LEVEL_COL].isin([level]), [CASE_COL, ACT_COL, TIME_COL]], 
+         dependency_threshold, ACT_COL, CASE_COL, TIME_COL)
+        for level in levels]
+    if n_jobs == 1 or len(tasks) <= 1:
+        multipleDepG = [_discover_stage_dependency_graph(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+            multipleDepG = list(executor.map(_discover_stage_dependency_graph, tasks))
+    return multipleDepG
@@ -21,6 +21,7 @@ E-Mail: {firstname.lastname}@hu-berlin.de
 
 import pandas as pd
 import numpy as np
+from ...utils.data_processing import map_dict_to_col
 
 #####################
 ### REPRESENTATIVE PROCESS EXECUTIONS
@@ -35,7 +36,7 @@ def create_caseoccurency_matrix_pergroup(
     ''' Creates a matrix with case occurencies for a group.
     '''
     stage_activity_matrix = (
-        df.groupby([STAGE_COL, ACT_COL])[CASE_COL]
+        df.groupby([STAGE_COL, ACT_COL], observed=True)[CASE_COL]
         .nunique()              # Count cases
         .unstack(fill_value=0)  # Convert activities to columns
         )
@@ -45,10 +46,14 @@ def get_most_common_activities_per_stage_column(
         df: pd.DataFrame, 
         ACT_COL="concept:name", 
         CASE_COL="case:concept:name", 
-        STAGE_COL="stage:number"):
+        STAGE_COL="stage:number",
+        stage_activity_matrix=None):
     '''Define most common activitites per group (stage).
+    The case occurencies (see `create_caseoccurency_matrix_pergroup`) can be 
+    passed with `stage_activity_matrix`, e.g., summed over shards of a log.
     '''
-    stage_activity_matrix = create_caseoccurency_matrix_pergroup(df, ACT_COL=ACT_COL, CASE_COL=CASE_COL, STAGE_COL=STAGE_COL)
+    if stage_activity_matrix is None:
+        stage_activity_matrix = create_caseoccurency_matrix_pergroup(df, ACT_COL=ACT_COL, CASE_COL=CASE_COL, STAGE_COL=STAGE_COL)
     common_stages = stage_activity_matrix.idxmax().to_dict()
     #print(common_stages.items())
     #common_stages_tuples = {(k, i): 1 for k, values in common_stages.items() for i in values}
@@ -56,8 +61,7 @@ def get_most_common_activities_per_stage_column(
         (act, stage): 1
         for act, stage in common_stages.items()
     }
-    return df.apply(
-        lambda row: common_stages_tuples.get((row[ACT_COL], row[STAGE_COL]), 0), axis=1)
+    return map_dict_to_col(df, common_stages_tuples, [ACT_COL, STAGE_COL], fill_value=0)
 
 def define_multiactivity_column(
         df:pd.DataFrame, 
@@ -97,7 +101,11 @@ def define_multiactivity_column(
     for col, values in conditions:
         mask &= df[col].isin(values)
     
-    return df[ACT_COL].where(mask, hide_activities_value)
+    activities = df[ACT_COL]
+    if (isinstance(activities.dtype, pd.CategoricalDtype) 
+            and hide_activities_value not in activities.cat.categories):
+        activities = activities.cat.add_categories([hide_activities_value])
+    return activities.where(mask, hide_activities_value)
 
 def shorten_list_int_values(values: list[int]) -> str:
     if not values:
@@ -148,9 +156,10 @@ def create_hiddencommunities_perstage_dict(
         HACT_COL = "concept:name:rep",
         hide_activities_value="hidden"
         ):
-    # Group and extract unique activities for each stage and community
-    group = df.groupby([STAGE_COL, COMM_RANK_COL])[HACT_COL].unique()
-    empty_comms = group.index[group.isin([[hide_activities_value]])].to_list()
+    # Communities (per stage) whose activities are all hidden
+    hidden = df[HACT_COL] == hide_activities_value
+    all_hidden = hidden.groupby([df[STAGE_COL], df[COMM_RANK_COL]], observed=True).all()
+    empty_comms = all_hidden.index[all_hidden.to_numpy()].to_list()
 
     merge_dict = {}
     for comm in empty_comms:
@@ -165,6 +174,37 @@ def create_hiddencommunities_perstage_dict(
     
     return merge_dict_summarized
 
+def _as_labels(values) -> pd.Series:
+    '''Returns the values as strings (as `pd.Series.astype(str)`).'''
+    return pd.Series(values).astype(str).reset_index(drop=True)
+
+def _broadcast_labels(key_codes, labels) -> pd.Categorical:
+    '''Returns a categorical column from the key code of each row and the 
+    label of each key (equal labels of different keys share one category).
+    The categories are sorted, as for the factorized string labels before.
+    '''
+    label_codes, categories = pd.factorize(np.asarray(labels, dtype=object), sort=True)
+    categorical = pd.Categorical.from_codes(label_codes[key_codes], categories=categories)
+    return categorical.remove_unused_categories()
+
+def _label_hidden_activities(df, hidden, MULTIACT_COL, key_cols, build_labels):
+    '''Labels each row with its representative activity or, for hidden 
+    activities, with a label of its key_cols. The labels are built once per 
+    unique value and key (not per row).
+    '''
+    multiact_codes, multiacts = pd.factorize(df[MULTIACT_COL], use_na_sentinel=False)
+    # number the keys of the hidden rows
+    codes, uniques = zip(*(
+        pd.factorize(df.loc[hidden, col], use_na_sentinel=False) for col in key_cols))
+    dims = [max(len(u), 1) for u in uniques]
+    key_codes, keys = pd.factorize(np.ravel_multi_index(codes, dims))
+    key_values = np.unravel_index(keys, dims)
+    key_labels = build_labels(*(
+        _as_labels(u.take(c)) for u, c in zip(uniques, key_values)))
+    row_codes = multiact_codes.copy()
+    row_codes[hidden] = len(multiacts) + key_codes
+    return _broadcast_labels(row_codes, pd.concat([_as_labels(multiacts), key_labels]))
+
 def create_column_withnames_for_hiddenactivities(
         df: pd.DataFrame, 
         MULTIACT_COL = "concept:name:multiact",
@@ -172,16 +212,24 @@ def create_column_withnames_for_hiddenactivities(
         STAGE_COL = "stage:number",
         COMM_RANK_COL="community_rank_overall",
         changing_type="stage+name"):
-    if changing_type == "stage":
-        return df[STAGE_COL].where(df[MULTIACT_COL] == "hidden", df[MULTIACT_COL]).astype(str)
-    elif changing_type == "stage+name":
-        return np.where(
-            df[MULTIACT_COL] == "hidden",
-            "_" + df[STAGE_COL].astype(str) + "_" + df[ACT_COL].astype(str),
-            df[MULTIACT_COL].astype(str)
-        )
+    '''Returns a categorical column with the names of the representative 
+    activities, where hidden activities are named by their stage ("stage"), 
+    their stage and activity ("stage+name"), or where communities are named 
+    by the summarized communities of their stage with only hidden activities 
+    ("community_sum").
+    '''
+    if changing_type in ["stage", "stage+name"]:
+        hidden = (df[MULTIACT_COL] == "hidden").to_numpy()
+        if changing_type == "stage":
+            return _label_hidden_activities(
+                df, hidden, MULTIACT_COL, [STAGE_COL], lambda stages: stages)
+        return _label_hidden_activities(
+            df, hidden, MULTIACT_COL, [STAGE_COL, ACT_COL], 
+            lambda stages, acts: "_" + stages + "_" + acts)
     elif changing_type == "community_sum":
         merge_dict = create_hiddencommunities_perstage_dict(df)
-        return df[COMM_RANK_COL].map(lambda v: merge_dict.get(v, v)).astype(str)
+        comm_codes, comms = pd.factorize(df[COMM_RANK_COL], use_na_sentinel=False)
+        labels = _as_labels(pd.Series(comms).map(lambda v: merge_dict.get(v, v)))
+        return _broadcast_labels(comm_codes, labels)
     else:
-        raise ValueError(f"changing_type must be: 'stage', 'stage+name', or 'community_sum'")
\ No newline at end of file
+        raise ValueError(f"changing_type must be: 'stage', 'stage+name', or 'community_sum'")
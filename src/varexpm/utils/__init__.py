@@ -19,6 +19,34 @@ Website: https://hu-berlin.de/rubensson
 E-Mail: {firstname.lastname}@hu-berlin.de
 '''
 
-from .data_importing import load_event_log
+from .data_importing import load_event_log, read_tabular_event_log
+from .data_xesreader import iter_xes_chunks, read_xes_chunked, read_xes_parallel
+from .data_caching import (
+    clear_event_log_cache,
+    get_cache_stats,
+    reset_cache_stats
+)
+from .data_sketches import (
+    summarize_activity_statistics,
+    merge_activity_statistics,
+    finalize_activity_statistics,
+    compute_activity_statistics_from_chunks
+)
+from .profiling import create_profile_report, export_chrome_trace
 
-__all__ = ["load_event_log"]
\ No newline at end of file
+__all__ = [
+    "load_event_log",
+    "read_tabular_event_log",
+    "iter_xes_chunks",
+    "read_xes_chunked",
+    "read_xes_parallel",
+    "clear_event_log_cache",
+    "get_cache_stats",
+    "reset_cache_stats",
+    "summarize_activity_statistics",
+    "merge_activity_statistics",
+    "finalize_activity_statistics",
+    "compute_activity_statistics_from_chunks",
+    "create_profile_report",
+    "export_chrome_trace",
+]
\ No newline at end of file
@@ -0,0 +1,214 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import hashlib
+import json
+import os
+import pandas as pd
+import warnings
+from pathlib import Path
+
+#####################
+### EVENT LOG CACHE (COLUMNAR)
+#####################
+
+CACHE_FOLDERNAME = "cache"
+
+# Counters for the current session (see get_cache_stats)
+_CACHE_STATS = {"hits": 0, "misses": 0, "writes": 0, "invalidations": 0}
+
+# Whether the missing-pyarrow warning was already issued
+_FEATHER_WARNED = False
+
+def get_cache_stats() -> dict:
+    '''Returns a copy of the hit/miss counters of the event log cache.'''
+    return dict(_CACHE_STATS)
+
+def reset_cache_stats():
+    '''Sets all counters of the event log cache to zero.'''
+    for key in _CACHE_STATS:
+        _CACHE_STATS[key] = 0
+
+def get_default_cache_dir() -> Path:
+    '''Returns the default cache folder ("data/cache").'''
+    return Path(__file__).parent.parent.parent.parent / "data" / CACHE_FOLDERNAME
+
+def _import_feather():
+    '''Returns the pyarrow feather module or None if pyarrow is not installed.
+    The cache is then skipped, with one warning per session.
+    '''
+    global _FEATHER_WARNED
+    try:
+        from pyarrow import feather
+    except ImportError:
+        if not _FEATHER_WARNED:
+            warnings.warn(
+                "Event log cache is disabled. Install 'pyarrow' to enable it.",
+                stacklevel=3)
+            _FEATHER_WARNED = True
+        return None
+    return feather
+
+def file_content_hash(path) -> str:
+    '''Returns the sha256 hash of a file's content.'''
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def _cache_entry_paths(path: Path, cache_dir: Path, options: dict | None):
+    '''Returns the data and metadata paths of the cache entry for a source file.
+
+    The entry is keyed by the resolved source path and the reader options,
+    hence different reader settings do not overwrite each other.
+    '''
+    key = json.dumps(
+        {"path": str(Path(path).resolve()), "options": options or {}},
+        sort_keys=True, default=str)
+    name = hashlib.sha256(key.encode()).hexdigest()[:24]
+    return cache_dir / f"{name}.feather", cache_dir / f"{name}.json"
+
+def read_cached_event_log(
+        path, 
+        cache_dir=None, 
+        options: dict | None = None,
+        columns: list | None = None) -> pd.DataFrame | None:
+    '''
+    Returns the cached dataframe of an event log file or None on a cache miss.
+
+    An entry is valid if size, modification time and content hash of the source 
+    file are unchanged. The content hash is only recomputed if the size is 
+    unchanged but the modification time differs (e.g., after copying a file).
+
+    Parameters
+    ----------
+    path : str or Path
+        Path to the source event log file.
+    cache_dir : str or Path, optional
+        Folder of the cache (default: "data/cache").
+    options : dict, optional
+        Reader options that are part of the cache key.
+    columns : list, optional
+        Columns to read from the cache file (None reads all columns). 
+        Entries written from a projected parse only serve requests for a 
+        subset of their columns.
+    '''
+    feather = _import_feather()
+    if feather is None:
+        return None
+    cache_dir = Path(cache_dir) if cache_dir is not None else get_default_cache_dir()
+    data_path, meta_path = _cache_entry_paths(path, cache_dir, options)
+    if not (data_path.exists() and meta_path.exists()):
+        _CACHE_STATS["misses"] += 1
+        return None
+
+    meta = json.loads(meta_path.read_text())
+    stat = os.stat(path)
+    if stat.st_size != meta["size"]:
+        _CACHE_STATS["misses"] += 1
+        return None
+    if stat.st_mtime_ns != meta["mtime_ns"]:
+        if file_content_hash(path) != meta["sha256"]:
+            _CACHE_STATS["misses"] += 1
+            return None
+        # same content, only refresh the modification time
+        meta["mtime_ns"] = stat.st_mtime_ns
+        meta_path.write_text(json.dumps(meta))
+    if not meta.get("complete", True) and (
+            columns is None or not set(columns) <= set(meta["columns"])):
+        _CACHE_STATS["misses"] += 1
+        return None
+    if columns is not None:
+        columns = [col for col in meta["columns"] if col in columns]
+
+    # memory-map the uncompressed columnar file
+    table = feather.read_table(data_path, columns=columns, memory_map=True)
+    _CACHE_STATS["hits"] += 1
+    return table.to_pandas()
+
+def write_cached_event_log(
+        df: pd.DataFrame, 
+        path, 
+        cache_dir=None, 
+        options: dict | None = None,
+        complete=True) -> bool:
+    '''
+    Writes a dataframe of an event log file to the cache.
+    Set `complete=False` if the dataframe only contains a projection of the 
+    attributes in the file. Returns True if the entry was written.
+    '''
+    feather = _import_feather()
+    if feather is None:
+        return False
+    cache_dir = Path(cache_dir) if cache_dir is not None else get_default_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data_path, meta_path = _cache_entry_paths(path, cache_dir, options)
+    stat = os.stat(path)
+    try:
+        # uncompressed, hence the file can be memory-mapped when read
+        feather.write_feather(
+            df.reset_index(drop=True), data_path, compression="uncompressed")
+    except Exception as e:
+        print(f"Message: Event log was not cached ({type(e).__name__}: {e}).")
+        data_path.unlink(missing_ok=True)
+        return False
+    meta = {
+        "source": str(Path(path).resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_content_hash(path),
+        "options": options or {},
+        "columns": [str(col) for col in df.columns],
+        "complete": complete,
+    }
+    meta_path.write_text(json.dumps(meta, default=str))
+    _CACHE_STATS["writes"] += 1
+    return True
+
+def clear_event_log_cache(cache_dir=None, path=None) -> int:
+    '''
+    Removes entries from the event log cache.
+
+    Parameters
+    ----------
+    cache_dir : str or Path, optional
+        Folder of the cache (default: "data/cache").
+    path : str or Path, optional
+        Only remove the entries of this source file. If None, all entries are removed.
+
+    Returns
+    -------
+    int
+        Number of removed entries.
+    '''
+    cache_dir = Path(cache_dir) if cache_dir is not None else get_default_cache_dir()
+    if not cache_dir.exists():
+        return 0
+    source = str(Path(path).resolve()) if path is not None else None
+    num_removed = 0
+    for meta_path in cache_dir.glob("*.json"):
+        if source is not None:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("source") != source:
+                continue
+        meta_path.with_suffix(".feather").unlink(missing_ok=True)
+        meta_path.unlink()
+        num_removed += 1
+    _CACHE_STATS["invalidations"] += num_removed
+    return num_removed
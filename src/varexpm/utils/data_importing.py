@@ -22,15 +22,192 @@ E-Mail: {firstname.lastname}@hu-berlin.de
 import pandas as pd
 import pm4py
 from pathlib import Path
+from .data_caching import read_cached_event_log, write_cached_event_log
+from .data_xesreader import read_xes_chunked, read_xes_parallel
+
+TABULAR_SUFFIXES = (".csv", ".parquet")
+
+def _categorize_column(col: pd.Series) -> pd.Series:
+    '''Returns a categorical column with string categories.'''
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        col = col.astype("category")
+    if not pd.api.types.is_string_dtype(col.cat.categories):
+        col = col.cat.rename_categories(col.cat.categories.astype(str))
+    return col
+
+def read_tabular_event_log(
+        path,
+        column_mapping: dict | None = None,
+        columns=None,
+        timestamp_format=None,
+        sep=",",
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp") -> pd.DataFrame:
+    '''
+    Reads an event log from a CSV or Parquet file.
+
+    Only the requested columns are read. Parquet files are memory-mapped and 
+    case and activity columns are read dictionary-encoded, CSV files are read 
+    with categorical case and activity columns. In both cases, case identifiers 
+    and activities are returned as categoricals and timestamps as UTC datetimes.
+
+    Parameters
+    ----------
+    path : str or Path
+        Path to a .csv or .parquet file.
+    column_mapping : dict, optional
+        Maps source column names to the column names of the returned log, 
+        e.g., {"CaseID": "case:concept:name", "Activity": "concept:name", 
+        "Start": "time:timestamp"}.
+    columns : list, optional
+        Columns to read (names after mapping). If None, all columns are read.
+    timestamp_format : str, optional
+        Format of the timestamps in CSV files (None infers the format).
+    sep : str, default=","
+        Separator of CSV files.
+    ACT_COL, CASE_COL, TIME_COL : str
+        Column names (after mapping) for activity, case, and timestamp.
+    '''
+    path = Path(path)
+    column_mapping = column_mapping or {}
+    reverse_mapping = {target: source for source, target in column_mapping.items()}
+    source_cols = None
+    if columns is not None:
+        source_cols = [reverse_mapping.get(col, col) for col in columns]
+    case_src = reverse_mapping.get(CASE_COL, CASE_COL)
+    act_src = reverse_mapping.get(ACT_COL, ACT_COL)
+
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading .parquet files requires 'pyarrow' (pip install varexpm[io]).")
+        schema_names = pq.read_schema(path).names
+        table = pq.read_table(
+            path, 
+            columns=[col for col in schema_names if col in source_cols] if source_cols is not None else None,
+            memory_map=True,
+            read_dictionary=[col for col in (case_src, act_src) if col in schema_names])
+        df = table.to_pandas()
+    elif path.suffix == ".csv":
+        usecols = None
+        if source_cols is not None:
+            header = pd.read_csv(path, sep=sep, nrows=0).columns
+            usecols = [col for col in source_cols if col in header]
+        df = pd.read_csv(
+            path, 
+            sep=sep, 
+            usecols=usecols,
+            dtype={case_src: "category", act_src: "category"},
+            memory_map=True)
+    else:
+        raise ValueError("'path' must be a .csv or .parquet file.")
+
+    df = df.rename(columns=column_mapping)
+    for col in (CASE_COL, ACT_COL):
+        if col in df.columns:
+            df[col] = _categorize_column(df[col])
+    if TIME_COL in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[TIME_COL]):
+            if df[TIME_COL].dt.tz is None:
+                df[TIME_COL] = df[TIME_COL].dt.tz_localize("UTC")
+            else:
+                df[TIME_COL] = df[TIME_COL].dt.tz_convert("UTC")
+        else:
+            df[TIME_COL] = pd.to_datetime(df[TIME_COL], utc=True, format=timestamp_format)
+    return df
 
 def load_event_log(
-        filename: str, foldername="event_data") -> pd.DataFrame:
-    """Loads an event log from the specified folder and filename."""
+        filename: str, 
+        foldername="event_data",
+        reader="pm4py",
+        chunk_size=100_000,
+        columns=None,
+        n_jobs=1,
+        column_mapping=None,
+        timestamp_format=None,
+        use_cache=False,
+        refresh_cache=False,
+        cache_dir=None) -> pd.DataFrame:
+    """Loads an event log from the specified folder and filename.
+
+    Supported formats are .xes, .csv, and .parquet. CSV and Parquet files are 
+    read with `read_tabular_event_log`, where `column_mapping` maps source 
+    columns onto the standard names (e.g., {"CaseID": "case:concept:name"}) 
+    and `timestamp_format` defines the format of CSV timestamps.
+
+    With `reader="stream"`, the file is parsed incrementally in case-complete 
+    chunks of `chunk_size` events and case identifiers and activities are 
+    returned as categoricals (see `read_xes_chunked`). This bounds the peak 
+    memory for very large logs. The default `reader="pm4py"` uses `pm4py.read_xes`.
+    With `reader="stream"` and `n_jobs` other than 1, the file is split at 
+    `<trace>` boundaries and the blocks are parsed in a process pool 
+    (see `read_xes_parallel`; -1 uses all CPUs).
+
+    `columns` restricts the returned attributes (case attributes with "case:" 
+    prefix). The stream reader skips all other attributes while parsing, and 
+    cached logs are read column by column. The pm4py reader parses the full 
+    file and caches it before selecting the columns.
+
+    With `use_cache=True`, parsed logs are cached as columnar files (default 
+    folder: "data/cache"), which are memory-mapped on later loads. The cache 
+    requires `pyarrow` and is skipped (with a warning) if it is not installed. 
+    Set `refresh_cache=True` to parse the file again and replace the cached entry.
+    """
     if filename.endswith(".xes"):
         data_path = Path(__file__).parent.parent.parent.parent / "data" / foldername / filename
         print(data_path)
-        df = pm4py.read_xes(str(data_path))
+        if reader not in ("pm4py", "stream"):
+            raise ValueError("'reader' must be 'pm4py' or 'stream'.")
+        if reader == "pm4py" and n_jobs != 1:
+            raise ValueError("Parallel parsing ('n_jobs') requires reader='stream'.")
+        cache_options = {"reader": reader} if reader != "pm4py" else None
+        df = None
+        if use_cache and not refresh_cache:
+            df = read_cached_event_log(
+                data_path, cache_dir=cache_dir, options=cache_options, columns=columns)
+        if df is None:
+            if reader == "stream":
+                if n_jobs != 1:
+                    df = read_xes_parallel(data_path, n_jobs=n_jobs, columns=columns)
+                else:
+                    df = read_xes_chunked(data_path, chunk_size=chunk_size, columns=columns)
+                if use_cache:
+                    write_cached_event_log(
+                        df, data_path, cache_dir=cache_dir, options=cache_options,
+                        complete=columns is None)
+            else:
+                df = pm4py.read_xes(str(data_path))
+                if use_cache:
+                    write_cached_event_log(
+                        df, data_path, cache_dir=cache_dir, options=cache_options)
+            if columns is not None:
+                df = df[[col for col in df.columns if col in columns]]
+    elif filename.endswith(TABULAR_SUFFIXES):
+        data_path = Path(__file__).parent.parent.parent.parent / "data" / foldername / filename
+        print(data_path)
+        # parquet files are already columnar and memory-mapped
+        use_cache = use_cache and filename.endswith(".csv")
+        cache_options = {
+            "reader": "csv", 
+            "column_mapping": column_mapping, 
+            "timestamp_format": timestamp_format}
+        df = None
+        if use_cache and not refresh_cache:
+            df = read_cached_event_log(
+                data_path, cache_dir=cache_dir, options=cache_options, columns=columns)
+        if df is None:
+            df = read_tabular_event_log(
+                data_path, 
+                column_mapping=column_mapping, 
+                columns=columns, 
+                timestamp_format=timestamp_format)
+            if use_cache:
+                write_cached_event_log(
+                    df, data_path, cache_dir=cache_dir, options=cache_options,
+                    complete=columns is None)
     else:
-        raise ValueError("'Filename' must be an .xes file and\n\
+        raise ValueError("'Filename' must be an .xes, .csv, or .parquet file and\n\
                          be in the folder 'data/processed_event_data'.")
     return df
\ No newline at end of file
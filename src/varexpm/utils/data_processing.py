@@ -22,7 +22,18 @@ E-Mail: {firstname.lastname}@hu-berlin.de
 import math
 import numpy as np
 import pandas as pd
-import pm4py
+
+def get_required_columns(
+        CASE_COL='case:concept:name',
+        ACT_COL='concept:name',
+        TIME_COL='time:timestamp',
+        lifecycle_activities=False) -> list:
+    '''Returns the columns of a log that are used by `simplifyLog`.
+    '''
+    columns = [CASE_COL, ACT_COL, TIME_COL]
+    if lifecycle_activities:
+        columns.append('lifecycle:transition')
+    return columns
 
 def simplifyLog(df: pd.DataFrame, 
                 lifecycle_activities=False, 
@@ -40,27 +51,273 @@ def simplifyLog(df: pd.DataFrame,
     if (lifecycle_activities == True and 
         lifecycle in df.columns):
         if len(df[lifecycle].unique()) > 1:
-            df[ACT_COL] = df[ACT_COL] + '-' + df[lifecycle]
+            df[ACT_COL] = df[ACT_COL].astype(str) + '-' + df[lifecycle].astype(str)
         else:
             print('Message: No transition-activity were be created. Only one type of lifecycle transition in log.')
     else:
         print('Message: No transition-activity were be created. No transition column.')
     # keep only k amount cases in the log
-    total_num_variants = len(pm4py.get_variants(df))
     if filter_cases > 0:
         case_list = df[CASE_COL].unique()[0:filter_cases]
-        df = pm4py.filter_event_attribute_values(df, CASE_COL, case_list, level="case", retain=True).copy()
+        df = df.loc[df[CASE_COL].isin(case_list)].copy()
     elif filter_variants_k > 0:
-        df = pm4py.filter_variants_top_k(df, filter_variants_k).copy()
+        df = filter_variants_top_k(df, filter_variants_k).copy()
     elif filter_variants_per > 0:
+        # variants are only computed if a percentage is requested
+        variant_index, order, segment_starts = _compute_variant_index(df)
+        total_num_variants = len(variant_index["variant_counts"])
         filter_variants_k = math.ceil(filter_variants_per*total_num_variants)
-        df = pm4py.filter_variants_top_k(df, filter_variants_k).copy()
+        df = _filter_variants_top_k(
+            df, filter_variants_k, variant_index, lambda: (order, segment_starts), 
+            CASE_COL, ACT_COL).copy()
 
     #filter log
     keep_columns = [CASE_COL, ACT_COL, TIME_COL]
     df = df.filter(keep_columns)
     return df
 
+# Encoding
+def encode_log_columns(
+        df: pd.DataFrame, 
+        cols: list) -> tuple[pd.DataFrame, dict]:
+    '''
+    Encodes columns as categoricals, i.e., integer codes and a dictionary of labels.
+
+    Categories are sorted, hence sorting and grouping by the codes give the 
+    same order as the labels. Returns the dataframe and the original dtypes 
+    (see `decode_log_columns`).
+    '''
+    dtypes = {}
+    for col in cols:
+        if col not in df.columns:
+            continue
+        dtypes[col] = df[col].dtype
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = df[col].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(categories.sort_values())
+        else:
+            df[col] = df[col].astype("category")
+    return df, dtypes
+
+def decode_log_columns(
+        df: pd.DataFrame, 
+        dtypes: dict) -> pd.DataFrame:
+    '''Restores the original dtypes of columns encoded with `encode_log_columns`.
+    Columns that were categorical before the encoding stay categorical.
+    '''
+    for col, dtype in dtypes.items():
+        if col in df.columns and not isinstance(dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(dtype)
+    return df
+
+def to_pm4py_dataframe(
+        df: pd.DataFrame,
+        cols: list) -> pd.DataFrame:
+    '''Returns the columns of a log for pm4py, which expects string columns 
+    instead of categoricals.
+    '''
+    df = df[cols]
+    return df.astype({
+        col: str for col in cols 
+        if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+# Variants
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    '''Vectorized splitmix64 hash of uint64 values (wrapping arithmetic).'''
+    z = x + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def _compute_variant_index(
+        df: pd.DataFrame,
+        CASE_COL='case:concept:name',
+        ACT_COL='concept:name',
+        TIME_COL='time:timestamp') -> tuple[dict, np.ndarray, np.ndarray]:
+    '''Returns the variant index of `compute_variant_index` together with the 
+    event order (by case, timestamp, and row) and the position of the first 
+    event of each case in that order.
+    '''
+    case_codes, cases = pd.factorize(df[CASE_COL])
+    act_codes, _ = pd.factorize(df[ACT_COL])
+    order = np.lexsort((df[TIME_COL].dt.as_unit("ns").array.asi8, case_codes))
+    order = order[case_codes[order] >= 0] # skip missing cases
+    case_sorted = case_codes[order]
+    num_cases = len(cases)
+    if num_cases == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        variant_index = {"cases": cases, "case_variants": empty, 
+                         "variant_counts": empty, "variant_cases": empty}
+        return variant_index, order, empty
+
+    # position of each event in its case
+    segment_starts = np.flatnonzero(np.r_[True, np.diff(case_sorted) != 0])
+    case_lengths = np.diff(np.r_[segment_starts, len(order)])
+    positions = np.arange(len(order)) - np.repeat(segment_starts, case_lengths)
+
+    keys = (act_codes[order].astype(np.uint64) << np.uint64(32)) | positions.astype(np.uint64)
+    hash_a = np.add.reduceat(_splitmix64(keys), segment_starts)
+    hash_b = np.add.reduceat(_splitmix64(keys ^ np.uint64(0x5851F42D4C957F2D)), segment_starts)
+
+    case_keys = np.empty(num_cases, dtype=[("len", np.int64), ("a", np.uint64), ("b", np.uint64)])
+    case_keys["len"], case_keys["a"], case_keys["b"] = case_lengths, hash_a, hash_b
+    _, variant_cases, case_variants, variant_counts = np.unique(
+        case_keys, return_index=True, return_inverse=True, return_counts=True)
+    variant_index = {
+        "cases": cases,
+        "case_variants": case_variants.ravel(),
+        "variant_counts": variant_counts,
+        "variant_cases": variant_cases,
+    }
+    return variant_index, order, segment_starts
+
+def compute_variant_index(
+        df: pd.DataFrame,
+        CASE_COL='case:concept:name',
+        ACT_COL='concept:name',
+        TIME_COL='time:timestamp') -> dict:
+    '''
+    Assigns a variant number to each case by hashing its activity sequence.
+
+    Events are ordered by case, timestamp, and row order. Each event is 
+    hashed from its activity code and position in the case, and the hashes 
+    are summed per case with two independent seeds (128 bit) and combined 
+    with the case length, hence no per-case sequences are built.
+
+    Returns
+    -------
+    dict
+        "cases": case identifiers (pd.Index), 
+        "case_variants": variant number per case (np.ndarray), 
+        "variant_counts": number of cases per variant (np.ndarray), and 
+        "variant_cases": index of one case per variant (np.ndarray).
+    '''
+    variant_index, _, _ = _compute_variant_index(
+        df, CASE_COL=CASE_COL, ACT_COL=ACT_COL, TIME_COL=TIME_COL)
+    return variant_index
+
+def _filter_variants_top_k(df, k, variant_index, event_order, CASE_COL, ACT_COL) -> pd.DataFrame:
+    '''Keeps the cases of the k most frequent variants (see 
+    `filter_variants_top_k`). event_order() returns the event order and case 
+    starts of `_compute_variant_index`; it is only called for ties.
+    '''
+    counts = variant_index["variant_counts"]
+    if k >= len(counts):
+        return df
+    by_count = np.argsort(-counts, kind="stable")
+    boundary_count = counts[by_count[k - 1]] if k > 0 else np.inf
+    selected = by_count[counts[by_count] > boundary_count]
+
+    # break ties at the boundary by the activity sequences
+    tied = by_count[counts[by_count] == boundary_count]
+    if len(tied) > 0 and k > len(selected):
+        order, segment_starts = event_order()
+        segment_ends = np.r_[segment_starts[1:], len(order)]
+        activities = df[ACT_COL].to_numpy()
+        sequences = []
+        for variant in tied:
+            case = variant_index["variant_cases"][variant]
+            events = order[segment_starts[case]:segment_ends[case]]
+            sequences.append((tuple(activities[events]), variant))
+        sequences.sort(reverse=True)
+        selected = np.r_[selected, [v for _, v in sequences[:k - len(selected)]]]
+
+    keep_cases = np.isin(variant_index["case_variants"], selected)
+    case_codes = variant_index["cases"].get_indexer(df[CASE_COL])
+    keep_rows = np.zeros(len(case_codes), dtype=bool)
+    valid = case_codes >= 0 # events without case are dropped
+    keep_rows[valid] = keep_cases[case_codes[valid]]
+    return df.loc[keep_rows]
+
+def filter_variants_top_k(
+        df: pd.DataFrame,
+        k: int,
+        variant_index: dict | None = None,
+        CASE_COL='case:concept:name',
+        ACT_COL='concept:name',
+        TIME_COL='time:timestamp') -> pd.DataFrame:
+    '''
+    Keeps the cases of the k most frequent variants (see `compute_variant_index`).
+
+    As in `pm4py.filter_variants_top_k`, variants with equal frequency are 
+    ordered by their activity sequence in descending order. Only the 
+    sequences of the variants tied at the k-th frequency are built.
+    '''
+    if variant_index is None:
+        variant_index, order, segment_starts = _compute_variant_index(
+            df, CASE_COL=CASE_COL, ACT_COL=ACT_COL, TIME_COL=TIME_COL)
+        event_order = lambda: (order, segment_starts)
+    else:
+        # the event order of a given index is only computed for ties
+        event_order = lambda: _compute_variant_index(
+            df, CASE_COL=CASE_COL, ACT_COL=ACT_COL, TIME_COL=TIME_COL)[1:]
+    return _filter_variants_top_k(df, k, variant_index, event_order, CASE_COL, ACT_COL)
+
+# Relative time engine
+def compute_relative_times(
+        cases: pd.Series, 
+        timestamps: pd.Series) -> dict:
+    '''
+    Computes relative times per case in one grouped pass over int64 nanoseconds.
+
+    Events are grouped by sorting the integer case codes; case start and end 
+    times are reduced per contiguous case segment and broadcast back to the 
+    events by their case code.
+
+    Returns
+    -------
+    dict
+        Arrays per event: "case_start" (ns), "relative" (ns), 
+        "relative_seconds" (int), and "case_max_seconds" (int, the largest 
+        relative seconds value of the event's case).
+    '''
+    codes, _ = pd.factorize(cases, use_na_sentinel=True)
+    if (codes < 0).any():
+        raise ValueError("Case identifiers must not be missing.")
+    if timestamps.isna().any():
+        raise ValueError("Timestamps must not be missing.")
+    ts = timestamps.dt.as_unit("ns").array.asi8
+    if len(ts) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return {"case_start": empty, "relative": empty, 
+                "relative_seconds": empty, "case_max_seconds": empty}
+
+    # segments of equal case codes (codes are 0..k-1, hence segment i is case i)
+    order = np.argsort(codes, kind="stable")
+    ts_sorted = ts[order]
+    segment_starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    case_start = np.minimum.reduceat(ts_sorted, segment_starts)
+    case_end = np.maximum.reduceat(ts_sorted, segment_starts)
+
+    relative = ts - case_start[codes]
+    return {
+        "case_start": case_start[codes],
+        "relative": relative,
+        "relative_seconds": relative // 1_000_000_000,
+        "case_max_seconds": ((case_end - case_start) // 1_000_000_000)[codes],
+    }
+
+def _assign_relative_times(
+        df: pd.DataFrame,
+        times: dict,
+        TIME_COL="time:timestamp",
+        RTIME_COL="time:timestamp:relative",
+        RTIME_SEC_COL="time:relative:seconds"):
+    '''Adds the relative time columns from `compute_relative_times` to a dataframe.'''
+    time_dtype = df[TIME_COL].dtype
+    unit = df[TIME_COL].dt.unit
+    case_start = pd.DatetimeIndex(times["case_start"].view("datetime64[ns]"))
+    if getattr(time_dtype, "tz", None) is not None:
+        case_start = case_start.tz_localize("UTC").tz_convert(time_dtype.tz)
+    df["time:timestamp:casestart"] = pd.Series(
+        case_start.as_unit(unit), index=df.index)
+    df[RTIME_COL] = pd.Series(
+        pd.to_timedelta(times["relative"], unit="ns").as_unit(unit), index=df.index)
+    df[RTIME_SEC_COL] = times["relative_seconds"]
+    df['time:relative:seconds:log'] = np.log(times["relative_seconds"] + 1)
+    return df
+
 # Create relative timestamps
 def relativeTimestamps(
         df: pd.DataFrame,
@@ -70,13 +327,9 @@ def relativeTimestamps(
         RTIME_SEC_COL="time:relative:seconds"):
     '''adds relative timestamps to dataframe (log).
     '''
-    starttimes_dict = df.groupby(CASE_COL)[TIME_COL].min().to_dict()
-    df["time:timestamp:casestart"] = df[CASE_COL].map(starttimes_dict)
-    df[RTIME_COL] = df[TIME_COL] - df["time:timestamp:casestart"]
-    df[RTIME_SEC_COL] = df[RTIME_COL].apply(lambda t: t.total_seconds()).astype(int)
-    df['time:relative:seconds:log'] = np.log(df[RTIME_SEC_COL] + 1)
-
-    return df
+    times = compute_relative_times(df[CASE_COL], df[TIME_COL])
+    return _assign_relative_times(
+        df, times, TIME_COL=TIME_COL, RTIME_COL=RTIME_COL, RTIME_SEC_COL=RTIME_SEC_COL)
 
 # Filtering
 def normalize_reltimes_log(
@@ -84,25 +337,36 @@ def normalize_reltimes_log(
         RTIME_SEC_COL="time:relative:seconds", 
         CASE_COL="case:concept:name",
         NRTIMECASE_COL = "time:relative:normalized:case", 
-        NRTIMELOG_COL = "time:relative:normalized:log"):
-    """Normalize relative timestamps by log and by case."""
+        NRTIMELOG_COL = "time:relative:normalized:log",
+        TIME_COL="time:timestamp",
+        max_seconds=None):
+    """Normalize relative timestamps by log and by case.
+
+    All columns are derived from one pass of `compute_relative_times`: 
+    the smallest relative time of each case is 0 by definition, hence the 
+    case-level range is the case's largest relative time. For a part of a 
+    log (complete cases), `max_seconds` is the largest relative time of the 
+    whole log (default: of df).
+    """
     # define relative timestamps
-    df = relativeTimestamps(df)
+    times = compute_relative_times(df[CASE_COL], df[TIME_COL])
+    df = _assign_relative_times(
+        df, times, TIME_COL=TIME_COL, RTIME_SEC_COL=RTIME_SEC_COL)
+    seconds = times["relative_seconds"]
 
     # --- log-level normalization of relative timestamps
-    mins_l = df[RTIME_SEC_COL].min()
-    maxs_l = df[RTIME_SEC_COL].max()
-    denom_l = (maxs_l - mins_l)
-    df[NRTIMELOG_COL] = (df[RTIME_SEC_COL] - mins_l) / denom_l
+    if max_seconds is not None:
+        maxs_l = max_seconds
+    else:
+        maxs_l = seconds.max() if len(seconds) > 0 else 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df[NRTIMELOG_COL] = seconds / maxs_l
 
     # --- case-level normalization of relative timestamps
-    eventgroups = df.groupby(CASE_COL)[RTIME_SEC_COL]
-    mins_c = eventgroups.transform("min")
-    maxs_c = eventgroups.transform("max")
-    denom_c = (maxs_c - mins_c)
     # avoid division-by-zero
-    df[NRTIMECASE_COL] = (df[RTIME_SEC_COL] - mins_c) / denom_c.replace(0, pd.NA)
-    df[NRTIMECASE_COL] = df[NRTIMECASE_COL].fillna(0)
+    denom_c = times["case_max_seconds"]
+    df[NRTIMECASE_COL] = np.divide(
+        seconds, denom_c, out=np.zeros(len(seconds), dtype=float), where=denom_c > 0)
     return df
 
 # Activity statistics
@@ -116,7 +380,7 @@ def get_activity_statistics(activity,
     qs = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0]  # quantiles
     
     # --- Frequencies per case ---
-    freq_percase_list = activity.groupby(CASE_COL)[RTIME_COL].count()
+    freq_percase_list = activity.groupby(CASE_COL, observed=True)[RTIME_COL].count()
     freq_percase_quantiles = freq_percase_list.quantile(qs)
     freq_percase_mean = freq_percase_list.mean()
     #freq_percase_mode = freq_percase_list.mode()
@@ -171,17 +435,101 @@ def get_activity_statistics(activity,
     
     return pd.Series(data)
 
-def map_values_to_col(df, df_ranks, key_cols, rank_col_name):
+def get_all_activity_statistics(
+        df: pd.DataFrame,
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        RTIME_COL="time:relative:seconds",
+        NRTIMELOG_COL="time:relative:normalized:log",
+        NRTIMECASE_COL="time:relative:normalized:case"):
+    '''
+    Calculate the statistics of `get_activity_statistics` for all activities at once.
+
+    Instead of applying `get_activity_statistics` to every activity group, each
+    statistic is computed with one grouped aggregation over the whole log. The
+    result has the same columns (in the same order) as the per-activity version.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Event log with relative (normalized) timestamps.
+    ACT_COL : str
+        The activity column; its values form the index of the result.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per activity (in order of first appearance) and one column per statistic.
+    '''
+    qs = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0]  # quantiles
+
+    grouped = df.groupby(ACT_COL, sort=False, observed=True)
+    activities = grouped.size().index
+
+    # --- Frequencies per case ---
+    freq_percase_list = (
+        df.groupby([ACT_COL, CASE_COL], sort=False, observed=True)[RTIME_COL]
+          .count()
+          .groupby(level=0, sort=False, observed=True))
+
+    # --- Positions based on relative normalized times by log and by case ---
+    series_groups = {
+        'freq_percase': freq_percase_list,
+        'pos_log': grouped[NRTIMELOG_COL],
+        'pos_percase': grouped[NRTIMECASE_COL],
+    }
+
+    # --- Data ---
+    data = {'freq_log_absolute': grouped.size().astype(float)}
+    for prefix, series_group in series_groups.items():
+        data[f'{prefix}_mean'] = series_group.mean()
+        data[f'{prefix}_median'] = series_group.median()
+        data[f'{prefix}_var'] = series_group.var(ddof=0)
+        data[f'{prefix}_std'] = series_group.std(ddof=0)
+        data[f'{prefix}_skew'] = series_group.skew()
+
+    # add quantiles to data
+    for prefix, series_group in series_groups.items():
+        quantiles = series_group.quantile(qs).unstack()
+        for q in qs:
+            data[f'{prefix}_q{int(q*100):02d}'] = quantiles[q]
+
+    df_statistics = pd.DataFrame(
+        {name: values.reindex(activities).to_numpy(dtype=float) for name, values in data.items()},
+        index=activities)
+    df_statistics.index.name = ACT_COL
+    return df_statistics
+
+def map_values_to_col(df, df_ranks, key_cols, rank_col_name, fill_value=None):
     '''Maps values from df_ranks into df using the key_cols.
     Assumes key_cols form a unique key in df_ranks.
+
+    The keys are matched with an index lookup on the key columns (no tuple per row).
+    Rows without a matching key get `fill_value` (NaN if None).
+    '''
+    if fill_value is None:
+        fill_value = np.nan
+    if len(df_ranks) == 0:
+        return pd.Series(fill_value, index=df.index)
+    # Build a MultiIndex of the keys and look up the position of each row
+    df_ranks = df_ranks.astype({
+        col: df[col].dtype for col in key_cols 
+        if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    rank_index = pd.MultiIndex.from_frame(df_ranks[key_cols])
+    positions = rank_index.get_indexer(pd.MultiIndex.from_frame(df[key_cols]))
+    values = pd.Series(df_ranks[rank_col_name].to_numpy()[positions], index=df.index)
+    missing = positions < 0
+    if missing.any():
+        values = values.where(~missing, fill_value)
+    return values
+
+def map_dict_to_col(df, value_dict, key_cols, fill_value=None):
+    '''Maps the values of a dictionary with tuple keys (one element per 
+    column in key_cols) into df, see `map_values_to_col`.
     '''
-    # Build a MultiIndex dictionary
-    rank_dict = (
-        df_ranks
-            .set_index(key_cols)[rank_col_name]
-            .to_dict()
-    )
-    return df[key_cols].apply(tuple, axis=1).map(rank_dict)
+    df_values = pd.DataFrame(list(value_dict.keys()), columns=key_cols)
+    df_values["value"] = list(value_dict.values())
+    return map_values_to_col(df, df_values, key_cols, "value", fill_value=fill_value)
 
 def add_activity_position_percase(
         df: pd.DataFrame,
@@ -192,8 +540,8 @@ def add_activity_position_percase(
         MAXORDER_COL="order:position:max"):
     # df columns: case, time, activity
     df = df.sort_values([CASE_COL, TIME_COL]).copy()
-    df[ORDER_COL] = df.groupby([CASE_COL, ACT_COL]).cumcount()
-    df[MAXORDER_COL] = df.groupby([CASE_COL, ACT_COL])[ORDER_COL].transform("max")
+    df[ORDER_COL] = df.groupby([CASE_COL, ACT_COL], observed=True).cumcount()
+    df[MAXORDER_COL] = df.groupby([CASE_COL, ACT_COL], observed=True)[ORDER_COL].transform("max")
     return df
 
 def group_unique_values_to_dict(
@@ -217,7 +565,8 @@ def group_unique_values_to_dict(
     item_col : str
         The column whose unique values will be collected for each group.
     order_by : str, optional
-        Column used to sort values within each group before collecting them.
+        Column used to sort values within each group before collecting them 
+        (stable, i.e., ties keep their appearance order).
         If None, values are returned in their original appearance order.
     ascending : bool, optional
         Whether sorting by `order_by` is ascending.
@@ -227,18 +576,26 @@ def group_unique_values_to_dict(
     dict
         Mapping each unique `key_col` value to a list of unique `item_col` values.
     '''
-    
-    grouped = df.groupby(key_col)
-
-    result = {}
+    # one stable sort for all groups: by `order_by` first, then by key
+    if order_by:
+        df = df.sort_values(order_by, ascending=ascending, kind="stable")
+    key_codes, keys = pd.factorize(df[key_col], sort=True)
+    item_codes, _ = pd.factorize(df[item_col], use_na_sentinel=False)
+    order = np.argsort(key_codes, kind="stable")
+    order = order[key_codes[order] >= 0] # skip missing keys
 
-    for key, group in grouped:
-        if order_by:
-            group = group.sort_values(order_by, ascending=ascending)
+    # ensure uniqueness in sorted order
+    pairs = key_codes[order].astype(np.int64) * (len(item_codes) + 1) + item_codes[order]
+    order = order[~pd.Series(pairs).duplicated().to_numpy()]
 
-        # ensure uniqueness in sorted order
-        unique_vals = group[item_col].drop_duplicates().tolist()
+    # split the items at the key boundaries
+    sorted_codes = key_codes[order]
+    bounds = np.r_[0, np.flatnonzero(np.diff(sorted_codes)) + 1, len(sorted_codes)]
+    items = df[item_col].to_numpy()[order].tolist()
+    keys = list(keys)
 
-        result[key] = unique_vals
+    result = {
+        keys[sorted_codes[start]]: items[start:end] 
+        for start, end in zip(bounds[:-1], bounds[1:])}
 
-    return result
\ No newline at end of file
+    return result
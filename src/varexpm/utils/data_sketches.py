@@ -0,0 +1,524 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import numpy as np
+import pandas as pd
+from .data_processing import compute_relative_times
+
+#####################
+### QUANTILE SKETCHES (T-DIGEST)
+#####################
+
+def _merge_centroid_segments(codes, means, weights, exact, segments):
+    '''Merges contiguous centroids that start at `segments` into one centroid each.'''
+    merged_weights = np.add.reduceat(weights, segments)
+    merged_means = np.add.reduceat(means * weights, segments) / merged_weights
+    lowest = np.minimum.reduceat(means, segments)
+    single_value = lowest == np.maximum.reduceat(means, segments)
+    # centroids of a single value keep this value exactly
+    merged_means = np.where(single_value, lowest, merged_means)
+    merged_exact = np.logical_and.reduceat(exact, segments) & single_value
+    return codes[segments], merged_means, merged_weights, merged_exact
+
+def _compress_centroids(codes, means, weights, exact, compression):
+    '''
+    Merges the centroids of all groups (integer codes) in one vectorized pass.
+
+    Centroids are sorted by group and mean. Equal values are merged first 
+    without loss (exact centroids). Groups with more than `compression` 
+    centroids are then binned with the k1 scale function, 
+    k(q) = compression / (2 pi) * asin(2q - 1), hence centroids near the 
+    tails stay small.
+    '''
+    order = np.lexsort((means, codes))
+    codes, means, weights, exact = codes[order], means[order], weights[order], exact[order]
+    if len(codes) == 0:
+        return codes, means, weights, exact
+
+    # lossless merge of equal values
+    segments = np.flatnonzero(np.r_[True, (np.diff(codes) != 0) | (np.diff(means) != 0)])
+    codes, means, weights, exact = _merge_centroid_segments(codes, means, weights, exact, segments)
+
+    starts = np.flatnonzero(np.r_[True, np.diff(codes) != 0])
+    sizes = np.diff(np.r_[starts, len(codes)])
+    if (sizes <= compression).all():
+        return codes, means, weights, exact
+    totals = np.add.reduceat(weights, starts)
+    cum_before = np.cumsum(weights) - weights
+    q = (cum_before - np.repeat(cum_before[starts], sizes) + weights / 2) / np.repeat(totals, sizes)
+    bins = np.floor(compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1)))
+    # one bin per centroid in small groups
+    bins = np.where(np.repeat(sizes <= compression, sizes), np.arange(len(codes)), bins)
+
+    segments = np.flatnonzero(np.r_[True, (np.diff(codes) != 0) | (np.diff(bins) != 0)])
+    return _merge_centroid_segments(codes, means, weights, exact, segments)
+
+def _digest_from_centroids(keys, means, weights, exact, compression):
+    '''Builds a digest from (possibly uncompressed) centroids with labels.'''
+    codes, labels = pd.factorize(keys)
+    valid = (codes >= 0) & ~np.isnan(means)
+    codes, means, weights, exact = _compress_centroids(
+        codes[valid], means[valid], weights[valid], exact[valid], compression)
+    return pd.DataFrame({
+        "key": labels.take(codes),
+        "mean": means,
+        "weight": weights,
+        "exact": exact,
+    })
+
+def build_tdigest(keys, values, compression=200) -> dict:
+    '''
+    Builds one t-digest per key from values.
+
+    Parameters
+    ----------
+    keys : array-like
+        Group label of each value (e.g., the activity).
+    values : array-like
+        Values to summarize; missing values are ignored.
+    compression : int, default=200
+        Number of centroids per key (about compression / 2 after merging).
+        Keys with at most `compression` distinct values are stored exactly.
+
+    Returns
+    -------
+    dict
+        "centroids" (pd.DataFrame with key, mean, weight, and whether the 
+        centroid holds a single value) and
+        "bounds" (pd.DataFrame with min and max per key).
+    '''
+    values = np.asarray(values, dtype=float)
+    keys = pd.Series(keys).reset_index(drop=True)
+    valid = ~np.isnan(values)
+    bounds = (
+        pd.Series(values[valid]).groupby(keys[valid].to_numpy(), sort=False)
+          .agg(["min", "max"]))
+    centroids = _digest_from_centroids(
+        keys.to_numpy(), values, np.ones(len(values)), np.ones(len(values), dtype=bool), compression)
+    return {"centroids": centroids, "bounds": bounds}
+
+def merge_tdigests(digests: list, compression=200) -> dict:
+    '''Merges t-digests (e.g., of different chunks or workers) into one.'''
+    centroids = pd.concat([digest["centroids"] for digest in digests], ignore_index=True)
+    bounds = pd.concat([digest["bounds"] for digest in digests])
+    bounds = bounds.groupby(level=0, sort=False).agg({"min": "min", "max": "max"})
+    centroids = _digest_from_centroids(
+        centroids["key"].to_numpy(),
+        centroids["mean"].to_numpy(dtype=float),
+        centroids["weight"].to_numpy(dtype=float),
+        centroids["exact"].to_numpy(dtype=bool),
+        compression)
+    return {"centroids": centroids, "bounds": bounds}
+
+def tdigest_quantiles(digest: dict, qs: list) -> pd.DataFrame:
+    '''
+    Estimates quantiles per key from a t-digest.
+
+    The centroids are placed at the center of their weight (centroids of a 
+    single value span their whole weight), and the minimum and maximum at the 
+    first and last position. Quantiles interpolate linearly between these 
+    points at position q * (n - 1), i.e., the same as `pd.Series.quantile` if 
+    the digest is exact.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per key and one column per quantile.
+    '''
+    centroids, bounds = digest["centroids"], digest["bounds"]
+    keys = bounds.index
+    codes = keys.get_indexer(centroids["key"])
+    means = centroids["mean"].to_numpy(dtype=float)
+    weights = centroids["weight"].to_numpy(dtype=float)
+    exact = centroids["exact"].to_numpy(dtype=bool)
+    order = np.lexsort((means, codes))
+    codes, means, weights, exact = codes[order], means[order], weights[order], exact[order]
+    num_keys, qs = len(keys), np.asarray(qs, dtype=float)
+    if num_keys == 0:
+        return pd.DataFrame(columns=list(qs), index=keys, dtype=float)
+
+    # positions of the centroids within their group (in weight)
+    totals = np.bincount(codes, weights=weights, minlength=num_keys)
+    group_starts = np.r_[0, np.cumsum(np.bincount(codes, minlength=num_keys))[:-1]]
+    cum_before = np.cumsum(weights) - weights
+    first_positions = cum_before - cum_before[group_starts][codes] + 0.5
+    positions = np.where(exact, first_positions, first_positions + weights / 2 - 0.5)
+    last_positions = np.where(exact, first_positions + weights - 1, positions)
+
+    # anchors per group: min, centroids (first and last position), max
+    anchor_codes = np.r_[np.arange(num_keys), codes, codes, np.arange(num_keys)]
+    anchor_positions = np.r_[np.full(num_keys, 0.5), positions, last_positions, totals - 0.5]
+    anchor_values = np.r_[
+        bounds["min"].to_numpy(dtype=float), means, means, bounds["max"].to_numpy(dtype=float)]
+    anchor_order = np.lexsort((anchor_positions, anchor_codes))
+    anchor_codes = anchor_codes[anchor_order]
+    anchor_positions = anchor_positions[anchor_order]
+    anchor_values = anchor_values[anchor_order]
+    anchor_ends = np.cumsum(np.bincount(anchor_codes, minlength=num_keys)) - 1
+
+    # queries per group and quantile
+    query_codes = np.repeat(np.arange(num_keys), len(qs))
+    query_positions = np.tile(qs, num_keys) * (totals[query_codes] - 1) + 0.5
+    # last anchor at or before each query (anchors come first at ties)
+    all_codes = np.r_[anchor_codes, query_codes]
+    all_positions = np.r_[anchor_positions, query_positions]
+    is_query = np.r_[np.zeros(len(anchor_codes), dtype=bool), np.ones(len(query_codes), dtype=bool)]
+    all_order = np.lexsort((is_query, all_positions, all_codes))
+    anchor_index = np.where(is_query[all_order], -1, all_order)
+    previous = np.maximum.accumulate(anchor_index)[is_query[all_order]]
+    query_index = all_order[is_query[all_order]] - len(anchor_codes)
+    previous_anchor = np.empty(len(query_codes), dtype=np.int64)
+    previous_anchor[query_index] = previous
+    next_anchor = np.minimum(previous_anchor + 1, anchor_ends[query_codes])
+
+    x0, x1 = anchor_positions[previous_anchor], anchor_positions[next_anchor]
+    y0, y1 = anchor_values[previous_anchor], anchor_values[next_anchor]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(x1 > x0, (query_positions - x0) / (x1 - x0), 0.0)
+    estimates = y0 + (y1 - y0) * np.clip(fraction, 0, 1)
+    return pd.DataFrame(estimates.reshape(num_keys, len(qs)), index=keys, columns=list(qs))
+
+#####################
+### QUANTILE SKETCHES (RELATIVE ERROR)
+#####################
+
+def _ddsketch_gamma(relative_accuracy):
+    '''Returns the ratio between the bounds of consecutive buckets.'''
+    if not 0 < relative_accuracy < 1:
+        raise ValueError("relative_accuracy must be between 0 and 1")
+    return (1 + relative_accuracy) / (1 - relative_accuracy)
+
+def build_ddsketch(keys, values, relative_accuracy=0.01) -> dict:
+    '''
+    Builds one DDSketch per key from values.
+
+    The values are counted in logarithmic buckets, (gamma^(i-1), gamma^i] 
+    with gamma = (1 + a) / (1 - a) for the relative accuracy a (negative 
+    values mirrored, zeros separately). Hence every quantile is estimated 
+    within a relative error of a, the sketch is built in one pass without 
+    sorting, and sketches are merged by adding their counts.
+
+    Parameters
+    ----------
+    keys : array-like
+        Group label of each value (e.g., the activity).
+    values : array-like
+        Values to summarize; missing values are ignored.
+    relative_accuracy : float, default=0.01
+        Maximum relative error of the quantiles.
+
+    Returns
+    -------
+    dict
+        "relative_accuracy" and 
+        "buckets" (pd.DataFrame with key, sign, bucket index, and count).
+    '''
+    gamma = _ddsketch_gamma(relative_accuracy)
+    values = np.asarray(values, dtype=float)
+    if isinstance(keys, np.ndarray) and keys.dtype.kind in "iu" and (len(keys) == 0 or keys.min() >= 0):
+        # non-negative integer keys (e.g., group numbers) are used as codes
+        codes = keys.astype(np.int64)
+        labels = pd.RangeIndex(codes.max() + 1 if len(codes) > 0 else 0)
+    else:
+        codes, labels = pd.factorize(pd.Series(keys).reset_index(drop=True))
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    signs = np.sign(values).astype(np.int64)
+    with np.errstate(divide="ignore"):
+        buckets = np.abs(values)
+        np.log(buckets, out=buckets)
+        buckets *= 1 / np.log(gamma)
+        np.ceil(buckets, out=buckets)
+    buckets[signs == 0] = 0
+    buckets = buckets.astype(np.int64)
+
+    # count the values per (key, sign, bucket) through one integer per cell
+    low = buckets.min() if len(buckets) > 0 else 0
+    span = buckets.max() - low + 1 if len(buckets) > 0 else 1
+    cells = (codes * 3 + signs + 1) * span + (buckets - low)
+    num_cells = len(labels) * 3 * span
+    if num_cells <= max(4 * len(cells), 2**20):
+        counts = np.bincount(cells, minlength=num_cells)
+        cells = np.flatnonzero(counts)
+        counts = counts[cells]
+    else:
+        cell_codes, cells = pd.factorize(cells)
+        counts = np.bincount(cell_codes, minlength=len(cells))
+    cell_keys, cell_rest = np.divmod(cells, 3 * span)
+    return {
+        "relative_accuracy": relative_accuracy,
+        "buckets": pd.DataFrame({
+            "key": labels.take(cell_keys),
+            "sign": cell_rest // span - 1,
+            "bucket": cell_rest % span + low,
+            "count": counts,
+        }),
+    }
+
+def merge_ddsketches(sketches: list) -> dict:
+    '''Merges DDSketches (e.g., of different shards or workers) into one.'''
+    sketches = list(sketches)
+    accuracies = {sketch["relative_accuracy"] for sketch in sketches}
+    if len(accuracies) != 1:
+        raise ValueError("Only sketches with the same relative_accuracy can be merged")
+    buckets = (
+        pd.concat([sketch["buckets"] for sketch in sketches], ignore_index=True)
+          .groupby(["key", "sign", "bucket"], sort=False, as_index=False)["count"].sum())
+    return {"relative_accuracy": accuracies.pop(), "buckets": buckets}
+
+def ddsketch_quantiles(sketch: dict, qs: list) -> pd.DataFrame:
+    '''
+    Estimates quantiles per key from a DDSketch.
+
+    Each bucket is represented by the value with the smallest relative error 
+    to its bounds, 2 gamma^i / (gamma + 1). Quantiles interpolate between the 
+    values at the ranks around q * (n - 1), as `pd.Series.quantile`.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per key (first appearance) and one column per quantile.
+    '''
+    gamma = _ddsketch_gamma(sketch["relative_accuracy"])
+    buckets = sketch["buckets"]
+    codes, keys = pd.factorize(buckets["key"])
+    signs = buckets["sign"].to_numpy(dtype=np.int64)
+    indices = buckets["bucket"].to_numpy(dtype=np.int64)
+    counts = buckets["count"].to_numpy(dtype=np.int64)
+    qs = np.asarray(qs, dtype=float)
+    # order the buckets by value within each key
+    order = np.lexsort((signs * indices, signs, codes))
+    codes, signs, indices, counts = codes[order], signs[order], indices[order], counts[order]
+    with np.errstate(over="ignore"):
+        estimates = signs * 2 * np.power(gamma, indices.astype(float)) / (gamma + 1)
+
+    # values at the ranks below and above each quantile position
+    totals = np.bincount(codes, weights=counts, minlength=len(keys))
+    ends = np.cumsum(counts)
+    starts = np.r_[0, np.cumsum(totals)[:-1]]
+    positions = np.outer(totals - 1, qs)
+    lower, upper = np.floor(positions), np.ceil(positions)
+    offsets = starts[:, None]
+    lower_values = estimates[np.searchsorted(ends, offsets + lower, side="right")]
+    upper_values = estimates[np.searchsorted(ends, offsets + upper, side="right")]
+    estimates = lower_values + (upper_values - lower_values) * (positions - lower)
+    return pd.DataFrame(estimates, index=keys, columns=list(qs))
+
+#####################
+### MERGEABLE MOMENTS
+#####################
+
+def build_moments(keys, values) -> pd.DataFrame:
+    '''
+    Computes count, mean, and the second and third central moment sums per key.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns "n", "mean", "m2", and "m3", indexed by key (first appearance).
+    '''
+    values = np.asarray(values, dtype=float)
+    codes, labels = pd.factorize(pd.Series(keys).reset_index(drop=True))
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    n = np.bincount(codes, minlength=len(labels)).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(codes, weights=values, minlength=len(labels)) / n
+    deviation = values - mean[codes]
+    return pd.DataFrame({
+        "n": n,
+        "mean": mean,
+        "m2": np.bincount(codes, weights=deviation**2, minlength=len(labels)),
+        "m3": np.bincount(codes, weights=deviation**3, minlength=len(labels)),
+    }, index=pd.Index(labels))
+
+def merge_moments(moments_a: pd.DataFrame, moments_b: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Merges two moment tables (see `build_moments`) with the pairwise update
+    formulas of Chan et al. and Pébay, i.e., without revisiting any values.
+    '''
+    keys = moments_a.index.append(moments_b.index.difference(moments_a.index, sort=False))
+    a = moments_a.reindex(keys, fill_value=0.0)
+    b = moments_b.reindex(keys, fill_value=0.0)
+    n = a["n"] + b["n"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = b["mean"] - a["mean"]
+        mean = a["mean"] + delta * b["n"] / n
+        m2 = a["m2"] + b["m2"] + delta**2 * a["n"] * b["n"] / n
+        m3 = (a["m3"] + b["m3"]
+              + delta**3 * a["n"] * b["n"] * (a["n"] - b["n"]) / n**2
+              + 3 * delta * (a["n"] * b["m2"] - b["n"] * a["m2"]) / n)
+    merged = pd.DataFrame({"n": n, "mean": mean, "m2": m2, "m3": m3}, index=keys)
+    # keys without values in one table take the other table's moments
+    merged.loc[a["n"] == 0] = b.loc[a["n"] == 0]
+    merged.loc[b["n"] == 0] = a.loc[b["n"] == 0]
+    return merged
+
+def moments_to_statistics(moments: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Returns mean, variance and standard deviation (ddof=0), and skew per key.
+
+    The skew is the adjusted Fisher-Pearson coefficient as in `pd.Series.skew`
+    (missing for less than three values, 0 for constant values).
+    '''
+    n, m2, m3 = moments["n"], moments["m2"], moments["m3"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = m2 / n
+        skew = (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2**1.5)
+    skew = skew.where(m2 > 0, 0.0).where(n >= 3)
+    return pd.DataFrame({
+        "mean": moments["mean"].where(n > 0),
+        "var": var,
+        "std": np.sqrt(var),
+        "skew": skew,
+    }, index=moments.index)
+
+#####################
+### ACTIVITY STATISTICS (OUT-OF-CORE)
+#####################
+
+STATISTICS_PREFIXES = ["freq_percase", "pos_log", "pos_percase"]
+
+def summarize_activity_statistics(
+        df: pd.DataFrame,
+        compression=200,
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp") -> dict:
+    '''
+    Summarizes one chunk of an event log for the activity statistics
+    (see `get_all_activity_statistics`) with mergeable sketches.
+
+    Each case must be complete in the chunk (e.g., chunks of `iter_xes_chunks`
+    or shards by case). Positions in the log are kept in seconds and normalized
+    by the largest relative time of the whole log in `finalize_activity_statistics`.
+
+    Returns
+    -------
+    dict
+        The summary: event counts, moments, and t-digests per activity.
+    '''
+    times = compute_relative_times(df[CASE_COL], df[TIME_COL])
+    seconds = times["relative_seconds"].astype(float)
+    case_max = times["case_max_seconds"]
+    activities = df[ACT_COL].to_numpy()
+
+    # frequencies per case
+    freq_percase = df.groupby([ACT_COL, CASE_COL], sort=False, observed=True).size()
+    freq_keys = freq_percase.index.get_level_values(0).to_numpy()
+
+    values = {
+        "freq_percase": (freq_keys, freq_percase.to_numpy(dtype=float)),
+        "pos_log": (activities, seconds),
+        "pos_percase": (activities, np.divide(
+            seconds, case_max, out=np.zeros(len(seconds)), where=case_max > 0)),
+    }
+    return {
+        "count": pd.Series(activities).value_counts(sort=False).astype(float),
+        "max_seconds": seconds.max() if len(seconds) > 0 else 0.0,
+        "moments": {
+            prefix: build_moments(keys, vals) for prefix, (keys, vals) in values.items()},
+        "digests": {
+            prefix: build_tdigest(keys, vals, compression) for prefix, (keys, vals) in values.items()},
+    }
+
+def merge_activity_statistics(summaries: list, compression=200) -> dict:
+    '''Merges summaries of `summarize_activity_statistics` (e.g., of several chunks or workers).'''
+    summaries = list(summaries)
+    count = pd.concat([summary["count"] for summary in summaries])
+    moments = {}
+    for prefix in STATISTICS_PREFIXES:
+        moments[prefix] = summaries[0]["moments"][prefix]
+        for summary in summaries[1:]:
+            moments[prefix] = merge_moments(moments[prefix], summary["moments"][prefix])
+    return {
+        "count": count.groupby(level=0, sort=False).sum(),
+        "max_seconds": max(summary["max_seconds"] for summary in summaries),
+        "moments": moments,
+        "digests": {
+            prefix: merge_tdigests(
+                [summary["digests"][prefix] for summary in summaries], compression)
+            for prefix in STATISTICS_PREFIXES},
+    }
+
+def finalize_activity_statistics(summary: dict, ACT_COL="concept:name") -> pd.DataFrame:
+    '''
+    Returns the activity statistics of a (merged) summary with the same columns
+    as `get_all_activity_statistics`.
+
+    Counts, means, variances, standard deviations, and skews are exact; medians
+    and quantiles are t-digest estimates (exact for activities with at most
+    `compression` values).
+    '''
+    qs = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0]  # quantiles
+    activities = summary["count"].index
+    # normalize positions in the log by the largest relative time
+    max_seconds = summary["max_seconds"]
+    scales = {
+        "freq_percase": 1.0,
+        "pos_log": 1.0 / max_seconds if max_seconds > 0 else np.nan,
+        "pos_percase": 1.0,
+    }
+
+    data = {'freq_log_absolute': summary["count"]}
+    quantiles = {}
+    for prefix in STATISTICS_PREFIXES:
+        scale = scales[prefix]
+        moments = moments_to_statistics(summary["moments"][prefix])
+        quantiles[prefix] = tdigest_quantiles(summary["digests"][prefix], qs) * scale
+        data[f'{prefix}_mean'] = moments["mean"] * scale
+        data[f'{prefix}_median'] = quantiles[prefix][0.5]
+        data[f'{prefix}_var'] = moments["var"] * scale**2
+        data[f'{prefix}_std'] = moments["std"] * scale
+        # the skew is scale-free (missing if positions are undefined)
+        data[f'{prefix}_skew'] = moments["skew"].where(
+            pd.Series(scale > 0, index=moments.index))
+
+    # add quantiles to data
+    for prefix in STATISTICS_PREFIXES:
+        for q in qs:
+            data[f'{prefix}_q{int(q*100):02d}'] = quantiles[prefix][q]
+
+    df_statistics = pd.DataFrame(
+        {name: values.reindex(activities).to_numpy(dtype=float) for name, values in data.items()},
+        index=activities)
+    df_statistics.index.name = ACT_COL
+    return df_statistics
+
+def compute_activity_statistics_from_chunks(
+        chunks,
+        compression=200,
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp") -> pd.DataFrame:
+    '''
+    Computes the activity statistics of an event log from case-complete chunks
+    (e.g., `iter_xes_chunks`), holding only one chunk and the sketches in memory.
+    '''
+    summary = None
+    for chunk in chunks:
+        chunk_summary = summarize_activity_statistics(
+            chunk, compression=compression, ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL)
+        summary = chunk_summary if summary is None else merge_activity_statistics(
+            [summary, chunk_summary], compression=compression)
+    if summary is None:
+        raise ValueError("No chunks to compute activity statistics from.")
+    return finalize_activity_statistics(summary, ACT_COL=ACT_COL)
@@ -0,0 +1,354 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import io
+import mmap
+import os
+import re
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree.ElementTree import iterparse
+
+#####################
+### STREAMING XES READER
+#####################
+
+XES_ATTRIBUTE_TAGS = {"string", "date", "int", "float", "boolean", "id"}
+
+def _local_tag(tag: str) -> str:
+    '''Removes the namespace from an XML tag.'''
+    return tag.rpartition("}")[2]
+
+def _convert_xes_value(tag: str, value: str):
+    '''Converts the string value of a XES attribute into a Python value.
+    (Dates are kept as strings and converted per chunk.)
+    '''
+    if tag == "int":
+        return int(value)
+    elif tag == "float":
+        return float(value)
+    elif tag == "boolean":
+        return value.lower() == "true"
+    return value
+
+def _build_xes_chunk(
+        records: list,
+        case_codes: list,
+        act_codes: list,
+        timestamps: list,
+        case_categories: list,
+        act_categories: list,
+        event_keys: dict,
+        case_keys: dict,
+        ACT_COL: str,
+        CASE_COL: str,
+        TIME_COL: str) -> pd.DataFrame:
+    '''Creates a dataframe for one chunk of parsed events.
+    Column order follows pm4py: event attributes first, then case attributes.
+    '''
+    df = pd.DataFrame.from_records(records, nrows=len(case_codes))
+    df.index = pd.RangeIndex(len(case_codes))
+    # missing activities have code -1 (NaN)
+    df[ACT_COL] = pd.Categorical.from_codes(
+        np.asarray(act_codes, dtype=np.int32), categories=list(act_categories))
+    df[TIME_COL] = pd.to_datetime(
+        pd.Series(timestamps, dtype=object), utc=True, format="ISO8601")
+    # each chunk only stores the case categories of its own cases
+    # (codes are increasing in order of appearance, -1 is missing)
+    codes = np.asarray(case_codes, dtype=np.int32)
+    used = np.unique(codes[codes >= 0])
+    df[CASE_COL] = pd.Categorical.from_codes(
+        np.where(codes >= 0, np.searchsorted(used, codes), -1).astype(np.int32), 
+        categories=[case_categories[code] for code in used])
+    columns = [col for col in list(event_keys) + list(case_keys) if col in df.columns]
+    columns += [col for col in df.columns if col not in columns]
+    return df[columns]
+
+def iter_xes_chunks(
+        path,
+        chunk_size=100_000,
+        columns=None,
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp"):
+    '''
+    Iterates over a XES file and yields case-complete chunks as dataframes.
+
+    The file is parsed incrementally (iterparse), hence only one chunk is held 
+    in memory. Case identifiers and activities are encoded as categoricals 
+    while parsing. The activity categories grow with every chunk, i.e., each 
+    chunk contains all activities seen so far as categories.
+
+    Parameters
+    ----------
+    path : str, Path, or file object
+        Path to the XES file.
+    chunk_size : int, default=100_000
+        Minimum number of events per chunk (a chunk is only emitted at the end of a trace).
+    columns : list, optional
+        Columns to keep (case attributes with "case:" prefix). Other attributes 
+        are skipped while parsing. Activity, case, and timestamp are always kept.
+    ACT_COL, CASE_COL, TIME_COL : str
+        Attribute keys for activity, case (with "case:" prefix), and timestamp.
+
+    Yields
+    ------
+    pd.DataFrame
+        Events of complete traces in the same format as `pm4py.read_xes`.
+    '''
+    case_key = CASE_COL.removeprefix("case:")
+    # keys to parse (None parses all attributes)
+    event_projection, trace_projection = None, None
+    if columns is not None:
+        event_projection = set(columns) | {ACT_COL, TIME_COL}
+        trace_projection = {
+            col.removeprefix("case:") for col in columns if col.startswith("case:")}
+        trace_projection.add(case_key)
+    act_index, act_categories = {}, []
+    case_index, case_categories = {}, []
+    # attribute keys in order of appearance
+    event_keys, case_keys = {}, {}
+
+    records, case_codes, act_codes, timestamps = [], [], [], []
+    trace_attrs, trace_events, event = None, None, None
+    depth, trace_depth, event_depth = 0, -1, -1
+    root = None
+
+    source = path if hasattr(path, "read") else str(path)
+    for xml_event, elem in iterparse(source, events=("start", "end")):
+        if xml_event == "start":
+            depth += 1
+            if root is None:
+                root = elem
+            tag = _local_tag(elem.tag)
+            if tag in XES_ATTRIBUTE_TAGS:
+                # only direct attributes of events and traces (no nested lists)
+                if event is not None and depth == event_depth + 1:
+                    key = elem.get("key")
+                    if event_projection is None or key in event_projection:
+                        event[key] = _convert_xes_value(tag, elem.get("value"))
+                elif trace_attrs is not None and event is None and depth == trace_depth + 1:
+                    key = elem.get("key")
+                    if trace_projection is None or key in trace_projection:
+                        trace_attrs[key] = _convert_xes_value(tag, elem.get("value"))
+            elif tag == "event" and trace_attrs is not None:
+                event, event_depth = {}, depth
+            elif tag == "trace":
+                trace_attrs, trace_events, trace_depth = {}, [], depth
+            continue
+
+        depth -= 1
+        tag = _local_tag(elem.tag)
+        if tag == "event" and event is not None and depth == event_depth - 1:
+            trace_events.append(event)
+            event = None
+            elem.clear()
+        elif tag == "trace" and trace_attrs is not None:
+            for key in trace_attrs:
+                case_keys.setdefault("case:" + key, None)
+            case_keys.setdefault(CASE_COL, None)
+            # traces with equal (or empty) identifiers are one case and 
+            # traces without identifier have a missing case, as in pm4py
+            case_id = trace_attrs.pop(case_key, None)
+            if case_id is None:
+                case_code = -1
+            else:
+                case_id = str(case_id)
+                case_code = case_index.get(case_id)
+                if case_code is None:
+                    case_code = case_index[case_id] = len(case_categories)
+                    case_categories.append(case_id)
+            case_attrs = {"case:" + key: value for key, value in trace_attrs.items()}
+            for event in trace_events:
+                for key in event:
+                    event_keys.setdefault(key, None)
+                activity = event.pop(ACT_COL, None)
+                code = act_index.get(activity)
+                if activity is None:
+                    code = -1
+                elif code is None:
+                    code = act_index[activity] = len(act_categories)
+                    act_categories.append(activity)
+                act_codes.append(code)
+                case_codes.append(case_code)
+                timestamps.append(event.pop(TIME_COL, None))
+                event.update(case_attrs)
+                records.append(event)
+            trace_attrs, trace_events, event = None, None, None
+            # free the parsed elements
+            elem.clear()
+            root.clear()
+            if len(records) >= chunk_size:
+                yield _build_xes_chunk(
+                    records, case_codes, act_codes, timestamps, 
+                    case_categories, act_categories, event_keys, case_keys,
+                    ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL)
+                records, case_codes, act_codes, timestamps = [], [], [], []
+
+    if len(records) > 0:
+        yield _build_xes_chunk(
+            records, case_codes, act_codes, timestamps, 
+            case_categories, act_categories, event_keys, case_keys,
+            ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL)
+
+def concat_event_log_chunks(
+        chunks,
+        categorical_cols=("concept:name", "case:concept:name")) -> pd.DataFrame:
+    '''
+    Concatenates event log chunks into one dataframe with a consistent 
+    categorical encoding of `categorical_cols`.
+    '''
+    chunks = list(chunks)
+    if len(chunks) == 0:
+        return pd.DataFrame()
+    for col in categorical_cols:
+        if not all(
+                col in chunk.columns and isinstance(chunk[col].dtype, pd.CategoricalDtype)
+                for chunk in chunks):
+            continue
+        # recode each chunk to the union of the categories (in order of 
+        # appearance) before concatenating, hence the column stays categorical
+        categories = chunks[0][col].cat.categories.append(
+            [chunk[col].cat.categories for chunk in chunks[1:]]).unique()
+        chunks = [
+            chunk.assign(**{col: chunk[col].cat.set_categories(categories)})
+            for chunk in chunks]
+    return pd.concat(chunks, ignore_index=True)
+
+def read_xes_chunked(
+        path,
+        chunk_size=100_000,
+        columns=None,
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp") -> pd.DataFrame:
+    '''
+    Reads a XES file chunk by chunk (see `iter_xes_chunks`) into one dataframe 
+    with categorical case and activity columns.
+    '''
+    return concat_event_log_chunks(
+        iter_xes_chunks(
+            path, chunk_size=chunk_size, columns=columns,
+            ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL),
+        categorical_cols=(ACT_COL, CASE_COL))
+
+
+#####################
+### PARALLEL XES READER
+#####################
+
+# element names may have a namespace prefix (e.g., "<xes:trace>")
+_TRACE_START = re.compile(rb"<(?:[\w.-]+:)?trace[\s>]")
+_LOG_START = re.compile(rb"<((?:[\w.-]+:)?log)(?=[\s/>])(?:[^>\"']|\"[^\"]*\"|'[^']*')*>")
+
+def find_xes_trace_blocks(path, num_blocks: int) -> tuple[bytes, bytes, list]:
+    '''
+    Splits a XES file at `<trace>` boundaries into blocks of similar byte size.
+
+    Returns
+    -------
+    tuple
+        The XML declaration of the file (may be empty) followed by the 
+        original `<log ...>` start tag (with its namespace declarations), 
+        the matching end tag, and a list of (start, end) byte offsets of 
+        blocks containing complete traces.
+    '''
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        declaration = b""
+        if mm[:5] == b"<?xml":
+            declaration = mm[:mm.find(b"?>") + 2]
+        log_start = _LOG_START.search(mm)
+        if log_start is None:
+            raise ValueError(f"'{path}' is not a XES file (missing <log>).")
+        header = declaration + log_start.group(0)
+        footer = b"</" + log_start.group(1) + b">"
+        first = _TRACE_START.search(mm, log_start.end())
+        if first is None:
+            return header, footer, []
+        end = mm.rfind(footer)
+        if end < 0:
+            raise ValueError(
+                f"'{path}' is not a complete XES file (missing {footer.decode()}).")
+        block_size = max(1, (end - first.start()) // max(1, num_blocks))
+        starts = [first.start()]
+        while True:
+            match = _TRACE_START.search(mm, starts[-1] + block_size, end)
+            if match is None:
+                break
+            starts.append(match.start())
+    return header, footer, list(zip(starts, starts[1:] + [end]))
+
+def _read_xes_block(args) -> pd.DataFrame:
+    '''Parses one block of traces of a XES file (worker function).'''
+    path, header, footer, start, end, columns, ACT_COL, CASE_COL, TIME_COL = args
+    with open(path, "rb") as f:
+        f.seek(start)
+        block = f.read(end - start)
+    source = io.BytesIO(header + block + footer)
+    chunks = list(iter_xes_chunks(
+        source, chunk_size=float("inf"), columns=columns,
+        ACT_COL=ACT_COL, CASE_COL=CASE_COL, TIME_COL=TIME_COL))
+    return chunks[0] if len(chunks) > 0 else pd.DataFrame()
+
+def read_xes_parallel(
+        path,
+        n_jobs=-1,
+        num_blocks=None,
+        columns=None,
+        ACT_COL="concept:name",
+        CASE_COL="case:concept:name",
+        TIME_COL="time:timestamp") -> pd.DataFrame:
+    '''
+    Reads a XES file in parallel with a process pool.
+
+    The file is split at `<trace>` boundaries into `num_blocks` blocks 
+    (default: 4 per process), which are parsed independently (see 
+    `iter_xes_chunks`). The results are concatenated in file order with 
+    one consistent categorical encoding of case identifiers and activities.
+
+    Parameters
+    ----------
+    path : str or Path
+        Path to the XES file.
+    n_jobs : int, default=-1
+        Number of processes (-1 uses all CPUs).
+    num_blocks : int, optional
+        Number of blocks to split the file into.
+    columns : list, optional
+        Columns to keep (see `iter_xes_chunks`).
+    '''
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    if num_blocks is None:
+        num_blocks = 4 * n_jobs
+    header, footer, blocks = find_xes_trace_blocks(path, num_blocks)
+    tasks = [
+        (str(path), header, footer, start, end, columns, ACT_COL, CASE_COL, TIME_COL)
+        for start, end in blocks]
+    if n_jobs == 1 or len(tasks) <= 1:
+        chunks = [_read_xes_block(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunks = list(executor.map(_read_xes_block, tasks))
+    return concat_event_log_chunks(
+        [chunk for chunk in chunks if len(chunk) > 0], 
+        categorical_cols=(ACT_COL, CASE_COL))
@@ -0,0 +1,228 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import json
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+
+#####################
+### PROFILING: RECORDS
+#####################
+
+# Columns of a profile report (one row per profiled step); times are in 
+# seconds (start relative to the session) and peak_memory_bytes is the peak
+# memory above the memory at the start of the step
+PROFILE_COLUMNS = [
+    "name", "step", "depth", "start_seconds", "wall_seconds", "cpu_seconds",
+    "rows_in", "rows_out", "peak_memory_bytes", "cached"]
+
+# Open profiling sessions (innermost last) and the steps that are running
+_PROFILE_SESSIONS = []
+_OPEN_RECORDS = []
+
+def _cpu_seconds() -> float:
+    '''Returns the CPU time of the process and of its finished child processes
+    (e.g., the workers of a process pool).
+    '''
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+def _rss_is_resettable() -> bool:
+    '''Returns whether the peak resident set size can be reset (Linux).'''
+    return os.access("/proc/self/clear_refs", os.W_OK) and os.path.exists("/proc/self/status")
+
+def _get_memory(memory) -> tuple:
+    '''Returns the current and the peak memory in bytes.'''
+    if memory == "tracemalloc":
+        return tracemalloc.get_traced_memory()
+    if memory == "rss":
+        with open("/proc/self/status") as f:
+            status = f.read()
+        current = int(re.search(r"VmRSS:\s+(\d+)", status).group(1))
+        peak = int(re.search(r"VmHWM:\s+(\d+)", status).group(1))
+        return current * 1024, peak * 1024
+    return 0, 0
+
+def _reset_peak_memory(memory):
+    '''Resets the peak memory to the current memory.'''
+    if memory == "tracemalloc":
+        tracemalloc.reset_peak()
+    elif memory == "rss":
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+
+def is_profiling() -> bool:
+    '''Returns whether a profiling session is active.'''
+    return bool(_PROFILE_SESSIONS)
+
+@contextmanager
+def profiling_session(enabled=True, callback=None, memory="tracemalloc"):
+    '''
+    Collects the records of all steps profiled with `profiled` in its body.
+
+    Parameters
+    ----------
+    enabled : bool, default=True
+        If False, nothing is recorded (and profiled steps cost nothing).
+    callback : callable, optional
+        Called with each record (a dict, see PROFILE_COLUMNS) when its step 
+        finishes.
+    memory : str, default="tracemalloc"
+        How the peak memory is measured: "tracemalloc" (Python and numpy 
+        allocations, but not pyarrow's; slows down steps that create many 
+        Python objects), "rss" (peak resident set size of the process, Linux 
+        only), or None (not measured). "rss" resets the peak resident set 
+        size of the whole process (VmHWM, via /proc/self/clear_refs) at the 
+        start of each step, hence other peak measurements of the process 
+        (e.g., `resource.getrusage` or a surrounding profiler) are no longer 
+        valid afterwards.
+
+    Yields
+    ------
+    list
+        The records, in the order in which the steps finished.
+    '''
+    records = []
+    if not enabled:
+        yield records
+        return
+    if memory not in ["rss", "tracemalloc", None]:
+        raise ValueError(f"Unknown memory mode: {memory}")
+    if memory == "rss" and not _rss_is_resettable():
+        raise ValueError("memory='rss' requires a writable /proc/self/clear_refs (Linux).")
+    started_tracing = memory == "tracemalloc" and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    _PROFILE_SESSIONS.append({
+        "records": records, "callback": callback, "memory": memory, 
+        "start": time.perf_counter()})
+    try:
+        yield records
+    finally:
+        _PROFILE_SESSIONS.pop()
+        if started_tracing:
+            tracemalloc.stop()
+
+@contextmanager
+def profiled(name, step="", rows_in=None):
+    '''
+    Records the wall time, CPU time, and peak memory of its body in the 
+    active profiling session (if any). Steps can be nested.
+
+    The yielded record can be updated in the body, e.g., with "rows_out" or
+    "cached", and is dropped if "discard" is set (without an active session,
+    it is a dict that is not kept).
+    '''
+    record = {"name": name, "step": step, "rows_in": rows_in, "rows_out": None, "cached": False}
+    if not _PROFILE_SESSIONS:
+        yield record
+        return
+    session = _PROFILE_SESSIONS[-1]
+    memory = session["memory"]
+    current, peak = _get_memory(memory)
+    if _OPEN_RECORDS:
+        # keep the peak of the enclosing step before measuring this one
+        _OPEN_RECORDS[-1]["_peak"] = max(_OPEN_RECORDS[-1]["_peak"], peak)
+    _reset_peak_memory(memory)
+    record.update({
+        "depth": len(_OPEN_RECORDS), "_memory": current, "_peak": current,
+        "_cpu": _cpu_seconds(), "_start": time.perf_counter()})
+    _OPEN_RECORDS.append(record)
+    try:
+        yield record
+    finally:
+        end = time.perf_counter()
+        _OPEN_RECORDS.pop()
+        peak = max(record.pop("_peak"), _get_memory(memory)[1])
+        if _OPEN_RECORDS:
+            _OPEN_RECORDS[-1]["_peak"] = max(_OPEN_RECORDS[-1]["_peak"], peak)
+        record["peak_memory_bytes"] = peak - record.pop("_memory") if memory else None
+        record["cpu_seconds"] = _cpu_seconds() - record.pop("_cpu")
+        start = record.pop("_start")
+        record["start_seconds"] = start - session["start"]
+        record["wall_seconds"] = end - start
+        if not record.pop("discard", False):
+            session["records"].append(record)
+            if session["callback"] is not None:
+                session["callback"](dict(record))
+
+def count_rows(obj):
+    '''Returns the number of rows of a dataframe or series (None otherwise).'''
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    return None
+
+#####################
+### PROFILING: REPORTS
+#####################
+
+def create_profile_report(records: list) -> pd.DataFrame:
+    '''Returns the records of a profiling session as a dataframe (one row per
+    step, ordered by start time).
+    '''
+    report = pd.DataFrame(records, columns=PROFILE_COLUMNS)
+    report["rows_in"] = report["rows_in"].astype("Int64")
+    report["rows_out"] = report["rows_out"].astype("Int64")
+    report["peak_memory_bytes"] = report["peak_memory_bytes"].astype("Int64")
+    return report.sort_values(["start_seconds", "depth"], ignore_index=True)
+
+def export_chrome_trace(report: pd.DataFrame, path) -> Path:
+    '''
+    Writes a profile report as a Chrome trace (JSON), which can be opened in
+    chrome://tracing or https://ui.perfetto.dev.
+
+    Parameters
+    ----------
+    report : pd.DataFrame
+        Profile report (see `create_profile_report`).
+    path : str or Path
+        Output file.
+
+    Returns
+    -------
+    Path
+        The output file.
+    '''
+    events = []
+    for record in report.to_dict("records"):
+        events.append({
+            "name": record["name"],
+            "cat": record["step"] or "step",
+            "ph": "X",
+            "ts": round(record["start_seconds"] * 1e6, 3),
+            "dur": round(record["wall_seconds"] * 1e6, 3),
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": {
+                col: (None if pd.isna(record[col]) else record[col].item() 
+                      if hasattr(record[col], "item") else record[col])
+                for col in ["step", "cpu_seconds", "rows_in", "rows_out", "peak_memory_bytes", "cached"]},
+        })
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, indent=1)
+    return path
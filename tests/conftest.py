@@ -0,0 +1,58 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+
+#####################
+### SYNTHETIC EVENT LOGS
+#####################
+
+def make_event_log(num_cases=150, num_activities=12, seed=0) -> pd.DataFrame:
+    '''Returns a seeded event log in the format of `pm4py.read_xes`.
+
+    Activities drift forward through the activity list with random jumps,
+    and about 5% of the events share the timestamp of their predecessor
+    (timestamp ties). Some cases have a single event.
+    '''
+    rng = np.random.default_rng(seed)
+    activities = [f"act {i:02d}" for i in range(num_activities)]
+    start = pd.Timestamp("2020-01-01", tz="UTC")
+    rows = []
+    for case in range(num_cases):
+        num_events = int(rng.integers(1, 15))
+        time = start + pd.Timedelta(days=int(rng.integers(0, 200)))
+        position = 0
+        for _ in range(num_events):
+            position = min(num_activities - 1, max(0, position + int(rng.integers(-1, 3))))
+            if rng.random() < 0.1:
+                position = int(rng.integers(0, num_activities))
+            if rng.random() > 0.05:
+                time = time + pd.Timedelta(seconds=int(rng.exponential(3600)) + 1)
+            rows.append((activities[position], time, f"case {case}", f"res {rng.integers(0, 5)}"))
+    return pd.DataFrame(
+        rows, columns=["concept:name", "time:timestamp", "case:concept:name", "org:resource"])
+
+@pytest.fixture
+def event_log() -> pd.DataFrame:
+    '''A seeded synthetic event log.'''
+    return make_event_log()
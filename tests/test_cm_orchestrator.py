@@ -0,0 +1,84 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import pandas as pd
+import pytest
+from varexpm.cm_methods import (
+    enhance_log_for_concise_model, 
+    discover_concise_model,
+    load_event_log_for_concise_model
+)
+from varexpm.utils.data_processing import get_required_columns
+from conftest import make_event_log
+
+#####################
+### LOG IMPORT
+#####################
+
+@pytest.mark.parametrize("reader", ["stream", "pm4py"])
+def test_projected_load_returns_only_required_columns(reader):
+    log = load_event_log_for_concise_model("runningexample.xes", "input", reader=reader)
+
+    assert sorted(log.columns) == sorted(get_required_columns())
+    assert len(log) == 42
+
+def test_projected_load_matches_full_load():
+    projected = load_event_log_for_concise_model("runningexample.xes", "input")
+    full = load_event_log_for_concise_model("runningexample.xes", "input", reader="pm4py")
+
+    for col in get_required_columns():
+        pd.testing.assert_series_equal(
+            projected[col].astype(full[col].dtype), full[col], check_names=False)
+
+#####################
+### LOG ENHANCEMENT
+#####################
+
+def _categoricals_as_strings(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({
+        col: str for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+def test_categorical_input_matches_string_input(event_log):
+    expected = enhance_log_for_concise_model(event_log, num_stages=3, seed=1)
+    categorical_log = event_log.astype(
+        {"case:concept:name": "category", "concept:name": "category"})
+
+    result = enhance_log_for_concise_model(categorical_log, num_stages=3, seed=1)
+
+    for col in ("case:concept:name", "concept:name", "concept:name:rep"):
+        assert isinstance(result[col].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(_categoricals_as_strings(result), _categoricals_as_strings(expected))
+
+#####################
+### MODEL DISCOVERY
+#####################
+
+@pytest.mark.parametrize("hide_common_activities", [False, True])
+def test_discover_concise_model_keys_are_sorted(hide_common_activities):
+    log = make_event_log(num_cases=200, num_activities=25, seed=0)
+    enhanced_log = enhance_log_for_concise_model(
+        log, num_stages=3, seed=1, hide_common_activities=hide_common_activities)
+
+    _, _, _, stage_comm_dict, comm_acts_dict = discover_concise_model(enhanced_log)
+
+    assert len(comm_acts_dict) > 1
+    assert list(comm_acts_dict) == sorted(comm_acts_dict)
+    assert list(stage_comm_dict) == sorted(stage_comm_dict)
@@ -0,0 +1,94 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import pandas as pd
+import pytest
+from varexpm.cm_methods import enhance_log_for_concise_model
+from varexpm.cm_methods import cm_pipeline
+from varexpm.cm_methods.cm_pipeline import (
+    clear_pipeline_cache,
+    get_pipeline_cache_stats,
+    set_pipeline_cache_limits
+)
+
+#####################
+### PIPELINE CACHE
+#####################
+
+@pytest.fixture(autouse=True)
+def empty_pipeline_cache():
+    '''Runs each test with an empty cache and the default limits.'''
+    limits = cm_pipeline.PIPELINE_CACHE_SIZE, cm_pipeline.PIPELINE_CACHE_MAX_BYTES
+    clear_pipeline_cache()
+    yield
+    set_pipeline_cache_limits(*limits)
+    clear_pipeline_cache()
+
+def test_cached_pipeline_matches_uncached_pipeline(event_log):
+    expected = enhance_log_for_concise_model(event_log, num_stages=3, seed=42)
+
+    cold = enhance_log_for_concise_model(event_log, num_stages=3, seed=42, cache=True)
+    warm = enhance_log_for_concise_model(event_log, num_stages=3, seed=42, cache=True)
+
+    pd.testing.assert_frame_equal(cold, expected)
+    pd.testing.assert_frame_equal(warm, expected)
+    assert get_pipeline_cache_stats()["hits"] > 0
+
+def test_changed_parameter_matches_uncached_pipeline(event_log):
+    enhance_log_for_concise_model(event_log, num_stages=3, seed=42, cache=True)
+
+    cached = enhance_log_for_concise_model(
+        event_log, num_stages=3, seed=42, num_act_ranks=1, cache=True)
+
+    expected = enhance_log_for_concise_model(
+        event_log, num_stages=3, seed=42, num_act_ranks=1)
+    pd.testing.assert_frame_equal(cached, expected)
+
+def test_cached_pipeline_matches_disk_cache(event_log, tmp_path):
+    expected = enhance_log_for_concise_model(event_log, num_stages=3, seed=42)
+    enhance_log_for_concise_model(event_log, num_stages=3, seed=42, cache_dir=tmp_path)
+    clear_pipeline_cache()
+
+    result = enhance_log_for_concise_model(event_log, num_stages=3, seed=42, cache_dir=tmp_path)
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert get_pipeline_cache_stats()["disk_hits"] > 0
+
+def test_changing_returned_log_does_not_change_cache_hits(event_log):
+    expected = enhance_log_for_concise_model(event_log, num_stages=3, seed=42)
+    result = enhance_log_for_concise_model(event_log, num_stages=3, seed=42, cache=True)
+
+    # in-place changes of the returned log
+    result.loc[result.index[0], "time:relative:seconds"] = -1.0
+    result.iloc[1, result.columns.get_loc("stage:number")] = 99
+    result["concept:name"] = "changed"
+
+    warm = enhance_log_for_concise_model(event_log, num_stages=3, seed=42, cache=True)
+    pd.testing.assert_frame_equal(warm, expected)
+
+def test_cache_is_bounded_by_size(event_log):
+    set_pipeline_cache_limits(max_bytes=1)
+
+    enhance_log_for_concise_model(event_log, num_stages=3, seed=42, cache=True)
+
+    stats = get_pipeline_cache_stats()
+    assert stats["bytes"] <= 1
+    assert stats["writes"] > 0
@@ -0,0 +1,74 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import importlib.util
+import pandas as pd
+import pytest
+from varexpm.cm_methods import enhance_log_for_concise_model, enhance_log_out_of_core
+from conftest import make_event_log
+
+pytest.importorskip("pyarrow")
+
+#####################
+### OUT-OF-CORE ENHANCEMENT
+#####################
+
+def _as_comparable(df: pd.DataFrame) -> pd.DataFrame:
+    '''Returns the log sorted by index with categorical columns as strings.'''
+    df = df.sort_index()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str)
+    return df
+
+@pytest.mark.parametrize("num_shards, n_jobs, params", [
+    (1, 1, dict(num_stages=3, seed=3)),
+    (4, 1, dict(num_stages=3, seed=3, num_comm_ranks=2, num_act_ranks=2)),
+    (7, 2, dict(num_stages=2, seed=5, num_comm_ranks=1, hide_common_activities=True)),
+])
+def test_out_of_core_matches_in_memory_approx_median(tmp_path, num_shards, n_jobs, params):
+    log = make_event_log(num_cases=300, num_activities=20, seed=7)
+    expected = enhance_log_for_concise_model(log, rank_agg_type="approx_median", **params)
+
+    chunks = (log.iloc[start:start + 500] for start in range(0, len(log), 500))
+    output_dir = enhance_log_out_of_core(
+        chunks, tmp_path / "output", num_shards=num_shards, chunk_size=500,
+        work_dir=tmp_path / "work", n_jobs=n_jobs, rank_agg_type="approx_median", **params)
+    result = pd.read_parquet(output_dir)
+
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(
+        _as_comparable(result), _as_comparable(expected))
+
+def test_out_of_core_rejects_exact_medians(tmp_path):
+    with pytest.raises(ValueError):
+        enhance_log_out_of_core(
+            [make_event_log(num_cases=10)], tmp_path, rank_agg_type="median")
+
+def test_out_of_core_without_pyarrow_points_to_io_extra(tmp_path, monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        importlib.util, "find_spec", 
+        lambda name, *args: None if name == "pyarrow" else find_spec(name, *args))
+
+    with pytest.raises(ImportError, match=r"varexpm\[io\]"):
+        enhance_log_out_of_core([make_event_log(num_cases=10)], tmp_path)
+    assert not any(tmp_path.iterdir())
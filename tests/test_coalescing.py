@@ -0,0 +1,84 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import pandas as pd
+import pytest
+from varexpm.cm_methods.patterndefinition.coalescing import (
+    apply_coalescing_to_dataframe,
+    classify_activity_behavior,
+    classify_coalescing_method,
+    coalesce_repeating_events,
+    return_coalescing_classes
+)
+from varexpm.utils.data_processing import (
+    add_activity_position_percase,
+    get_activity_statistics,
+    get_all_activity_statistics,
+    normalize_reltimes_log
+)
+
+#####################
+### COALESCING
+#####################
+
+@pytest.fixture
+def aligned_log(event_log) -> pd.DataFrame:
+    '''The event log with relative times and positions per case.'''
+    return add_activity_position_percase(normalize_reltimes_log(event_log))
+
+def _coalesce_per_class(df: pd.DataFrame) -> pd.DataFrame:
+    '''The former coalescing: per-activity statistics and one pass per class.'''
+    df_act_statistics = df.groupby("concept:name", sort=False, observed=True).apply(
+        get_activity_statistics)
+    df_act_statistics['activity:behavior:class'] = df_act_statistics.apply(
+        classify_activity_behavior, axis=1)
+    df_act_statistics['coalescing:class'] = df_act_statistics.apply(
+        classify_coalescing_method, axis=1)
+    for coalesc_type in df_act_statistics['coalescing:class'].dropna().unique():
+        activity_list = df_act_statistics.loc[
+            df_act_statistics['coalescing:class'] == coalesc_type].index.tolist()
+        df = coalesce_repeating_events(df, activity_list=activity_list, coalesc_type=coalesc_type)
+    return df
+
+def test_coalescing_classes_match_per_activity_classes(aligned_log):
+    per_activity = aligned_log.groupby("concept:name", sort=False, observed=True).apply(
+        get_activity_statistics)
+    per_activity['activity:behavior:class'] = per_activity.apply(classify_activity_behavior, axis=1)
+    expected = per_activity.apply(classify_coalescing_method, axis=1).dropna()
+
+    classes = return_coalescing_classes(get_all_activity_statistics(aligned_log))
+
+    assert len(classes) > 0
+    result = {
+        activity: coalesc_type 
+        for coalesc_type, activities in classes.items() for activity in activities}
+    assert result == expected.to_dict()
+
+def test_single_mask_coalescing_matches_per_class_coalescing(aligned_log):
+    expected = _coalesce_per_class(aligned_log.copy())
+    assert expected["events:ignore"].sum() > 0
+
+    marked = apply_coalescing_to_dataframe(aligned_log.copy())
+    dropped = apply_coalescing_to_dataframe(aligned_log.copy(), drop_events=True)
+
+    pd.testing.assert_frame_equal(marked, expected)
+    pd.testing.assert_frame_equal(
+        dropped, expected.loc[expected["events:ignore"] == 0].drop(columns="events:ignore"))
@@ -0,0 +1,150 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+from cdlib import algorithms
+from varexpm.cm_methods.patterndefinition.communitydetection import (
+    create_map_from_community_dictionary,
+    detect_communities,
+    discover_communities_in_graph,
+    return_community_column,
+    sweep_dependency_thresholds
+)
+from varexpm.cm_methods.visualization.modeldiscovery import discover_multi_dependency_graphs
+from varexpm.utils.data_processing import normalize_reltimes_log
+
+#####################
+### HELPERS
+#####################
+
+@pytest.fixture
+def staged_log(event_log):
+    '''The event log with three stages of equal width over the log-normalized time.'''
+    df = normalize_reltimes_log(event_log)
+    df["stage:number"] = np.minimum(
+        (df["time:relative:normalized:log"] * 3).astype(int), 2) + 1
+    return df
+
+def _leiden_communities(G, seed):
+    '''The communities of cdlib's Leiden algorithm on integer node labels.'''
+    nodes = list(G.nodes())
+    coms = algorithms.leiden(
+        nx.relabel_nodes(G, {name: i for i, name in enumerate(nodes)}), seed=seed)
+    return [[nodes[n] for n in com] for com in coms.communities]
+
+def _partition(communities):
+    '''The communities as a set of frozensets (independent of the order).'''
+    return {frozenset(com) for com in communities}
+
+#####################
+### COMMUNITY DETECTION
+#####################
+
+def test_detect_communities_matches_seeded_leiden(staged_log):
+    graphs = discover_multi_dependency_graphs(staged_log, dependency_threshold=0.5)
+
+    for G in graphs:
+        communities, membership = detect_communities(G, seed=42)
+        assert communities == _leiden_communities(G, seed=42)
+        assert detect_communities(G, seed=42) == (communities, membership)
+        # membership is the community index of each node in node order
+        for number, com in enumerate(communities):
+            for node in com:
+                assert membership[list(G.nodes()).index(node)] == number
+
+def test_discover_communities_does_not_depend_on_n_jobs(staged_log):
+    graphs = discover_multi_dependency_graphs(staged_log, dependency_threshold=0.5)
+
+    serial = discover_communities_in_graph(graphs, n_jobs=1, seed=7)
+    parallel = discover_communities_in_graph(graphs, n_jobs=2, seed=7)
+
+    assert list(serial) == [G.graph["name"] for G in graphs]
+    assert serial == parallel
+    assert serial == {G.graph["name"]: _leiden_communities(G, seed=7) for G in graphs}
+
+def test_detect_communities_with_initial_membership(staged_log):
+    graphs = discover_multi_dependency_graphs(staged_log, dependency_threshold=0.5)
+
+    for G in graphs:
+        communities, membership = detect_communities(G, seed=3)
+        warm, warm_membership = detect_communities(G, seed=3, initial_membership=membership)
+        # a valid partition of the same nodes, at least as modular as the start
+        assert sorted(node for com in warm for node in com) == sorted(G.nodes())
+        assert len(warm_membership) == G.number_of_nodes()
+        assert (nx.community.modularity(G, warm) 
+                >= nx.community.modularity(G, communities) - 1e-12)
+
+#####################
+### COMMUNITY COLUMN
+#####################
+
+def test_return_community_column_matches_row_mapping(staged_log):
+    graphs = discover_multi_dependency_graphs(staged_log, dependency_threshold=0.5)
+    community_dict = discover_communities_in_graph(graphs, seed=0)
+    # one stage without communities, i.e., missing keys
+    community_dict.pop(graphs[-1].graph["name"])
+
+    result = return_community_column(staged_log, community_dict)
+    community_map = create_map_from_community_dictionary(community_dict)
+    expected = staged_log.apply(
+        lambda row: community_map.get(
+            (row["stage:number"], row["concept:name"]), None), axis=1)
+
+    assert result.isna().any()
+    pd.testing.assert_series_equal(result, expected, check_dtype=False)
+
+#####################
+### THRESHOLD SWEEP
+#####################
+
+def _graph_summary(graph):
+    '''Returns the nodes (in order) and the weighted edges of a dependency graph.'''
+    edges = sorted(
+        (str(u), str(v), round(data.get("weight", 0), 12)) 
+        for u, v, data in graph.edges(data=True))
+    return list(graph.nodes), edges
+
+def test_sweep_dependency_thresholds_matches_per_threshold_discovery(staged_log):
+    thresholds = [0.5, 0.9, 0.0]
+
+    sweep = sweep_dependency_thresholds(staged_log, thresholds, seed=11, warm_start=False)
+
+    assert list(sweep) == thresholds
+    for threshold in thresholds:
+        graphs = discover_multi_dependency_graphs(staged_log, dependency_threshold=threshold)
+        assert ([_graph_summary(G) for G in sweep[threshold]["graphs"]] 
+                == [_graph_summary(G) for G in graphs])
+        assert (sweep[threshold]["communities"] 
+                == discover_communities_in_graph(graphs, seed=11))
+
+def test_warm_started_sweep_returns_partitions_of_the_stage_activities(staged_log):
+    thresholds = [0.0, 0.5, 0.9]
+
+    sweep = sweep_dependency_thresholds(staged_log, thresholds, seed=11)
+
+    assert list(sweep) == thresholds
+    for threshold in thresholds:
+        for G in sweep[threshold]["graphs"]:
+            communities = sweep[threshold]["communities"][G.graph["name"]]
+            assert sorted(node for com in communities for node in com) == sorted(G.nodes())
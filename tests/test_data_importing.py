@@ -0,0 +1,73 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import pandas as pd
+import pytest
+from varexpm.utils.data_importing import read_tabular_event_log
+
+#####################
+### CSV AND PARQUET READER
+#####################
+
+COLUMN_MAPPING = {
+    "CaseID": "case:concept:name", 
+    "Activity": "concept:name", 
+    "Start": "time:timestamp"}
+
+@pytest.fixture
+def source_log(event_log) -> pd.DataFrame:
+    '''The event log with source column names and integer case identifiers.'''
+    df = event_log.rename(columns={target: source for source, target in COLUMN_MAPPING.items()})
+    df["CaseID"] = df["CaseID"].str.removeprefix("case ").astype(int)
+    return df
+
+def _check_event_log(df: pd.DataFrame, source_log: pd.DataFrame):
+    '''Checks the dtypes and values of a log read from source_log.'''
+    assert list(df.columns) == ["concept:name", "time:timestamp", "case:concept:name"]
+    for col in ("case:concept:name", "concept:name"):
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_string_dtype(df[col].cat.categories)
+    assert str(df["time:timestamp"].dt.tz) == "UTC"
+    assert df["case:concept:name"].astype(str).tolist() == source_log["CaseID"].astype(str).tolist()
+    assert df["concept:name"].astype(str).tolist() == source_log["Activity"].tolist()
+    assert (df["time:timestamp"] == source_log["Start"]).all()
+
+def test_csv_reader_maps_columns_and_dtypes(source_log, tmp_path):
+    path = tmp_path / "log.csv"
+    source_log.to_csv(path, index=False)
+
+    df = read_tabular_event_log(
+        path, column_mapping=COLUMN_MAPPING, 
+        columns=["case:concept:name", "concept:name", "time:timestamp"])
+
+    _check_event_log(df, source_log)
+
+def test_parquet_reader_maps_columns_and_dtypes(source_log, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "log.parquet"
+    # naive timestamps are read as UTC
+    source_log.assign(Start=source_log["Start"].dt.tz_localize(None)).to_parquet(path)
+
+    df = read_tabular_event_log(
+        path, column_mapping=COLUMN_MAPPING, 
+        columns=["case:concept:name", "concept:name", "time:timestamp"])
+
+    _check_event_log(df, source_log)
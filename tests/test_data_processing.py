@@ -0,0 +1,232 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import numpy as np
+import pandas as pd
+import pm4py
+import pytest
+from varexpm.utils.data_processing import (
+    compute_variant_index,
+    decode_log_columns,
+    encode_log_columns,
+    filter_variants_top_k,
+    get_activity_statistics,
+    get_all_activity_statistics,
+    group_unique_values_to_dict,
+    map_dict_to_col,
+    map_values_to_col,
+    normalize_reltimes_log
+)
+
+#####################
+### VARIANT FILTER
+#####################
+
+def _log_from_variants(variants: list) -> pd.DataFrame:
+    '''Returns a log with one case per entry of `variants` (activity strings).'''
+    rows = []
+    start = pd.Timestamp("2020-01-01", tz="UTC")
+    for case, variant in enumerate(variants):
+        for position, activity in enumerate(variant):
+            rows.append((f"case {case}", activity, start + pd.Timedelta(minutes=position)))
+    return pd.DataFrame(rows, columns=["case:concept:name", "concept:name", "time:timestamp"])
+
+def _kept_cases(df: pd.DataFrame) -> list:
+    return sorted(df["case:concept:name"].unique())
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4, 5, 10])
+def test_filter_variants_top_k_matches_pm4py_with_count_ties(k):
+    # counts: "ab" 3, then "abc", "ba", "ca" tied at 2, then "a", "cb" tied at 1
+    variants = ["ab", "abc", "ba", "ca", "ab", "a", "ca", "abc", "ba", "ab", "cb"]
+    df = _log_from_variants(variants)
+
+    native = filter_variants_top_k(df, k)
+    reference = pm4py.filter_variants_top_k(df, k)
+
+    assert _kept_cases(native) == _kept_cases(reference)
+
+@pytest.mark.parametrize("k", [1, 5, 20, 1000])
+def test_filter_variants_top_k_matches_pm4py_on_random_log(event_log, k):
+    native = filter_variants_top_k(event_log, k)
+    reference = pm4py.filter_variants_top_k(event_log, k)
+
+    assert _kept_cases(native) == _kept_cases(reference)
+
+def test_filter_variants_top_k_with_precomputed_index(event_log):
+    variant_index = compute_variant_index(event_log)
+
+    for k in (1, 5, 20):
+        pd.testing.assert_frame_equal(
+            filter_variants_top_k(event_log, k, variant_index=variant_index),
+            filter_variants_top_k(event_log, k))
+
+def test_variant_index_keys(event_log):
+    keys = ["cases", "case_variants", "variant_counts", "variant_cases"]
+
+    assert list(compute_variant_index(event_log)) == keys
+    assert list(compute_variant_index(event_log.iloc[:0])) == keys
+
+#####################
+### ACTIVITY STATISTICS
+#####################
+
+def test_all_activity_statistics_match_per_activity_statistics(event_log):
+    df = normalize_reltimes_log(event_log)
+
+    vectorized = get_all_activity_statistics(df)
+    per_activity = df.groupby("concept:name", sort=False, observed=True).apply(
+        get_activity_statistics)
+
+    pd.testing.assert_frame_equal(vectorized, per_activity, check_exact=False)
+
+#####################
+### RELATIVE TIMES
+#####################
+
+def _normalize_reltimes_per_case(df: pd.DataFrame) -> pd.DataFrame:
+    '''The relative times of `normalize_reltimes_log` with the former 
+    per-case mapping and row-wise conversion to seconds.
+    '''
+    starttimes_dict = df.groupby("case:concept:name")["time:timestamp"].min().to_dict()
+    df["time:timestamp:casestart"] = df["case:concept:name"].map(starttimes_dict)
+    df["time:timestamp:relative"] = df["time:timestamp"] - df["time:timestamp:casestart"]
+    df["time:relative:seconds"] = df["time:timestamp:relative"].apply(
+        lambda t: t.total_seconds()).astype(int)
+    df["time:relative:seconds:log"] = np.log(df["time:relative:seconds"] + 1)
+    seconds = df["time:relative:seconds"]
+    df["time:relative:normalized:log"] = (seconds - seconds.min()) / (seconds.max() - seconds.min())
+    eventgroups = df.groupby("case:concept:name")["time:relative:seconds"]
+    mins_c = eventgroups.transform("min")
+    denom_c = eventgroups.transform("max") - mins_c
+    df["time:relative:normalized:case"] = ((seconds - mins_c) / denom_c.replace(0, pd.NA)).fillna(0)
+    return df
+
+def test_grouped_relative_times_match_per_case_times(event_log):
+    # rows of a case are not contiguous
+    event_log = event_log.sample(frac=1, random_state=0)
+
+    grouped = normalize_reltimes_log(event_log.copy())
+    per_case = _normalize_reltimes_per_case(event_log.copy())
+
+    # the former case-level column was of object dtype (pd.NA)
+    pd.testing.assert_frame_equal(grouped, per_case, check_dtype=False)
+
+#####################
+### ENCODING
+#####################
+
+def test_encode_decode_round_trip(event_log):
+    cols = ["case:concept:name", "concept:name"]
+
+    encoded, dtypes = encode_log_columns(event_log.copy(), cols)
+
+    for col in cols:
+        assert isinstance(encoded[col].dtype, pd.CategoricalDtype)
+        assert encoded[col].cat.categories.is_monotonic_increasing
+    pd.testing.assert_frame_equal(decode_log_columns(encoded, dtypes), event_log)
+
+def test_encode_sorts_categories_of_categorical_columns(event_log):
+    event_log["concept:name"] = pd.Categorical(
+        event_log["concept:name"], 
+        categories=sorted(event_log["concept:name"].unique(), reverse=True))
+
+    encoded, dtypes = encode_log_columns(event_log.copy(), ["concept:name"])
+    decoded = decode_log_columns(encoded, dtypes)
+
+    assert encoded["concept:name"].cat.categories.is_monotonic_increasing
+    assert isinstance(decoded["concept:name"].dtype, pd.CategoricalDtype)
+    assert decoded["concept:name"].astype(str).tolist() == event_log["concept:name"].astype(str).tolist()
+
+#####################
+### VALUE MAPPING
+#####################
+
+def _map_values_with_tuples(df, df_ranks, key_cols, rank_col_name):
+    '''The former mapping: one tuple per row looked up in a dictionary.'''
+    rank_dict = df_ranks.set_index(key_cols)[rank_col_name].to_dict()
+    return df[key_cols].apply(tuple, axis=1).map(rank_dict)
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_map_values_to_col_matches_tuple_mapping(event_log, categorical):
+    event_log["stage:number"] = np.arange(len(event_log)) % 3 + 1
+    if categorical:
+        event_log["concept:name"] = event_log["concept:name"].astype("category")
+    df_ranks = (
+        event_log.groupby(["stage:number", "concept:name"], observed=True)
+          .size().reset_index(name="count"))
+    # some keys are missing
+    df_ranks = df_ranks.iloc[::2]
+    df_ranks["rank"] = np.arange(len(df_ranks))
+    df_ranks["label"] = "label " + df_ranks["rank"].astype(str)
+
+    for col in ("rank", "label"):
+        result = map_values_to_col(event_log, df_ranks, ["stage:number", "concept:name"], col)
+        expected = _map_values_with_tuples(
+            event_log, df_ranks, ["stage:number", "concept:name"], col)
+        assert result.isna().any()
+        pd.testing.assert_series_equal(result, expected, check_dtype=False)
+
+def test_map_dict_to_col_with_empty_dict(event_log):
+    result = map_dict_to_col(event_log, {}, ["case:concept:name", "concept:name"])
+
+    assert result.index.equals(event_log.index)
+    assert result.isna().all()
+
+def test_map_dict_to_col_with_strings_and_missing_keys():
+    df = pd.DataFrame({"stage": [1, 2, 3], "name": ["a", "b", "c"]})
+
+    result = map_dict_to_col(df, {(1, "a"): "first", (3, "c"): "third"}, ["stage", "name"])
+    filled = map_dict_to_col(
+        df, {(1, "a"): "first", (3, "c"): "third"}, ["stage", "name"], fill_value="none")
+
+    assert result.isna().tolist() == [False, True, False]
+    assert result.dropna().tolist() == ["first", "third"]
+    assert filled.tolist() == ["first", "none", "third"]
+
+#####################
+### GROUPED UNIQUE VALUES
+#####################
+
+def _group_unique_values_per_group(df, key_col, item_col, order_by=None, ascending=True):
+    '''The former loop over the groups (with a stable sort, as documented).'''
+    result = {}
+    for key, group in df.groupby(key_col):
+        if order_by:
+            group = group.sort_values(order_by, ascending=ascending, kind="stable")
+        result[key] = group[item_col].drop_duplicates().tolist()
+    return result
+
+@pytest.mark.parametrize("order_by, ascending", [
+    (None, True), 
+    ("time:relative:seconds", True), 
+    ("time:relative:seconds", False)])
+def test_group_unique_values_to_dict_matches_loop(event_log, order_by, ascending):
+    df = normalize_reltimes_log(event_log)
+    df["stage:number"] = np.arange(len(df)) % 4
+    df.loc[df.index[::10], "stage:number"] = np.nan # missing keys are skipped
+
+    for key_col, item_col in (("stage:number", "concept:name"), ("concept:name", "case:concept:name")):
+        result = group_unique_values_to_dict(
+            df, key_col, item_col, order_by=order_by, ascending=ascending)
+        expected = _group_unique_values_per_group(
+            df, key_col, item_col, order_by=order_by, ascending=ascending)
+        assert list(result) == list(expected)
+        assert result == expected
@@ -0,0 +1,55 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import numpy as np
+import pandas as pd
+from varexpm.utils.data_processing import get_all_activity_statistics, normalize_reltimes_log
+from varexpm.utils.data_sketches import compute_activity_statistics_from_chunks
+
+#####################
+### ACTIVITY STATISTICS (OUT-OF-CORE)
+#####################
+
+def _case_chunks(df: pd.DataFrame, num_chunks: int) -> list:
+    '''Splits a log into chunks of complete cases.'''
+    cases = df["case:concept:name"].unique()
+    return [
+        df[df["case:concept:name"].isin(part)] 
+        for part in np.array_split(cases, num_chunks)]
+
+def test_chunked_statistics_match_in_memory_statistics(event_log):
+    # fewer values per activity than the compression, hence quantiles are exact
+    expected = get_all_activity_statistics(normalize_reltimes_log(event_log))
+
+    result = compute_activity_statistics_from_chunks(_case_chunks(event_log, 4))
+
+    pd.testing.assert_frame_equal(
+        result.loc[expected.index], expected, check_exact=False, check_names=False)
+
+def test_chunked_statistics_without_time_range(event_log):
+    # all events at one timestamp: positions in the log are undefined
+    event_log["time:timestamp"] = pd.Timestamp("2020-01-01", tz="UTC")
+
+    result = compute_activity_statistics_from_chunks(_case_chunks(event_log, 3))
+
+    pos_log = result.filter(like="pos_log_")
+    assert pos_log.isna().all().all()
+    assert result["freq_percase_skew"].notna().any()
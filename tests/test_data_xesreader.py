@@ -0,0 +1,126 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import io
+import pandas as pd
+import pm4py
+from varexpm.utils.data_xesreader import (
+    find_xes_trace_blocks,
+    read_xes_chunked,
+    read_xes_parallel
+)
+
+#####################
+### STREAMING XES READER
+#####################
+
+def _event(activity, minute):
+    name = f'<string key="concept:name" value="{activity}"/>' if activity is not None else ""
+    return f'<event>{name}<date key="time:timestamp" value="2020-01-01T00:{minute:02d}:00+00:00"/></event>'
+
+def test_chunks_keep_categorical_columns():
+    traces = "".join(
+        f'<trace><string key="concept:name" value="c{case}"/>{_event(f"a{case % 4}", case)}</trace>'
+        for case in range(10))
+    xes = f'<?xml version="1.0"?><log xmlns="http://www.xes-standard.org/">{traces}</log>'
+
+    df = read_xes_chunked(io.BytesIO(xes.encode()), chunk_size=1)
+
+    assert isinstance(df["concept:name"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["case:concept:name"].dtype, pd.CategoricalDtype)
+    assert df["concept:name"].astype(str).tolist() == [f"a{case % 4}" for case in range(10)]
+    assert df["case:concept:name"].cat.categories.tolist() == [f"c{case}" for case in range(10)]
+
+def test_missing_and_empty_names():
+    xes = (
+        '<?xml version="1.0"?><log xmlns="http://www.xes-standard.org/">'
+        f'<trace><string key="concept:name" value=""/>{_event(None, 0)}{_event("", 1)}</trace>'
+        f'<trace><string key="concept:name" value=""/>{_event("a", 2)}</trace>'
+        '</log>')
+
+    df = read_xes_chunked(io.BytesIO(xes.encode()), chunk_size=1)
+
+    assert df["concept:name"].isna().tolist() == [True, False, False]
+    assert df["concept:name"].cat.categories.tolist() == ["", "a"]
+    assert df["case:concept:name"].tolist() == ["", "", ""]
+
+def _trace(case, events):
+    name = f'<string key="concept:name" value="{case}"/>' if case is not None else ""
+    return f"<trace>{name}{''.join(events)}</trace>\n"
+
+def _write_unnamed_traces_log(path):
+    '''Writes a log with traces "A", unnamed, "B", unnamed, and "1".'''
+    path.write_text(
+        '<?xml version="1.0"?>\n<log xmlns="http://www.xes-standard.org/">\n'
+        + _trace("A", [_event("a", 0)])
+        + _trace(None, [_event("b", 1)])
+        + _trace("B", [_event("a", 2)])
+        + _trace(None, [_event("c", 3), _event("d", 4)])
+        + _trace("1", [_event("e", 5)])
+        + "</log>\n")
+    return path
+
+def test_unnamed_traces_have_missing_case_as_in_pm4py(tmp_path):
+    path = _write_unnamed_traces_log(tmp_path / "unnamed.xes")
+
+    df = read_xes_chunked(path, chunk_size=1)
+
+    reference = pm4py.read_xes(str(path))
+    assert df["case:concept:name"].isna().tolist() == [False, True, False, True, True, False]
+    assert df["case:concept:name"].isna().tolist() == reference["case:concept:name"].isna().tolist()
+    assert df["case:concept:name"].dropna().tolist() == ["A", "B", "1"]
+    # the events of unnamed traces are not merged into the real case "1"
+    assert df.loc[df["case:concept:name"] == "1", "concept:name"].tolist() == ["e"]
+
+#####################
+### PARALLEL XES READER
+#####################
+
+def test_parallel_reader_keeps_prefixed_root(tmp_path):
+    # prefixed elements and attributes need the declarations of the root
+    traces = "".join(
+        f'<xes:trace><xes:string key="concept:name" value="c{case}"/>'
+        f'<xes:event my:flag="1"><xes:string key="concept:name" value="a{case % 3}"/>'
+        f'<xes:date key="time:timestamp" value="2020-01-01T00:{case:02d}:00+00:00"/></xes:event>'
+        '</xes:trace>\n'
+        for case in range(9))
+    path = tmp_path / "prefixed.xes"
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<xes:log xmlns:xes="http://www.xes-standard.org/" xmlns:my="urn:my" note="a>b">\n'
+        f'{traces}</xes:log>\n')
+
+    serial = read_xes_chunked(path)
+    parallel = read_xes_parallel(path, n_jobs=2, num_blocks=3)
+
+    assert len(serial) == 9
+    pd.testing.assert_frame_equal(parallel, serial)
+
+def test_parallel_reader_matches_serial_reader_with_unnamed_traces(tmp_path):
+    # one trace per block, hence the unnamed traces are in different blocks
+    path = _write_unnamed_traces_log(tmp_path / "unnamed.xes")
+    assert len(find_xes_trace_blocks(path, 20)[2]) == 5
+
+    serial = read_xes_chunked(path)
+    parallel = read_xes_parallel(path, n_jobs=2, num_blocks=20)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert parallel["case:concept:name"].isna().sum() == 3
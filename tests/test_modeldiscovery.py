@@ -0,0 +1,52 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import numpy as np
+import pytest
+from varexpm.cm_methods.visualization.modeldiscovery import discover_multi_dependency_graphs
+from varexpm.utils.data_processing import normalize_reltimes_log
+
+#####################
+### DEPENDENCY GRAPHS
+#####################
+
+def _graph_summary(graph):
+    '''Returns the nodes (in order) and the weighted edges of a dependency graph.'''
+    edges = sorted(
+        (str(u), str(v), round(data.get("weight", 0), 12)) 
+        for u, v, data in graph.edges(data=True))
+    return list(graph.nodes), edges
+
+@pytest.mark.parametrize("dependency_threshold", [0.0, 0.5, 0.9])
+def test_native_dependency_graphs_match_pm4py(event_log, dependency_threshold):
+    df = normalize_reltimes_log(event_log)
+    # three stages of equal width over the log-normalized time
+    df["stage:number"] = np.minimum(
+        (df["time:relative:normalized:log"] * 3).astype(int), 2) + 1
+
+    native = discover_multi_dependency_graphs(
+        df, dependency_threshold=dependency_threshold, method="native")
+    reference = discover_multi_dependency_graphs(
+        df, dependency_threshold=dependency_threshold, method="pm4py")
+
+    assert len(native) == len(reference) == 3
+    for native_graph, reference_graph in zip(native, reference):
+        assert _graph_summary(native_graph) == _graph_summary(reference_graph)
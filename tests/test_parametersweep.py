@@ -0,0 +1,67 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import pandas as pd
+import pytest
+from conftest import make_event_log
+from varexpm.cm_methods import (
+    discover_concise_model,
+    enhance_log_for_concise_model,
+    generate_evaluation_statistics_df,
+    sweep_concise_models
+)
+from varexpm.cm_methods.cm_pipeline import PIPELINE_STAGES, upstream_stages
+
+#####################
+### PARAMETER SWEEP
+#####################
+
+def _evaluate_point(log, params, log_name) -> pd.DataFrame:
+    '''The evaluation statistics of one separately enhanced log.'''
+    df_log = enhance_log_for_concise_model(log, **params)
+    dfg, _, _, _, _ = discover_concise_model(df_log)
+    return generate_evaluation_statistics_df(df_log, dfg, log_name=log_name)
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_sweep_matches_separate_runs(n_jobs):
+    log = make_event_log(num_cases=60)
+    grid = {"num_stages": [2, 3], "num_comm_ranks": [0, 1], "num_act_ranks": [0, 2]}
+
+    results = sweep_concise_models(log, grid, n_jobs=n_jobs, seed=42)
+
+    points = [
+        {"num_stages": s, "num_comm_ranks": c, "num_act_ranks": a}
+        for s in grid["num_stages"] for c in grid["num_comm_ranks"] for a in grid["num_act_ranks"]]
+    assert len(results) == len(points)
+    for i, point in enumerate(points):
+        expected = _evaluate_point(log, {**point, "seed": 42}, log_name=f"log_{i + 1}")
+        row = results.iloc[[i]].reset_index(drop=True)
+        for name, value in point.items():
+            assert row[f"param:{name}"].item() == value
+        pd.testing.assert_frame_equal(row[expected.columns], expected, check_dtype=False)
+
+def test_upstream_stages_are_ordered_dependencies():
+    for name, stage in PIPELINE_STAGES.items():
+        upstream = upstream_stages(name)
+        assert set(stage["depends_on"]) <= set(upstream)
+        assert upstream == [s for s in PIPELINE_STAGES if s in upstream]
+        for dependency in upstream:
+            assert set(upstream_stages(dependency)) <= set(upstream)
@@ -0,0 +1,106 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import json
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+from varexpm.cm_methods import enhance_log_for_concise_model
+from varexpm.cm_methods.cm_pipeline import PIPELINE_STAGES
+from varexpm.utils import create_profile_report, export_chrome_trace
+from varexpm.utils.profiling import PROFILE_COLUMNS, profiled, profiling_session
+
+#####################
+### PROFILING SESSIONS
+#####################
+
+def test_profiling_session_records_nested_steps():
+    with profiling_session() as records:
+        assert tracemalloc.is_tracing()
+        with profiled("outer", "a", rows_in=10) as outer:
+            with profiled("inner", "b") as inner:
+                data = np.ones(1_000_000)
+                inner["rows_out"] = len(data)
+                del data
+            outer["rows_out"] = 5
+        with profiled("skipped") as skipped:
+            skipped["discard"] = True
+
+    report = create_profile_report(records)
+
+    assert not tracemalloc.is_tracing()
+    assert list(report.columns) == PROFILE_COLUMNS
+    assert report["name"].tolist() == ["outer", "inner"]
+    assert report["depth"].tolist() == [0, 1]
+    assert report["rows_in"].tolist() == [10, pd.NA]
+    assert report["rows_out"].tolist() == [5, 1_000_000]
+    # the peak of a step includes the peaks of its nested steps
+    assert (report["peak_memory_bytes"] >= 8_000_000).all()
+    assert (report["wall_seconds"] >= 0).all()
+
+def test_profiled_without_session_records_nothing():
+    with profiled("step") as record:
+        record["rows_out"] = 1
+    with profiling_session(enabled=False) as records:
+        with profiled("step"):
+            pass
+
+    assert records == []
+
+def test_profiling_session_rejects_unknown_memory_mode():
+    with pytest.raises(ValueError):
+        with profiling_session(memory="auto"):
+            pass
+
+#####################
+### PIPELINE REPORTS
+#####################
+
+def test_pipeline_report_matches_unprofiled_run(event_log):
+    expected = enhance_log_for_concise_model(event_log, num_stages=3, seed=42)
+    callback_records = []
+
+    result, report = enhance_log_for_concise_model(
+        event_log, num_stages=3, seed=42, return_report=True, 
+        report_callback=callback_records.append)
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert report["name"].iloc[0] == "enhance_log_for_concise_model"
+    assert report["rows_in"].iloc[0] == len(event_log)
+    assert report["rows_out"].iloc[0] == len(expected)
+    assert set(report.loc[report["depth"] == 1, "name"]) == set(PIPELINE_STAGES)
+    assert len(callback_records) == len(report)
+    assert report["peak_memory_bytes"].notna().all()
+
+def test_export_chrome_trace_writes_json(event_log, tmp_path):
+    _, report = enhance_log_for_concise_model(
+        event_log, num_stages=3, seed=42, return_report=True)
+
+    path = export_chrome_trace(report, tmp_path / "trace" / "pipeline.json")
+
+    with open(path) as f:
+        trace = json.load(f)
+    events = trace["traceEvents"]
+    assert [event["name"] for event in events] == report["name"].tolist()
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    assert [event["args"]["rows_out"] for event in events] == [
+        None if pd.isna(rows) else int(rows) for rows in report["rows_out"]]
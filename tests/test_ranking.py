@@ -0,0 +1,100 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+from varexpm.cm_methods.patterndefinition.ranking import (
+    _group_rows,
+    rank_entities,
+    rank_entities_from_sketch,
+    sketch_entity_values
+)
+from varexpm.utils.data_sketches import merge_ddsketches
+
+#####################
+### GROUPING
+#####################
+
+def test_group_rows_matches_groupby(event_log):
+    event_log["concept:name"] = event_log["concept:name"].astype("category")
+    event_log.loc[event_log.index[::7], "org:resource"] = None # missing keys
+    key_cols = ["case:concept:name", "concept:name", "org:resource"]
+
+    group_ids, df_keys = _group_rows(event_log, key_cols)
+    grouped = event_log.groupby(key_cols, observed=True, sort=True)
+
+    np.testing.assert_array_equal(group_ids, grouped.ngroup().fillna(-1).to_numpy())
+    pd.testing.assert_frame_equal(
+        df_keys.astype(str), grouped.size().reset_index()[key_cols].astype(str), 
+        check_column_type=False)
+
+def test_group_rows_without_observed_keys(event_log):
+    event_log["org:resource"] = None
+
+    group_ids, df_keys = _group_rows(event_log, ["concept:name", "org:resource"])
+
+    assert (group_ids == -1).all()
+    assert list(df_keys.columns) == ["concept:name", "org:resource"]
+    assert df_keys.empty
+
+#####################
+### APPROXIMATE MEDIAN RANKING
+#####################
+
+@pytest.fixture
+def grouped_values() -> pd.DataFrame:
+    '''Values of 10 entities in 2 stages with well-separated medians.'''
+    rng = np.random.default_rng(1)
+    entities = np.repeat(np.arange(10), 200)
+    return pd.DataFrame({
+        "stage": entities % 2,
+        "entity": entities,
+        "value": (entities + 1) * 0.1 + rng.normal(0, 0.01, len(entities)),
+    })
+
+def test_approx_median_ranks_match_exact_median_ranks(grouped_values):
+    exact = rank_entities(
+        grouped_values, ["stage", "entity"], "value", agg_type="median",
+        sort_cols=["stage"], rank_within_col=["stage"])
+    approx = rank_entities(
+        grouped_values, ["stage", "entity"], "value", agg_type="approx_median",
+        sort_cols=["stage"], rank_within_col=["stage"])
+
+    assert approx["rank"].tolist() == exact["rank"].tolist()
+    np.testing.assert_allclose(
+        approx["approx_median_value"], exact["median_value"], rtol=0.01)
+
+def test_merged_shard_sketches_match_single_sketch(grouped_values):
+    single = rank_entities(
+        grouped_values, ["stage", "entity"], "value", agg_type="approx_median")
+
+    shuffled = grouped_values.sample(frac=1, random_state=0)
+    shards = [shuffled.iloc[i::3] for i in range(3)]
+    sketch = merge_ddsketches([
+        sketch_entity_values(shard, ["stage", "entity"], "value") for shard in shards])
+    merged = rank_entities_from_sketch(sketch, ["stage", "entity"])
+
+    pd.testing.assert_frame_equal(merged, single)
+
+def test_rank_entities_rejects_unknown_agg_type(grouped_values):
+    with pytest.raises(ValueError):
+        rank_entities(grouped_values, ["entity"], "value", agg_type="mode")
@@ -0,0 +1,96 @@
+'''
+VARIANT_EXTRACTION — A Python package and CLI tool to extract and visualize process behaviors from complex event data.
+Copyright (C) 2023  Christoffer Rubensson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Website: https://hu-berlin.de/rubensson
+E-Mail: {firstname.lastname}@hu-berlin.de
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+from varexpm.cm_methods.patterndefinition.stagecreation import return_timewindows_column
+from varexpm.utils.data_processing import normalize_reltimes_log
+
+#####################
+### STAGE CREATION
+#####################
+
+@pytest.fixture
+def times(event_log) -> pd.DataFrame:
+    '''The event log with normalized relative times (many ties at 0 and 1).'''
+    return normalize_reltimes_log(event_log)
+
+@pytest.mark.parametrize("num_stages", [2, 3, 7])
+def test_equal_stages_match_pd_cut(times, num_stages):
+    col = times["time:relative:normalized:case"]
+    edges = np.linspace(col.min(), col.max(), num_stages + 1)
+
+    stages = return_timewindows_column(times, num_stages=num_stages, type="equal")
+
+    expected = pd.cut(col, bins=edges, labels=False, include_lowest=True)
+    pd.testing.assert_series_equal(stages, expected, check_dtype=False)
+
+@pytest.mark.parametrize("num_stages", [2, 3, 7])
+def test_quantile_stages_match_pd_qcut(times, num_stages):
+    col = times["time:relative:normalized:case"]
+
+    stages = return_timewindows_column(times, num_stages=num_stages, type="quantile")
+
+    expected = pd.qcut(col, q=num_stages, labels=False, duplicates="drop")
+    pd.testing.assert_series_equal(stages, expected, check_dtype=False)
+
+@pytest.mark.parametrize("num_stages", [2, 3, 7])
+def test_adaptive_stages_are_ordered_and_cut_between_values(times, num_stages):
+    col = times["time:relative:normalized:case"]
+
+    stages = return_timewindows_column(times, num_stages=num_stages, type="adaptive")
+
+    # stages are numbered without gaps and increase with the time
+    assert sorted(stages.unique()) == list(range(stages.nunique()))
+    assert stages.nunique() <= num_stages
+    by_time = stages.to_numpy()[np.argsort(col.to_numpy(), kind="stable")]
+    assert (np.diff(by_time) >= 0).all()
+    # equal times are never split across stages
+    assert (stages.groupby(col).nunique() == 1).all()
+
+def test_single_stage_and_multiple_stage_counts(times):
+    assert return_timewindows_column(times, num_stages=1) == 0
+
+    multiple = return_timewindows_column(times, num_stages=[2, 4], type="quantile")
+
+    for count in (2, 4):
+        pd.testing.assert_series_equal(
+            multiple[count], 
+            return_timewindows_column(times, num_stages=count, type="quantile"), 
+            check_names=False)
+
+def test_value_range_of_the_whole_log(times):
+    col = times["time:relative:normalized:case"]
+    part = times.iloc[: len(times) // 3]
+
+    stages = return_timewindows_column(
+        part, num_stages=4, value_range=(col.min(), col.max()))
+
+    expected = return_timewindows_column(times, num_stages=4).iloc[: len(times) // 3]
+    pd.testing.assert_series_equal(stages, expected)
+
+def test_missing_times_stay_missing(times):
+    times.loc[times.index[::7], "time:relative:normalized:case"] = np.nan
+
+    for stage_type in ("equal", "quantile", "adaptive"):
+        stages = return_timewindows_column(times, num_stages=3, type=stage_type)
+        assert stages.isna().tolist() == times["time:relative:normalized:case"].isna().tolist()
@@ -57,16 +57,42 @@ def selectLog():
             COLUMNS['time'] = str(input(message))
     return logname, COLUMNS
 
-def importLog(path: str, COLUMNS: dict):
-    """Simple event log importer (XES).
+def importLog(path: str, COLUMNS: dict, reader='pm4py', chunk_size=100_000, n_jobs=1):
+    """Simple event log importer (XES, CSV, Parquet).
 
     Keyword arguments:
     path -- path to folder with event log
     COLUMNS -- dictionary with column names to indicate e.g., case attribute
-    """
+    reader -- 'pm4py' (default) or 'stream' for a chunked reader with categorical 
+              case and activity columns (requires the varexpm package)
+    chunk_size -- minimum number of events per parsed chunk (only for 'stream')
+    n_jobs -- number of processes to parse the file in parallel (only for 'stream', -1 uses all CPUs)
 
-    # TODO: Extend to .csv-files
-    df = pm4py.read_xes(path)
+    CSV and Parquet files are read with typed columns (requires the varexpm package).
+    """
+    if path.endswith(('.csv', '.parquet')):
+        from varexpm.utils.data_importing import read_tabular_event_log
+        df = read_tabular_event_log(
+            path,
+            ACT_COL=COLUMNS.get('activity'),
+            CASE_COL=COLUMNS.get('case'),
+            TIME_COL=COLUMNS.get('time'))
+    elif reader == 'stream' and n_jobs != 1:
+        from varexpm.utils.data_xesreader import read_xes_parallel
+        df = read_xes_parallel(
+            path, n_jobs=n_jobs,
+            ACT_COL=COLUMNS.get('activity'),
+            CASE_COL=COLUMNS.get('case'),
+            TIME_COL=COLUMNS.get('time'))
+    elif reader == 'stream':
+        from varexpm.utils.data_xesreader import read_xes_chunked
+        df = read_xes_chunked(
+            path, chunk_size=chunk_size,
+            ACT_COL=COLUMNS.get('activity'),
+            CASE_COL=COLUMNS.get('case'),
+            TIME_COL=COLUMNS.get('time'))
+    else:
+        df = pm4py.read_xes(path)
     df = df.sort_values(by=COLUMNS.get('time'))
     return df
 